@@ -40,6 +40,19 @@ class Settings:
     DEEPSEEK_API_KEY: Optional[str] = os.getenv("DEEPSEEK_API_KEY")
     ZHIPU_API_KEY: Optional[str] = os.getenv("ZHIPU_API_KEY")
     ZHIPU_EMBEDDING_MODEL: str = os.getenv("ZHIPU_EMBEDDING_MODEL", "embedding-3")
+    # 向量维度（embedding-3 支持 256/512/1024/2048），为空时使用模型默认维度
+    ZHIPU_EMBEDDING_DIMENSIONS: Optional[int] = int(os.getenv("ZHIPU_EMBEDDING_DIMENSIONS")) if os.getenv("ZHIPU_EMBEDDING_DIMENSIONS") else None
+    # Embedding 批量请求：单次请求的文本数量、同时在途的批次数量、失败重试次数与初始退避时间（秒）
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+    EMBEDDING_RETRY_BACKOFF: float = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "1.0"))
+    # Embedding 持久化缓存：按 (模型, 维度, sha256(文本)) 缓存向量，本地 SQLite + 可选 Redis 二级缓存
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "True").lower() == "true"
+    EMBEDDING_CACHE_DB: str = os.getenv("EMBEDDING_CACHE_DB", str(PROJECT_ROOT / "storage" / "databases" / "embedding_cache.db"))
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+    EMBEDDING_CACHE_REDIS_ENABLED: bool = os.getenv("EMBEDDING_CACHE_REDIS_ENABLED", "False").lower() == "true"
+    EMBEDDING_CACHE_REDIS_TTL: int = int(os.getenv("EMBEDDING_CACHE_REDIS_TTL", "604800"))
     
     # ========== Neo4j配置 ==========
     NEO4J_URI: str = os.getenv("NEO4J_URI")
@@ -53,11 +66,90 @@ class Settings:
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_PASSWORD: Optional[str] = os.getenv("REDIS_PASSWORD", None)
     REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "10"))
+    # 单次命令的读写超时、建立连接超时（秒），以及空闲连接的健康检查间隔（秒）
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "2"))
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+    
+    # ========== 语义答案缓存配置 ==========
+    # 问题向量与已回答问题的余弦相似度不低于阈值时，直接返回缓存的答案
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
     
     # ========== Milvus配置 ==========
     MILVUS_AGENT_DB: str = str(PROJECT_ROOT / "storage" / "databases" / "milvus_agent.db")
     PDF_AGENT_DB: str = str(PROJECT_ROOT / "storage" / "databases" / "pdf_agent.db")
     
+    # ========== 检索配置 ==========
+    # 向量检索与知识图谱检索并发执行，共享的单次请求截止时间（秒）
+    RETRIEVAL_DEADLINE_SECONDS: float = float(os.getenv("RETRIEVAL_DEADLINE_SECONDS", "60"))
+    # 上下文增强进行的同时先用原问题开始检索，增强后问题不变时直接使用其结果
+    SPECULATIVE_RETRIEVAL_ENABLED: bool = os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "true").lower() == "true"
+    
+    # ========== 上下文增强配置 ==========
+    # 去掉标点后不超过该长度的问题视为依赖上下文（如"症状呢"）
+    CONTEXT_SHORT_QUERY_LENGTH: int = int(os.getenv("CONTEXT_SHORT_QUERY_LENGTH", "4"))
+    # 会话主题记忆的过期时间（秒），与对话历史一致
+    CONTEXT_TOPIC_TTL: int = int(os.getenv("CONTEXT_TOPIC_TTL", "86400"))
+    # Agent 启动时从 Neo4j 加载实体名称索引，本地识别问题和历史中提到的实体（不调用大模型）
+    CONTEXT_ENTITY_LINKING_ENABLED: bool = os.getenv("CONTEXT_ENTITY_LINKING_ENABLED", "true").lower() == "true"
+    
+    # ========== 回答生成配置 ==========
+    # Agent 流式生成回答时 LLM 调用的超时（秒，流式响应中为两个片段之间的最长等待时间）
+    AGENT_LLM_TIMEOUT: float = float(os.getenv("AGENT_LLM_TIMEOUT", "60"))
+    # 流式接口检查客户端是否已断开连接的间隔（秒），断开后取消检索与回答生成
+    STREAM_DISCONNECT_POLL_INTERVAL: float = float(os.getenv("STREAM_DISCONNECT_POLL_INTERVAL", "0.5"))
+    
+    # ========== 图谱服务客户端配置 ==========
+    # Agent 调用 graph_service 使用的异步 HTTP 连接池
+    GRAPH_CLIENT_MAX_CONNECTIONS: int = int(os.getenv("GRAPH_CLIENT_MAX_CONNECTIONS", "100"))
+    GRAPH_CLIENT_MAX_KEEPALIVE: int = int(os.getenv("GRAPH_CLIENT_MAX_KEEPALIVE", "20"))
+    GRAPH_CLIENT_KEEPALIVE_EXPIRY: float = float(os.getenv("GRAPH_CLIENT_KEEPALIVE_EXPIRY", "30"))
+    # /answer 接口（生成 + 验证 + 执行）的单次调用超时（秒），应小于 RETRIEVAL_DEADLINE_SECONDS，
+    # 主地址超时后才有剩余时间尝试备用地址
+    GRAPH_ANSWER_TIMEOUT: float = float(os.getenv("GRAPH_ANSWER_TIMEOUT", "40"))
+    # graph_service 调用 LLM（生成 Cypher、解释、改进建议）的并发上限与单次超时（秒）
+    GRAPH_LLM_MAX_CONCURRENCY: int = int(os.getenv("GRAPH_LLM_MAX_CONCURRENCY", "16"))
+    GRAPH_LLM_TIMEOUT: float = float(os.getenv("GRAPH_LLM_TIMEOUT", "30"))
+
+    # ========== NL2Cypher 生成缓存配置 ==========
+    # 按 (规范化问题, 查询类型, 图模式指纹) 缓存生成的 Cypher 及验证结果
+    CYPHER_CACHE_ENABLED: bool = os.getenv("CYPHER_CACHE_ENABLED", "True").lower() == "true"
+    CYPHER_CACHE_MAX_ENTRIES: int = int(os.getenv("CYPHER_CACHE_MAX_ENTRIES", "2048"))
+    CYPHER_CACHE_REDIS_ENABLED: bool = os.getenv("CYPHER_CACHE_REDIS_ENABLED", "False").lower() == "true"
+    CYPHER_CACHE_TTL: int = int(os.getenv("CYPHER_CACHE_TTL", "86400"))
+
+    # ========== Cypher 查询模板配置 ==========
+    # 问题只提到一个已知实体、且能确定唯一关系时，直接生成参数化查询，不调用 LLM
+    CYPHER_TEMPLATES_ENABLED: bool = os.getenv("CYPHER_TEMPLATES_ENABLED", "True").lower() == "true"
+
+    # ========== Cypher 查询结果缓存配置 ==========
+    # 按 (清理后的查询, 参数) 缓存只读查询的结果，图谱版本号变化（重新构建）后整体失效
+    CYPHER_RESULT_CACHE_ENABLED: bool = os.getenv("CYPHER_RESULT_CACHE_ENABLED", "True").lower() == "true"
+    CYPHER_RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("CYPHER_RESULT_CACHE_MAX_ENTRIES", "1024"))
+    CYPHER_RESULT_CACHE_MAX_RECORDS: int = int(os.getenv("CYPHER_RESULT_CACHE_MAX_RECORDS", "1000"))
+    GRAPH_GENERATION_CHECK_INTERVAL: float = float(os.getenv("GRAPH_GENERATION_CHECK_INTERVAL", "5"))
+
+    # ========== 图谱构建配置 ==========
+    # scripts/build_graph.py 并行写入关系的线程数（同一关系类型按主实体名称哈希分区，每个分区一个线程）
+    GRAPH_BUILD_RELATIONSHIP_WORKERS: int = int(os.getenv("GRAPH_BUILD_RELATIONSHIP_WORKERS", "4"))
+    # 关系批次遇到锁冲突、死锁等临时错误时的最大重试次数与退避基数（秒，每次翻倍）
+    GRAPH_BUILD_MAX_RETRIES: int = int(os.getenv("GRAPH_BUILD_MAX_RETRIES", "5"))
+    GRAPH_BUILD_RETRY_BACKOFF: float = float(os.getenv("GRAPH_BUILD_RETRY_BACKOFF", "0.1"))
+
+    # ========== 图模式约束与索引配置 ==========
+    # 图谱构建前为各标签的名称属性创建唯一约束（为false时只创建范围索引）和文本索引，并等待上线
+    GRAPH_SCHEMA_UNIQUE_NAMES: bool = os.getenv("GRAPH_SCHEMA_UNIQUE_NAMES", "true").lower() == "true"
+    GRAPH_INDEX_AWAIT_TIMEOUT: int = int(os.getenv("GRAPH_INDEX_AWAIT_TIMEOUT", "300"))
+    # graph_service 启动时检查约束和索引是否齐全（只检查，不创建）
+    GRAPH_SCHEMA_VERIFY_ON_STARTUP: bool = os.getenv("GRAPH_SCHEMA_VERIFY_ON_STARTUP", "true").lower() == "true"
+
+    # ========== 图模式注册表配置 ==========
+    # graph_service 缓存已加载的图模式，最多每隔该秒数检查一次配置文件是否变化
+    SCHEMA_RELOAD_INTERVAL: float = float(os.getenv("SCHEMA_RELOAD_INTERVAL", "2"))
+
     # ========== 服务端口配置 ==========
     AGENT_SERVICE_PORT: int = int(os.getenv("AGENT_SERVICE_PORT", "8103"))
     GRAPH_SERVICE_PORT: int = int(os.getenv("GRAPH_SERVICE_PORT", "8101"))
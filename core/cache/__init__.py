@@ -2,7 +2,23 @@
 缓存模块
 Redis缓存相关功能
 """
-from core.cache.redis_client import get_redis_client, cache_set, cache_get
+from core.cache.redis_client import (
+    get_redis_client,
+    close_redis_client,
+    set_redis_client_factory,
+    get_redis_pool_stats,
+    cache_set,
+    cache_get
+)
+from core.cache.semantic_cache import SemanticAnswerCache
 
-__all__ = ['get_redis_client', 'cache_set', 'cache_get']
+__all__ = [
+    'get_redis_client',
+    'close_redis_client',
+    'set_redis_client_factory',
+    'get_redis_pool_stats',
+    'cache_set',
+    'cache_get',
+    'SemanticAnswerCache'
+]
 
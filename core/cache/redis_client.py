@@ -3,14 +3,30 @@ Redis缓存客户端
 统一管理Redis连接和缓存操作
 """
 import json
+import threading
 import redis
 from datetime import datetime
+from typing import Callable, Dict, Optional
 from config.settings import settings
 
 
-def get_redis_client() -> redis.Redis:
+# 会话索引：Sorted Set 保存会话ID（score 为加入历史列表的时间），每个会话的信息保存在单独的 Hash 中
+SESSIONS_INDEX_KEY = 'chat:sessions:index'
+SESSION_META_PREFIX = 'chat:session:'
+# 旧版会话列表（Sorted Set，member 为会话信息的 JSON），通过 migrate_session_index() 迁移
+LEGACY_SESSIONS_KEY = 'chat:sessions:list'
+# 最多保留的历史会话数量
+MAX_SESSIONS = 50
+
+# 进程级的 Redis 客户端（首次调用 get_redis_client() 时创建，所有请求共享同一个连接池）
+_redis_client: Optional[redis.Redis] = None
+_redis_client_factory: Optional[Callable[[], redis.Redis]] = None
+_redis_client_lock = threading.Lock()
+
+
+def create_redis_client() -> redis.Redis:
     """
-    创建Redis客户端连接池
+    按配置创建新的Redis客户端（带健康检查和超时设置的连接池）
     
     Returns:
         Redis客户端实例
@@ -20,18 +36,84 @@ def get_redis_client() -> redis.Redis:
         port=settings.REDIS_PORT,
         db=settings.REDIS_DB,
         password=settings.REDIS_PASSWORD,
-        max_connections=settings.REDIS_MAX_CONNECTIONS
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        # 连接空闲超过该时间后，下次使用前先 PING 检查，避免拿到已断开的连接
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
     )
-    r = redis.Redis(connection_pool=pool)
+    return redis.Redis(connection_pool=pool)
+
+
+def get_redis_client() -> redis.Redis:
+    """
+    获取进程级的Redis客户端（首次调用时创建连接池并测试连接）
     
-    # 测试连接
-    try:
-        r.ping()
-        print("Redis连接成功")
-    except redis.exceptions.ConnectionError:
-        print("Redis连接失败")
+    Returns:
+        Redis客户端实例
+    """
+    global _redis_client
+    if _redis_client is not None:
+        return _redis_client
+    
+    with _redis_client_lock:
+        if _redis_client is None:
+            factory = _redis_client_factory or create_redis_client
+            r = factory()
+            
+            # 测试连接（只在创建时执行一次）
+            try:
+                r.ping()
+                print("Redis连接成功")
+            except redis.exceptions.ConnectionError:
+                print("Redis连接失败")
+            
+            _redis_client = r
+    return _redis_client
+
+
+def set_redis_client_factory(factory: Optional[Callable[[], redis.Redis]]):
+    """
+    设置创建Redis客户端的工厂函数（用于测试注入），并丢弃已创建的客户端
     
-    return r
+    Args:
+        factory: 返回Redis客户端的函数，为None时恢复默认的 create_redis_client
+    """
+    global _redis_client_factory
+    close_redis_client()
+    _redis_client_factory = factory
+
+
+def close_redis_client():
+    """关闭进程级的Redis客户端并释放连接池"""
+    global _redis_client
+    with _redis_client_lock:
+        if _redis_client is not None:
+            try:
+                _redis_client.connection_pool.disconnect()
+            except Exception as e:
+                print(f"关闭Redis连接池失败: {str(e)}")
+            _redis_client = None
+
+
+def get_redis_pool_stats() -> Dict[str, int]:
+    """
+    获取连接池统计信息
+    
+    Returns:
+        包含 max_connections（上限）、created（已创建）、in_use（使用中）、available（空闲）的字典，
+        客户端尚未创建时返回空字典
+    """
+    r = _redis_client
+    if r is None:
+        return {}
+    pool = r.connection_pool
+    return {
+        'max_connections': getattr(pool, 'max_connections', 0),
+        'created': getattr(pool, '_created_connections', 0),
+        'in_use': len(getattr(pool, '_in_use_connections', ())),
+        'available': len(getattr(pool, '_available_connections', ()))
+    }
 
 
 def cache_set(r: redis.Redis, question: str, answer: str, expire: int = 3600):
@@ -62,10 +144,86 @@ def cache_get(r: redis.Redis, question: str) -> bytes:
     return r.hget('qa', question)
 
 
+# 保存一条对话记录的服务端脚本：追加记录、初始化标题、更新消息数量、检查是否达到上限并转存会话、刷新过期时间，
+# 在一次往返内原子完成，同一会话的并发请求不会重复触发转存
+# 脚本只访问 KEYS 中声明的 key（兼容 Redis Cluster），超出数量的旧会话只从索引中移除并返回其ID，
+# 由调用方删除对应的会话信息 Hash
+# KEYS: 对话历史 List、会话信息 Hash、会话索引 Sorted Set
+# ARGV: 对话记录JSON、会话ID、标题（已截断的问题）、当前时间字符串、当前时间戳、对话历史过期时间、
+#       最多对话条数、会话信息/索引过期时间、最多会话数量
+# 返回: {对话条数, 是否转存(0/1), 被移出索引的会话ID列表}
+SAVE_CONVERSATION_SCRIPT = r"""
+local history_key, meta_key, index_key = KEYS[1], KEYS[2], KEYS[3]
+local session_id, title, now_str = ARGV[2], ARGV[3], ARGV[4]
+local max_history, max_sessions = tonumber(ARGV[7]), tonumber(ARGV[9])
+local session_expire = tonumber(ARGV[8])
+
+-- 按字符（而非字节）截断 UTF-8 字符串
+local function truncate(text, n)
+    local count, pos = 0, 1
+    for ch in string.gmatch(text, "[%z\1-\127\194-\244][\128-\191]*") do
+        count = count + 1
+        if count > n then
+            return string.sub(text, 1, pos - 1)
+        end
+        pos = pos + #ch
+    end
+    return text
+end
+
+local length = redis.call('RPUSH', history_key, ARGV[1])
+local indexed = redis.call('ZSCORE', index_key, session_id)
+
+if indexed then
+    if length == 1 then
+        -- 第一条对话：标题为"新窗口"时更新为第一个问题
+        if redis.call('HGET', meta_key, 'title') == '新窗口' then
+            redis.call('HSET', meta_key, 'title', title, 'update_time', now_str)
+        end
+    else
+        redis.call('HSET', meta_key, 'message_count', length, 'update_time', now_str)
+    end
+end
+
+local should_create_new = 0
+local evicted = {}
+if length >= max_history and redis.call('HSETNX', meta_key, 'rolled_over', 1) == 1 then
+    should_create_new = 1
+    -- 将当前会话保存到历史记录中（使用第一个问题作为标题）
+    local first_question = title
+    local ok, first_record = pcall(cjson.decode, redis.call('LINDEX', history_key, 0))
+    if ok and type(first_record) == 'table' and type(first_record['question']) == 'string' then
+        first_question = truncate(first_record['question'], 50)
+    end
+    redis.call('HSET', meta_key,
+        'session_id', session_id,
+        'title', first_question,
+        'update_time', now_str,
+        'message_count', length)
+    redis.call('EXPIRE', meta_key, session_expire)
+    redis.call('ZADD', index_key, ARGV[5], session_id)
+    redis.call('EXPIRE', index_key, session_expire)
+
+    -- 限制历史会话数量，最旧的会话移出索引（其信息 Hash 由调用方删除）
+    local session_count = redis.call('ZCARD', index_key)
+    if session_count > max_sessions then
+        evicted = redis.call('ZRANGE', index_key, 0, session_count - max_sessions - 1)
+        redis.call('ZREM', index_key, unpack(evicted))
+    end
+end
+
+redis.call('EXPIRE', history_key, tonumber(ARGV[6]))
+return {length, should_create_new, evicted}
+"""
+
+_save_conversation_script = None
+
+
 def save_conversation_history(r: redis.Redis, session_id: str, question: str, answer: str, expire: int = 86400):
     """
     保存对话历史到Redis
     使用List结构存储，每个元素是JSON格式的对话记录
+    追加记录、更新会话信息、达到10条时转存会话并刷新过期时间，由服务端脚本在一次往返内原子完成
     
     Args:
         r: Redis客户端实例
@@ -79,70 +237,88 @@ def save_conversation_history(r: redis.Redis, session_id: str, question: str, an
             - new_session_id: 如果达到10条，返回新的session_id，否则返回None
             - should_create_new: 是否需要创建新会话（达到10条时为True）
     """
+    global _save_conversation_script
+    if _save_conversation_script is None:
+        # 注册脚本（首次调用时计算 SHA，之后通过 EVALSHA 执行）
+        _save_conversation_script = r.register_script(SAVE_CONVERSATION_SCRIPT)
+    
+    now = datetime.now()
     # 构建对话记录
     conversation_record = {
         'question': question,
         'answer': answer,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        'timestamp': now.strftime("%Y-%m-%d %H:%M:%S")
     }
     
-    # 使用List结构存储，key格式：chat:history:{session_id}
-    key = f'chat:history:{session_id}'
-    
-    # 检查是否是第一条对话（保存前检查）
-    is_first_message = (r.llen(key) == 0)
-    
-    # 将对话记录追加到列表末尾
-    r.rpush(key, json.dumps(conversation_record, ensure_ascii=False))
-    
-    # 如果是第一条对话，检查并更新会话标题
-    if is_first_message:
-        # 检查会话是否在历史列表中，且标题是否为"新窗口"
-        sessions_key = 'chat:sessions:list'
-        sessions = r.zrevrange(sessions_key, 0, -1)
-        
-        for session_json in sessions:
-            try:
-                session_info = json.loads(session_json)
-                if session_info.get('session_id') == session_id:
-                    # 如果标题是"新窗口"，更新为第一个问题
-                    if session_info.get('title') == '新窗口':
-                        update_session_title(r, session_id, question)
-                    break
-            except:
-                continue
-    else:
-        # 如果不是第一条对话，更新消息数量
-        update_session_message_count(r, session_id)
-    
-    # 限制历史记录数量，只保留最近10条
+    # 限制历史记录数量，达到10条时创建新会话
     max_history = 10
-    list_length = r.llen(key)
     
-    # 检查是否达到10条（保存后检查）
-    should_create_new = False
-    new_session_id = None
+    # 使用List结构存储，key格式：chat:history:{session_id}
+    _, should_create_new, evicted = _save_conversation_script(
+        keys=[f'chat:history:{session_id}', session_meta_key(session_id), SESSIONS_INDEX_KEY],
+        args=[
+            json.dumps(conversation_record, ensure_ascii=False),
+            session_id,
+            question[:50] if len(question) > 50 else question,  # 标题最多50字符
+            conversation_record['timestamp'],
+            now.timestamp(),
+            expire,
+            max_history,
+            2592000,  # 会话信息与索引的过期时间（30天）
+            MAX_SESSIONS
+        ],
+        client=r
+    )
     
-    if list_length >= max_history:
-        # 达到10条，需要创建新会话
-        should_create_new = True
+    if evicted:
+        # 删除被移出索引的旧会话信息（逐个 DEL，各 key 可以位于不同的集群槽位）
+        pipe = r.pipeline(transaction=False)
+        for sid in evicted:
+            pipe.delete(session_meta_key(_decode(sid)))
+        pipe.execute()
+    
+    if should_create_new:
         # 生成新的session_id
         import uuid
-        new_session_id = str(uuid.uuid4())
-        
-        # 将当前会话保存到历史记录中（使用第一个问题作为标题）
-        first_record = r.lindex(key, 0)
-        if first_record:
-            first_data = json.loads(first_record)
-            first_question = first_data.get('question', '新对话')
-        else:
-            first_question = question
-        save_session_to_history(r, session_id, first_question)
+        return str(uuid.uuid4()), True
+    return None, False
+
+
+def session_meta_key(session_id: str) -> str:
+    """
+    会话信息 Hash 的 key
     
-    # 设置过期时间（默认1天）
-    r.expire(key, expire)
+    Args:
+        session_id: 会话ID
+        
+    Returns:
+        key，格式：chat:session:{session_id}
+    """
+    return f'{SESSION_META_PREFIX}{session_id}'
+
+
+def _trim_session_index(r: redis.Redis, max_sessions: int = MAX_SESSIONS):
+    """
+    限制历史会话数量，删除最旧的会话及其信息 Hash
     
-    return new_session_id, should_create_new
+    Args:
+        r: Redis客户端实例
+        max_sessions: 最多保留的会话数量
+    """
+    session_count = r.zcard(SESSIONS_INDEX_KEY)
+    if session_count <= max_sessions:
+        return
+    oldest = r.zrange(SESSIONS_INDEX_KEY, 0, session_count - max_sessions - 1)
+    if oldest:
+        pipe = r.pipeline(transaction=False)
+        pipe.zrem(SESSIONS_INDEX_KEY, *oldest)
+        pipe.delete(*[session_meta_key(_decode(sid)) for sid in oldest])
+        pipe.execute()
+
+
+def _decode(value) -> str:
+    """Redis 返回值转为字符串"""
+    return value.decode('utf-8') if isinstance(value, bytes) else value
 
 
 def create_session_in_history(r: redis.Redis, session_id: str, title: str = "新窗口"):
@@ -154,70 +330,45 @@ def create_session_in_history(r: redis.Redis, session_id: str, title: str = "新
         session_id: 会话ID
         title: 会话标题，默认为"新窗口"
     """
-    # 构建会话信息
-    session_info = {
+    meta_key = session_meta_key(session_id)
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(meta_key, mapping={
         'session_id': session_id,
         'title': title[:50] if len(title) > 50 else title,  # 标题最多50字符
         'update_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         'message_count': 0  # 初始为0条对话
-    }
-    
-    # 保存到会话列表，使用Sorted Set按时间排序
-    sessions_key = 'chat:sessions:list'
-    r.zadd(sessions_key, {json.dumps(session_info, ensure_ascii=False): datetime.now().timestamp()})
+    })
+    pipe.expire(meta_key, 86400)
+    # 会话ID加入索引，使用Sorted Set按时间排序
+    pipe.zadd(SESSIONS_INDEX_KEY, {session_id: datetime.now().timestamp()})
+    # 设置过期时间（1天）
+    pipe.expire(SESSIONS_INDEX_KEY, 86400)
+    pipe.execute()
     
     # 限制历史会话数量，只保留最近50个
-    max_sessions = 50
-    session_count = r.zcard(sessions_key)
-    if session_count > max_sessions:
-        # 删除最旧的会话
-        r.zremrangebyrank(sessions_key, 0, session_count - max_sessions - 1)
-    
-    # 设置过期时间（1天）
-    r.expire(sessions_key, 86400)
+    _trim_session_index(r)
 
 
-def update_session_message_count(r: redis.Redis, session_id: str):
+def update_session_message_count(r: redis.Redis, session_id: str, message_count: int = None):
     """
     更新历史记录列表中会话的消息数量
     
     Args:
         r: Redis客户端实例
         session_id: 会话ID
+        message_count: 最新的消息数量，为None时在原值基础上加1
     """
-    sessions_key = 'chat:sessions:list'
-    
-    # 获取所有会话
-    sessions = r.zrevrange(sessions_key, 0, -1)
-    
-    # 查找并更新指定会话
-    for session_json in sessions:
-        try:
-            session_info = json.loads(session_json)
-            if session_info.get('session_id') == session_id:
-                # 实时计算消息数量
-                key = f'chat:history:{session_id}'
-                history_list = r.lrange(key, 0, -1)
-                new_message_count = len(history_list)
-                
-                # 如果消息数量有变化，更新会话信息
-                if session_info.get('message_count') != new_message_count:
-                    session_info['message_count'] = new_message_count
-                    # 更新最后一条记录的时间
-                    if history_list:
-                        last_record = json.loads(history_list[-1])
-                        session_info['update_time'] = last_record.get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-                    
-                    # 删除旧的，添加新的（保持时间戳不变，只更新内容）
-                    # 获取原来的时间戳
-                    old_score = r.zscore(sessions_key, session_json)
-                    if old_score is not None:
-                        r.zrem(sessions_key, session_json)
-                        r.zadd(sessions_key, {json.dumps(session_info, ensure_ascii=False): old_score})
-                break
-        except Exception as e:
-            print(f"更新会话消息数量失败: {str(e)}")
-            continue
+    # 只更新已在历史列表中的会话
+    if r.zscore(SESSIONS_INDEX_KEY, session_id) is None:
+        return
+    meta_key = session_meta_key(session_id)
+    pipe = r.pipeline(transaction=False)
+    if message_count is None:
+        pipe.hincrby(meta_key, 'message_count', 1)
+    else:
+        pipe.hset(meta_key, 'message_count', message_count)
+    pipe.hset(meta_key, 'update_time', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    pipe.execute()
 
 
 def update_session_title(r: redis.Redis, session_id: str, new_title: str):
@@ -229,36 +380,13 @@ def update_session_title(r: redis.Redis, session_id: str, new_title: str):
         session_id: 会话ID
         new_title: 新的标题
     """
-    sessions_key = 'chat:sessions:list'
-    
-    # 获取所有会话
-    sessions = r.zrevrange(sessions_key, 0, -1)
-    
-    # 查找并更新指定会话
-    for session_json in sessions:
-        try:
-            session_info = json.loads(session_json)
-            if session_info.get('session_id') == session_id:
-                # 更新标题
-                session_info['title'] = new_title[:50] if len(new_title) > 50 else new_title
-                # 更新消息数量
-                key = f'chat:history:{session_id}'
-                history_list = r.lrange(key, 0, -1)
-                session_info['message_count'] = len(history_list)
-                # 更新最后一条记录的时间
-                if history_list:
-                    last_record = json.loads(history_list[-1])
-                    session_info['update_time'] = last_record.get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-                
-                # 删除旧的，添加新的
-                old_score = r.zscore(sessions_key, session_json)
-                if old_score is not None:
-                    r.zrem(sessions_key, session_json)
-                    r.zadd(sessions_key, {json.dumps(session_info, ensure_ascii=False): old_score})
-                break
-        except Exception as e:
-            print(f"更新会话标题失败: {str(e)}")
-            continue
+    # 只更新已在历史列表中的会话
+    if r.zscore(SESSIONS_INDEX_KEY, session_id) is None:
+        return
+    r.hset(session_meta_key(session_id), mapping={
+        'title': new_title[:50] if len(new_title) > 50 else new_title,
+        'update_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    })
 
 
 def save_session_to_history(r: redis.Redis, session_id: str, first_question: str = None):
@@ -270,96 +398,201 @@ def save_session_to_history(r: redis.Redis, session_id: str, first_question: str
         session_id: 会话ID
         first_question: 会话的第一个问题（用作标题）
     """
-    # 获取会话信息
+    # 获取会话信息（只读取第一条和最后一条记录）
     key = f'chat:history:{session_id}'
-    history_list = r.lrange(key, 0, -1)
+    pipe = r.pipeline(transaction=False)
+    pipe.llen(key)
+    pipe.lindex(key, 0)
+    pipe.lindex(key, -1)
+    message_count, first_record, last_record = pipe.execute()
     
-    if not history_list:
+    if not message_count:
         return
     
     # 如果没有提供第一个问题，从历史记录中获取
     if not first_question:
-        first_record = json.loads(history_list[0])
-        first_question = first_record.get('question', '新对话')
+        first_question = json.loads(first_record).get('question', '新对话')
     
     # 获取最后一条记录的时间作为更新时间
-    last_record = json.loads(history_list[-1])
-    update_time = last_record.get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    update_time = json.loads(last_record).get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     
-    # 构建会话信息
-    session_info = {
+    meta_key = session_meta_key(session_id)
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(meta_key, mapping={
         'session_id': session_id,
         'title': first_question[:50] if len(first_question) > 50 else first_question,  # 标题最多50字符
         'update_time': update_time,
-        'message_count': len(history_list)
-    }
-    
-    # 保存到会话列表，使用Sorted Set按时间排序
-    sessions_key = 'chat:sessions:list'
-    r.zadd(sessions_key, {json.dumps(session_info, ensure_ascii=False): datetime.now().timestamp()})
+        'message_count': message_count
+    })
+    pipe.expire(meta_key, 2592000)
+    # 会话ID加入索引（已存在时只更新排序时间），使用Sorted Set按时间排序
+    pipe.zadd(SESSIONS_INDEX_KEY, {session_id: datetime.now().timestamp()})
+    # 设置过期时间（30天）
+    pipe.expire(SESSIONS_INDEX_KEY, 2592000)
+    pipe.execute()
     
     # 限制历史会话数量，只保留最近50个
-    max_sessions = 50
-    session_count = r.zcard(sessions_key)
-    if session_count > max_sessions:
-        # 删除最旧的会话
-        r.zremrangebyrank(sessions_key, 0, session_count - max_sessions - 1)
-    
-    # 设置过期时间（30天）
-    r.expire(sessions_key, 2592000)
+    _trim_session_index(r)
 
 
-def get_conversation_history_list(r: redis.Redis, limit: int = 50):
+def migrate_session_index(r: redis.Redis) -> int:
     """
-    获取历史会话列表
-    实时计算每个会话的消息数量，确保 message_count 准确
+    将旧版会话列表（chat:sessions:list，member 为 JSON）迁移到新的会话索引
+    同一会话存在多条记录时保留最新的一条；迁移完成后删除旧列表，重复调用无副作用
     
     Args:
         r: Redis客户端实例
-        limit: 返回的最大数量，默认50
         
     Returns:
-        list: 会话信息列表，按时间倒序排列，message_count 已实时更新
+        迁移的会话数量
     """
-    sessions_key = 'chat:sessions:list'
+    legacy_sessions = r.zrange(LEGACY_SESSIONS_KEY, 0, -1, withscores=True)
+    if not legacy_sessions:
+        return 0
     
-    # 从Sorted Set中获取，按时间戳倒序（最新的在前）
-    sessions = r.zrevrange(sessions_key, 0, limit - 1)
-    
-    result = []
-    cleaned = False
-    for session_json in sessions:
+    latest = {}
+    for session_json, score in legacy_sessions:
         try:
             session_info = json.loads(session_json)
-            session_id = session_info.get('session_id')
-            
-            # 实时计算消息数量
-            if session_id:
-                key = f'chat:history:{session_id}'
-                history_list = r.lrange(key, 0, -1)
-                session_info['message_count'] = len(history_list)
-                
-                # 如果历史列表已过期（不存在或为空），清理 sessions 列表中的残留记录
-                if (not history_list) and (not r.exists(key)):
-                    r.zrem(sessions_key, session_json)
-                    cleaned = True
-                    continue
-                
-                # 如果消息数量有变化，更新会话列表中的记录
-                # 但这里不更新，因为会影响排序，只在返回时更新 message_count
-                # 如果需要持久化更新，可以调用 update_session_message_count
-            
-            result.append(session_info)
-        except Exception as e:
-            print(f"处理会话信息失败: {str(e)}")
+        except Exception:
             continue
+        session_id = session_info.get('session_id')
+        if session_id and (session_id not in latest or score >= latest[session_id][1]):
+            latest[session_id] = (session_info, score)
+    
+    # 新索引中已存在的会话信息更新，不被旧记录覆盖
+    pipe = r.pipeline(transaction=False)
+    for session_id in latest:
+        pipe.zscore(SESSIONS_INDEX_KEY, session_id)
+    existing = {session_id for session_id, score in zip(latest, pipe.execute()) if score is not None}
+    
+    pipe = r.pipeline(transaction=False)
+    for session_id, (session_info, score) in latest.items():
+        if session_id in existing:
+            continue
+        meta_key = session_meta_key(session_id)
+        pipe.hset(meta_key, mapping={
+            'session_id': session_id,
+            'title': session_info.get('title', '新对话'),
+            'update_time': session_info.get('update_time', ''),
+            'message_count': int(session_info.get('message_count', 0))
+        })
+        pipe.expire(meta_key, 2592000)
+        pipe.zadd(SESSIONS_INDEX_KEY, {session_id: score})
+    pipe.expire(SESSIONS_INDEX_KEY, 2592000)
+    pipe.delete(LEGACY_SESSIONS_KEY)
+    pipe.execute()
+    
+    _trim_session_index(r)
+    migrated = len(latest) - len(existing)
+    print(f"已迁移 {migrated} 个历史会话到新的会话索引")
+    return migrated
+
+
+def get_conversation_history_page(r: redis.Redis, limit: int = 50, cursor: Optional[str] = None):
+    """
+    分页获取历史会话列表（游标分页）
+    会话ID与会话信息、消息数量各用一次往返读取，开销与对话内容的多少无关
     
-    # 如有清理操作，限制数量并设置过期时间
-    if cleaned:
-        r.zremrangebyrank(sessions_key, 0, -51)  # 只保留最新50条
-        r.expire(sessions_key, 86400)            # 确保会话列表过期时间为1天
+    Args:
+        r: Redis客户端实例
+        limit: 本页返回的最大数量，默认50
+        cursor: 上一页返回的游标，为None时从最新的会话开始
+        
+    Returns:
+        tuple: (sessions, next_cursor)
+            - sessions: 会话信息列表，按时间倒序排列，message_count 为实时的对话条数
+            - next_cursor: 下一页的游标，没有更多会话时为None
+    """
+    entries = _session_index_page(r, limit, cursor)
+    if not entries:
+        return [], None
+    
+    # 一次 pipeline 读取所有会话的信息和实时消息数量
+    session_ids = [_decode(session_id) for session_id, _ in entries]
+    pipe = r.pipeline(transaction=False)
+    for session_id in session_ids:
+        pipe.hgetall(session_meta_key(session_id))
+        pipe.llen(f'chat:history:{session_id}')
+    replies = pipe.execute()
     
-    return result
+    result = []
+    expired = []
+    for i, session_id in enumerate(session_ids):
+        meta, message_count = replies[2 * i], replies[2 * i + 1]
+        # 对话历史已过期（空列表即不存在）或会话信息已过期，清理索引中的残留记录
+        if not meta or not message_count:
+            expired.append(session_id)
+            continue
+        session_info = {_decode(k): _decode(v) for k, v in meta.items()}
+        session_info.pop('rolled_over', None)
+        session_info['session_id'] = session_id
+        session_info['message_count'] = message_count
+        result.append(session_info)
+    
+    # 如有清理操作，删除残留记录
+    if expired:
+        pipe = r.pipeline(transaction=False)
+        pipe.zrem(SESSIONS_INDEX_KEY, *expired)
+        pipe.delete(*[session_meta_key(session_id) for session_id in expired])
+        pipe.execute()
+    
+    next_cursor = None
+    if len(entries) == limit:
+        last_id, last_score = entries[-1]
+        next_cursor = f'{last_score!r}:{_decode(last_id)}'
+    return result, next_cursor
+
+
+def _session_index_page(r: redis.Redis, limit: int, cursor: Optional[str] = None):
+    """
+    按游标读取会话索引的一页
+    
+    游标为上一页最后一个会话的 "score:会话ID"。score 相同的会话按会话ID倒序排列，
+    因此本页从该 score（包含）开始读取，并跳过 score 相同、会话ID不小于游标的会话（已在上一页返回）；
+    只有 score 的旧游标按不包含该 score 处理
+    
+    Args:
+        r: Redis客户端实例
+        limit: 本页返回的最大数量
+        cursor: 上一页返回的游标，为None时从最新的会话开始
+        
+    Returns:
+        list: [(会话ID, score)]，按 score 倒序
+    """
+    if not cursor:
+        return r.zrevrangebyscore(SESSIONS_INDEX_KEY, '+inf', '-inf', start=0, num=limit, withscores=True)
+    score, _, last_id = cursor.partition(':')
+    if not last_id:
+        return r.zrevrangebyscore(SESSIONS_INDEX_KEY, f'({score}', '-inf', start=0, num=limit, withscores=True)
+    
+    # 多取与游标 score 相同的会话数量，保证跳过已返回的会话后仍有 limit 条
+    ties = r.zcount(SESSIONS_INDEX_KEY, score, score)
+    entries = r.zrevrangebyscore(SESSIONS_INDEX_KEY, score, '-inf', start=0, num=limit + ties, withscores=True)
+    last_id_bytes = last_id.encode('utf-8')
+    last_score = float(score)
+    entries = [
+        (session_id, session_score) for session_id, session_score in entries
+        if not (session_score == last_score and
+                (session_id if isinstance(session_id, bytes) else session_id.encode('utf-8')) >= last_id_bytes)
+    ]
+    return entries[:limit]
+
+
+def get_conversation_history_list(r: redis.Redis, limit: int = 50):
+    """
+    获取历史会话列表
+    实时计算每个会话的消息数量，确保 message_count 准确
+    
+    Args:
+        r: Redis客户端实例
+        limit: 返回的最大数量，默认50
+        
+    Returns:
+        list: 会话信息列表，按时间倒序排列，message_count 已实时更新
+    """
+    sessions, _ = get_conversation_history_page(r, limit=limit)
+    return sessions
 
 
 def get_session_conversations(r: redis.Redis, session_id: str):
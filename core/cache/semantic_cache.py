@@ -0,0 +1,263 @@
+"""
+语义答案缓存
+将问题向量与近期已回答的问题做余弦相似度匹配，命中时直接返回缓存的答案和检索阶段信息，
+跳过 Milvus、知识图谱服务和 LLM 调用
+"""
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+import redis
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+
+class SemanticAnswerCache:
+    """
+    语义答案缓存
+
+    存储结构：
+        - chat:semantic:index：Sorted Set，member 为条目ID，score 为最近访问时间（用于LRU淘汰）
+        - chat:semantic:entry:{id}：Hash，保存问题、答案、检索阶段信息和归一化后的 float32 向量，
+          每个条目单独设置过期时间
+        - chat:semantic:version：条目集合的版本号，写入或淘汰条目时递增
+
+    进程内保存所有条目向量组成的矩阵，查找时只读取版本号；版本号变化时读取条目ID列表，
+    并只取回本地没有的向量，因此每次查找的 Redis 流量与缓存大小无关
+    """
+
+    INDEX_KEY = 'chat:semantic:index'
+    ENTRY_PREFIX = 'chat:semantic:entry:'
+    VERSION_KEY = 'chat:semantic:version'
+
+    # 检索阶段处于这些状态时回答可能不完整（如图谱服务超时），不写入缓存；
+    # 正常完成的阶段为 success、empty（没有结果）或 skipped（如图谱查询置信度不足未执行）
+    DEGRADED_STATUSES = ('error', 'pending')
+
+    def __init__(
+        self,
+        embedding_model,
+        r: Optional[redis.Redis] = None,
+        threshold: Optional[float] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        """
+        初始化语义答案缓存
+
+        Args:
+            embedding_model: Embedding模型实例（需提供 embed_query 方法）
+            r: Redis客户端实例，为None时每次使用 get_redis_client() 获取
+            threshold: 命中所需的最低余弦相似度
+            ttl: 每个条目的过期时间（秒）
+            max_entries: 最多缓存的条目数量，超出时按最近访问时间淘汰
+        """
+        self.embedding_model = embedding_model
+        self._redis = r
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl if ttl is not None else settings.SEMANTIC_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else settings.SEMANTIC_CACHE_MAX_ENTRIES
+        # 进程内的向量副本：条目ID -> 向量，以及按 _ids 顺序堆叠的矩阵
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._ids: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._version: Optional[bytes] = None
+        self._synced = False
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self) -> redis.Redis:
+        """Redis客户端"""
+        if self._redis is None:
+            from core.cache.redis_client import get_redis_client
+            return get_redis_client()
+        return self._redis
+
+    @staticmethod
+    def _entry_id(question: str) -> str:
+        """根据规范化后的问题生成条目ID（相同问题只保留一条）"""
+        normalized = ''.join(question.split()).lower()
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def embed(self, question: str) -> np.ndarray:
+        """
+        生成问题的归一化向量
+
+        Args:
+            question: 问题文本
+
+        Returns:
+            L2归一化后的 float32 向量
+        """
+        vector = np.asarray(self.embedding_model.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _sync(self, r: "redis.Redis", shape: Tuple[int, ...]) -> Tuple[List[str], Optional[np.ndarray]]:
+        """
+        使进程内的向量副本与 Redis 一致
+
+        版本号未变化时直接返回本地副本；变化时读取条目ID列表，只取回本地没有的向量，
+        并移除已不在索引中的条目。向量已过期或维度与查询向量不同的条目从索引中清理
+
+        Args:
+            r: Redis客户端
+            shape: 查询向量的形状
+
+        Returns:
+            (条目ID列表, 对应的向量矩阵)，没有条目时矩阵为None
+        """
+        version = r.get(self.VERSION_KEY)
+        with self._lock:
+            if self._synced and version == self._version:
+                return self._ids, self._matrix
+
+            entry_ids = [
+                entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                for entry_id in r.zrevrange(self.INDEX_KEY, 0, self.max_entries - 1)
+            ]
+            vectors = {
+                entry_id: self._vectors[entry_id]
+                for entry_id in entry_ids
+                if entry_id in self._vectors and self._vectors[entry_id].shape == shape
+            }
+
+            # 一次往返取回本地没有的向量
+            missing = [entry_id for entry_id in entry_ids if entry_id not in vectors]
+            expired: List[str] = []
+            if missing:
+                pipe = r.pipeline(transaction=False)
+                for entry_id in missing:
+                    pipe.hget(self.ENTRY_PREFIX + entry_id, 'embedding')
+                for entry_id, blob in zip(missing, pipe.execute()):
+                    vector = np.frombuffer(blob, dtype=np.float32) if blob is not None else None
+                    if vector is None or vector.shape != shape:
+                        expired.append(entry_id)
+                        continue
+                    vectors[entry_id] = vector
+
+            # 条目已过期，清理索引中的残留并递增版本号（其他进程随之移除本地副本）
+            if expired:
+                pipe = r.pipeline(transaction=False)
+                pipe.zrem(self.INDEX_KEY, *expired)
+                pipe.incr(self.VERSION_KEY)
+                pipe.execute()
+
+            self._vectors = vectors
+            self._ids = list(vectors)
+            self._matrix = np.stack([vectors[entry_id] for entry_id in self._ids]) if self._ids else None
+            self._version = version
+            self._synced = True
+            return self._ids, self._matrix
+
+    def lookup(self, question: str, embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找语义相近的已回答问题
+
+        Args:
+            question: 问题文本
+            embedding: 问题的归一化向量，为None时自动生成
+
+        Returns:
+            命中时返回包含 question、answer、search_stages、search_path、similarity 的字典，否则返回None
+        """
+        if embedding is None:
+            embedding = self.embed(question)
+
+        r = self.redis
+        candidates, matrix = self._sync(r, embedding.shape)
+        if matrix is None:
+            return None
+
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            return None
+
+        entry_id = candidates[best]
+        entry = r.hgetall(self.ENTRY_PREFIX + entry_id)
+        if not entry:
+            # 条目已过期，清理索引中的残留（递增版本号，下次查找时从本地副本中移除）
+            pipe = r.pipeline(transaction=False)
+            pipe.zrem(self.INDEX_KEY, entry_id)
+            pipe.incr(self.VERSION_KEY)
+            pipe.execute()
+            return None
+        entry = {
+            (k.decode() if isinstance(k, bytes) else k): v
+            for k, v in entry.items()
+        }
+
+        # 更新最近访问时间（LRU）
+        r.zadd(self.INDEX_KEY, {entry_id: time.time()})
+
+        return {
+            'question': entry['question'].decode('utf-8') if isinstance(entry['question'], bytes) else entry['question'],
+            'answer': entry['answer'].decode('utf-8') if isinstance(entry['answer'], bytes) else entry['answer'],
+            'search_stages': json.loads(entry.get('search_stages') or '{}'),
+            'search_path': json.loads(entry.get('search_path') or '[]'),
+            'similarity': similarity
+        }
+
+    def store(
+        self,
+        question: str,
+        answer: str,
+        search_stages: Dict[str, Any],
+        search_path: List[str],
+        embedding: Optional[np.ndarray] = None
+    ):
+        """
+        缓存已回答的问题（任一检索阶段出错或未完成时不缓存，避免服务故障期间的不完整回答被重复返回）
+
+        Args:
+            question: 问题文本
+            answer: 答案文本
+            search_stages: 检索阶段信息
+            search_path: 检索路径
+            embedding: 问题的归一化向量，为None时自动生成
+        """
+        if not answer:
+            return
+        degraded = [
+            name for name, stage in (search_stages or {}).items()
+            if isinstance(stage, dict) and stage.get('status') in self.DEGRADED_STATUSES
+        ]
+        if degraded:
+            print(f"⚠️ 检索阶段 {degraded} 出错或未完成，回答不写入语义缓存")
+            return
+        if embedding is None:
+            embedding = self.embed(question)
+
+        entry_id = self._entry_id(question)
+        entry_key = self.ENTRY_PREFIX + entry_id
+
+        r = self.redis
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(entry_key, mapping={
+            'question': question,
+            'answer': answer,
+            'search_stages': json.dumps(search_stages, ensure_ascii=False),
+            'search_path': json.dumps(search_path, ensure_ascii=False),
+            'embedding': np.asarray(embedding, dtype=np.float32).tobytes()
+        })
+        pipe.expire(entry_key, self.ttl)
+        pipe.zadd(self.INDEX_KEY, {entry_id: time.time()})
+        pipe.incr(self.VERSION_KEY)
+        pipe.zcard(self.INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        # 超出容量时淘汰最久未访问的条目
+        if size > self.max_entries:
+            evicted = r.zpopmin(self.INDEX_KEY, size - self.max_entries)
+            if evicted:
+                pipe = r.pipeline(transaction=False)
+                pipe.delete(*[
+                    self.ENTRY_PREFIX + (member.decode() if isinstance(member, bytes) else member)
+                    for member, _ in evicted
+                ])
+                pipe.incr(self.VERSION_KEY)
+                pipe.execute()
@@ -2,7 +2,23 @@
 上下文增强模块
 用于从对话历史中提取信息，增强用户问题
 """
-from .enhancer import enhance_query_with_context, extract_entities_from_history
-
-__all__ = ['enhance_query_with_context', 'extract_entities_from_history']
+from .enhancer import (
+    EnhancementResult,
+    enhance_query_tiered,
+    enhance_query_with_context,
+    extract_entities_from_history,
+    needs_context,
+    set_entity_matcher
+)
+from .topic_memory import get_topic_memory, update_topic_memory
 
+__all__ = [
+    'EnhancementResult',
+    'enhance_query_tiered',
+    'enhance_query_with_context',
+    'extract_entities_from_history',
+    'needs_context',
+    'set_entity_matcher',
+    'get_topic_memory',
+    'update_topic_memory'
+]
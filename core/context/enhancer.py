@@ -1,14 +1,138 @@
 """
 上下文增强器
 分析用户问题是否依赖上下文，并从历史对话中提取主题实体来增强问题
+
+分层增强（enhance_query_tiered）：
+1. 本地规则判断问题是否需要指代消解，问题已完整时直接返回，不调用大模型
+2. 需要补全且会话主题记忆中有主题时，按规则补全主题
+3. 以上都不满足时，才读取对话历史并调用大模型增强
 """
 import re
 import json
-from typing import List, Dict, Optional, Tuple
+import threading
+import redis
+from typing import Callable, List, Dict, Optional, Tuple
 from core.models.llm import create_openrouter_client
+from core.cache.redis_client import get_session_conversations
+from core.context.topic_memory import get_topic_memory
 from config.settings import settings
 
 
+# 进程级共享的 LLM 客户端（复用连接，首次使用时创建）
+_client = None
+_client_lock = threading.Lock()
+
+# 实体匹配器：输入文本，返回其中出现的已知实体（如知识图谱中的疾病、药物名称）
+_entity_matcher: Optional[Callable[[str], List[str]]] = None
+
+# 明确的指代词（"应该"、"因此"中的"该"、"此"不算）
+EXPLICIT_REFERENCE_PATTERN = re.compile(r'它|这个|那个|这种|那种|这些|那些|(?<!应)该|(?<!因)此|上述|前面|刚才|之前')
+
+# 承接上文的开头（如"那怎么治疗"、"还有呢"）
+CONTINUATION_PREFIX_PATTERN = re.compile(r'^(那么|那|还有|还|也|另外|其他|其它|除此之外|除了)')
+
+# 缺少主语、直接以疑问词或谓语开头的问题（如"有什么特效药"、"怎么治疗"）
+SUBJECTLESS_PREFIX_PATTERN = re.compile(
+    r'^(有什么|有哪些|有没有|哪些|什么|为什么|怎么|如何|怎样|是否|能否|能不能|可以|可不可以|需要|要不要|会不会|多久|吃什么|用什么|应该)'
+)
+
+# 判断问题长度时忽略的标点和空白
+PUNCTUATION_PATTERN = re.compile(r'[\s\?？!！。，,、；;：:“”"\'‘’…~～]+')
+
+
+def _get_client():
+    """获取共享的 LLM 客户端（首次调用时创建）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_openrouter_client()
+    return _client
+
+
+def set_entity_matcher(matcher: Optional[Callable[[str], List[str]]]):
+    """
+    设置实体匹配器
+    问题中出现已知实体时视为完整问题，不需要增强
+
+    Args:
+        matcher: 输入文本返回实体列表的函数，为None时取消
+    """
+    global _entity_matcher
+    _entity_matcher = matcher
+
+
+def match_entities(text: str) -> List[str]:
+    """
+    使用实体匹配器查找文本中的已知实体
+
+    Args:
+        text: 文本
+
+    Returns:
+        list: 实体列表，未设置匹配器或匹配失败时返回空列表
+    """
+    if _entity_matcher is None or not text:
+        return []
+    try:
+        return list(_entity_matcher(text))
+    except Exception as e:
+        print(f"⚠️ 实体匹配失败: {str(e)}")
+        return []
+
+
+def needs_context(query: str, entities: Optional[List[str]] = None) -> bool:
+    """
+    本地判断问题是否需要结合上下文补全（不调用大模型）
+
+    Args:
+        query: 用户问题
+        entities: 问题中匹配到的已知实体，为None时使用实体匹配器查找
+
+    Returns:
+        bool: 需要指代消解返回True，问题已完整返回False
+    """
+    if entities is None:
+        entities = match_entities(query)
+    if entities:
+        return False
+
+    core = PUNCTUATION_PATTERN.sub('', query)
+    if not core:
+        return False
+    if EXPLICIT_REFERENCE_PATTERN.search(core):
+        return True
+    if CONTINUATION_PREFIX_PATTERN.match(core) or SUBJECTLESS_PREFIX_PATTERN.match(core):
+        return True
+    return len(core) <= settings.CONTEXT_SHORT_QUERY_LENGTH
+
+
+def apply_topic(query: str, main_topic: str) -> Tuple[str, bool]:
+    """
+    将主题补充到问题前
+
+    Args:
+        query: 用户问题
+        main_topic: 主题
+
+    Returns:
+        tuple: (enhanced_query, was_enhanced)
+    """
+    main_topic = (main_topic or '').strip()
+    # 检查问题是否已经包含主题（避免重复），并过滤不合理的主题
+    if not main_topic or main_topic in query or len(main_topic) < 2 or len(main_topic) > 10:
+        return query, False
+
+    # 根据问题类型增强
+    if '有什么' in query or '哪些' in query:
+        return f"{main_topic}{query}", True
+    if '怎么' in query or '如何' in query or '怎样' in query:
+        return f"{main_topic}{query}", True
+    if '什么' in query:
+        return f"{main_topic}{query}", True
+    return f"{main_topic}，{query}", True
+
+
 def has_reference_pronouns(query: str) -> bool:
     """
     检测问题是否包含指代性词语（如"有什么"、"怎么"、"如何"等）
@@ -80,10 +204,21 @@ def extract_entities_from_history(history: List[Dict[str, str]], max_history: in
     
     if not recent_history:
         return entities
-    
+
+    # 优先使用实体匹配器在历史问题中查找已知实体（第一个即主题），找到时不调用大模型
+    linked = []
+    for record in recent_history:
+        for entity in match_entities(record.get('question', '')):
+            if entity not in linked:
+                linked.append(entity)
+    if linked:
+        entities['topics'] = linked[:1]
+        entities['entities'] = linked
+        return entities
+
     try:
         # 使用大模型提取主题实体
-        client = create_openrouter_client()
+        client = _get_client()
         
         # 构建对话历史文本
         history_text = ""
@@ -206,13 +341,28 @@ def enhance_query_with_context(
             - enhanced_query: 增强后的问题
             - was_enhanced: 是否进行了增强
     """
+    enhanced_query, was_enhanced, _ = _enhance_with_llm(query, history, max_history)
+    return enhanced_query, was_enhanced
+
+
+def _enhance_with_llm(
+    query: str,
+    history: List[Dict[str, str]],
+    max_history: int = 5
+) -> Tuple[str, bool, Optional[str]]:
+    """
+    使用大模型根据对话历史增强问题
+
+    Returns:
+        tuple: (enhanced_query, was_enhanced, main_topic)，main_topic 为当前问题的核心主题（可能为None）
+    """
     # 如果没有历史记录，直接返回原问题
     if not history:
-        return query, False
+        return query, False, None
     
     try:
         # 使用大模型进行智能增强
-        client = create_openrouter_client()
+        client = _get_client()
         
         # 只使用最近的历史记录
         recent_history = history[-max_history:] if len(history) > max_history else history
@@ -243,7 +393,8 @@ def enhance_query_with_context(
 {
     "need_enhance": true/false,
     "enhanced_query": "增强后的问题（如果需要增强）",
-    "reason": "增强原因或说明"
+    "reason": "增强原因或说明",
+    "main_topic": "当前问题（增强后）讨论的核心主题（2-4个字，没有明确主题时为空字符串）"
 }
 
 如果不需要增强，enhanced_query 应该等于原问题。"""
@@ -302,6 +453,7 @@ def enhance_query_with_context(
                 raise
         
         # 处理结果
+        main_topic = (result.get('main_topic') or '').strip() or None
         if result.get('need_enhance', False) and result.get('enhanced_query'):
             enhanced_query = result['enhanced_query'].strip()
             # 验证增强后的问题是否合理
@@ -309,10 +461,10 @@ def enhance_query_with_context(
                 print(f"✅ 问题已增强: {query} -> {enhanced_query}")
                 if result.get('reason'):
                     print(f"   原因: {result['reason']}")
-                return enhanced_query, True
+                return enhanced_query, True, main_topic
         
         # 不需要增强或增强失败，返回原问题
-        return query, False
+        return query, False, main_topic
         
     except Exception as e:
         # 如果大模型增强失败，使用简单的回退策略
@@ -320,7 +472,7 @@ def enhance_query_with_context(
         
         # 回退策略：简单的指代检测和主题提取
         if not has_reference_pronouns(query):
-            return query, False
+            return query, False, None
         
         # 从历史中提取实体
         entities = extract_entities_from_history(history, max_history)
@@ -334,26 +486,67 @@ def enhance_query_with_context(
         
         # 如果找到了主题，增强问题
         if main_topic:
-            # 检查问题是否已经包含主题（避免重复）
-            if main_topic in query:
-                return query, False
-            
-            # 清理主题
-            main_topic = main_topic.strip()
-            if len(main_topic) < 2 or len(main_topic) > 10:
-                return query, False
-            
-            # 根据问题类型增强
-            if '有什么' in query or '哪些' in query:
-                enhanced = f"{main_topic}{query}"
-            elif '怎么' in query or '如何' in query or '怎样' in query:
-                enhanced = f"{main_topic}{query}"
-            elif '什么' in query:
-                enhanced = f"{main_topic}{query}"
-            else:
-                enhanced = f"{main_topic}，{query}"
-            
-            return enhanced, True
+            enhanced, was_enhanced = apply_topic(query, main_topic)
+            return enhanced, was_enhanced, main_topic.strip()
         
-        return query, False
+        return query, False, None
+
+
+class EnhancementResult:
+    """分层增强的结果"""
+
+    def __init__(self, query: str, enhanced_query: str, was_enhanced: bool, tier: str, main_topic: Optional[str] = None):
+        """
+        初始化结果
+
+        Args:
+            query: 原问题
+            enhanced_query: 增强后的问题
+            was_enhanced: 是否进行了增强
+            tier: 使用的层级（self_contained / topic_memory / llm / no_context）
+            main_topic: 本轮问题的核心主题（用于更新会话主题记忆），无法确定时为None
+        """
+        self.query = query
+        self.enhanced_query = enhanced_query
+        self.was_enhanced = was_enhanced
+        self.tier = tier
+        self.main_topic = main_topic
+
+
+def enhance_query_tiered(query: str, r: redis.Redis, session_id: str, max_history: int = 5) -> EnhancementResult:
+    """
+    分层增强用户问题，只在需要时读取Redis和调用大模型
+
+    1. self_contained：问题已完整（包含已知实体或没有指代），直接返回原问题
+    2. topic_memory：会话主题记忆中有主题，按规则补全，不调用大模型
+    3. llm：读取最近的对话历史，由大模型增强
+    4. no_context：需要补全但没有任何上下文，返回原问题
+
+    Args:
+        query: 用户当前问题
+        r: Redis客户端实例
+        session_id: 会话ID
+        max_history: 大模型增强时最多使用最近几条历史记录，默认5条
+
+    Returns:
+        EnhancementResult
+    """
+    entities = match_entities(query)
+    if not needs_context(query, entities):
+        return EnhancementResult(query, query, False, 'self_contained', entities[0] if entities else None)
+
+    memory_topic = get_topic_memory(r, session_id).get('main_topic')
+    if memory_topic:
+        enhanced_query, was_enhanced = apply_topic(query, memory_topic)
+        return EnhancementResult(query, enhanced_query, was_enhanced, 'topic_memory', memory_topic)
+
+    history = get_session_conversations(r, session_id)
+    if not history:
+        return EnhancementResult(query, query, False, 'no_context')
 
+    enhanced_query, was_enhanced, main_topic = _enhance_with_llm(query, history, max_history)
+    if main_topic is None:
+        # 大模型未给出主题时，用实体匹配器从增强后的问题中查找
+        matched = match_entities(enhanced_query)
+        main_topic = matched[0] if matched else None
+    return EnhancementResult(query, enhanced_query, was_enhanced, 'llm', main_topic)
@@ -0,0 +1,75 @@
+"""
+会话主题记忆
+在Redis中为每个会话保存当前讨论的主题，每次回答后增量更新，
+后续的指代性问题可直接用它补全，无需重新读取并总结最近几轮对话
+"""
+import time
+import redis
+from typing import Dict, Optional
+
+from config.settings import settings
+
+
+TOPIC_MEMORY_PREFIX = 'chat:topic:'
+
+
+def topic_memory_key(session_id: str) -> str:
+    """
+    获取会话主题记忆的key
+
+    Args:
+        session_id: 会话ID
+
+    Returns:
+        key，格式：chat:topic:{session_id}
+    """
+    return f'{TOPIC_MEMORY_PREFIX}{session_id}'
+
+
+def get_topic_memory(r: redis.Redis, session_id: str) -> Dict[str, str]:
+    """
+    读取会话主题记忆
+
+    Args:
+        r: Redis客户端实例
+        session_id: 会话ID
+
+    Returns:
+        dict: 包含 main_topic、last_query、updated_at，不存在时返回空字典
+    """
+    memory = r.hgetall(topic_memory_key(session_id))
+    return {
+        (k.decode('utf-8') if isinstance(k, bytes) else k): (v.decode('utf-8') if isinstance(v, bytes) else v)
+        for k, v in memory.items()
+    }
+
+
+def update_topic_memory(
+    r: redis.Redis,
+    session_id: str,
+    query: str,
+    main_topic: Optional[str] = None,
+    expire: Optional[int] = None
+):
+    """
+    回答完成后更新会话主题记忆
+
+    本轮确定了主题时覆盖保存；本轮无法在本地确定主题（可能已换话题）时删除旧主题，
+    避免下一个指代性问题被补全成过期的主题，此时会回退到大模型增强
+
+    Args:
+        r: Redis客户端实例
+        session_id: 会话ID
+        query: 本轮（增强后的）问题
+        main_topic: 本轮问题的核心主题，为None表示无法确定
+        expire: 过期时间（秒），为None时使用 CONTEXT_TOPIC_TTL
+    """
+    key = topic_memory_key(session_id)
+    pipe = r.pipeline()
+    if main_topic:
+        pipe.hset(key, mapping={'main_topic': main_topic})
+    else:
+        pipe.hdel(key, 'main_topic')
+    pipe.hset(key, mapping={'last_query': query, 'updated_at': str(int(time.time()))})
+    pipe.expire(key, expire or settings.CONTEXT_TOPIC_TTL)
+    pipe.execute()
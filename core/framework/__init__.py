@@ -7,6 +7,8 @@ from .schema_generator import SchemaGenerator
 from .schema_config import SchemaConfig
 from .graph_builder import GraphBuilder
 from .prompt_generator import PromptGenerator
+from .schema_registry import SchemaRegistry, SchemaEntry, get_schema_registry
+from .cypher_templates import TemplateMatcher, TemplateMatch
 
 # 延迟导入SchemaInferrer和NL2CypherService，因为它们依赖openai
 try:
@@ -19,6 +21,11 @@ try:
         'SchemaConfig',
         'GraphBuilder',
         'PromptGenerator',
+        'SchemaRegistry',
+        'SchemaEntry',
+        'get_schema_registry',
+        'TemplateMatcher',
+        'TemplateMatch',
         'NL2CypherService',
     ]
 except ImportError:
@@ -28,5 +35,10 @@ except ImportError:
         'SchemaConfig',
         'GraphBuilder',
         'PromptGenerator',
+        'SchemaRegistry',
+        'SchemaEntry',
+        'get_schema_registry',
+        'TemplateMatcher',
+        'TemplateMatch',
     ]
 
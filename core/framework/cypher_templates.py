@@ -0,0 +1,248 @@
+"""
+Cypher 查询模板
+根据图模式（PromptGenerator 推断的关系中文关键词）和问题中提到的实体，
+直接识别"单实体 + 单关系"的问题（如"感冒有什么症状"），生成参数化的 Cypher 查询，无需调用 LLM
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.framework.prompt_generator import PromptGenerator
+from core.graph.entity_index import name_property
+from core.graph.schemas import GraphSchema, RelationshipSchema
+
+
+# 节点中文描述的常用别称（只收录两个字以上的词，单字在问题中太常见，如"感冒药"中的"药"）
+TERM_ALIASES = {
+    '药物': ['药品'],
+    '食物': ['食品'],
+    '检查': ['检测', '化验'],
+}
+
+# 询问目标类型的句式：疑问词 + 类型表达（如"什么症状"），或类型表达 + 疑问词（如"症状有哪些"）
+QUESTION_PREFIXES = ['什么', '哪些', '哪种', '哪个', '哪类']
+QUESTION_SUFFIXES = ['有哪些', '是什么', '有什么']
+
+# 不含类型表达的常用问法（如"吃什么"询问食物、"什么药"询问药物）
+QUESTION_PATTERNS = {
+    '药物': ['什么药', '哪些药', '哪种药'],
+    '食物': ['吃什么', '吃哪些'],
+    '疾病': ['什么病', '哪些病', '哪种病'],
+    '科室': ['什么科', '哪个科', '哪些科'],
+}
+
+# 模板匹配的置信度：问题（去掉实体名称和标点）被句式和关键词完全覆盖时为最高值，覆盖越少越低，
+# 低于最低值时交给 LLM 生成
+TEMPLATE_MAX_CONFIDENCE = 0.95
+TEMPLATE_MIN_CONFIDENCE = 0.75
+
+# 最高分模板至少领先第二名的字符数，否则认为无法确定关系
+TEMPLATE_MIN_MARGIN = 2
+
+
+class CypherTemplate:
+    """单关系查询模板：已知关系一端的实体，查询另一端的实体"""
+
+    def __init__(
+        self,
+        rel: RelationshipSchema,
+        reverse: bool,
+        known_prop: str,
+        answer_prop: str,
+        answer_terms: List[str],
+        keywords: List[str],
+        patterns: Optional[List[str]] = None
+    ):
+        """
+        初始化模板
+
+        Args:
+            rel: 关系模式
+            reverse: 为False时已知起点查询终点，为True时已知终点查询起点
+            known_prop: 已知实体的名称属性
+            answer_prop: 查询目标的名称属性
+            answer_terms: 查询目标类型的中文表达（如"症状"）
+            keywords: 关系的中文关键词（如"不能"、"推荐"），用于区分指向同一类型的多个关系，问题中必须出现其一
+            patterns: 询问目标类型的句式（如"什么症状"），问题中必须出现其一；为None时由 answer_terms 生成
+        """
+        self.rel = rel
+        self.reverse = reverse
+        self.known_label = rel.to_node if reverse else rel.from_node
+        self.answer_label = rel.from_node if reverse else rel.to_node
+        self.known_prop = known_prop
+        self.answer_prop = answer_prop
+        self.answer_terms = answer_terms
+        self.keywords = keywords
+        self.patterns = patterns if patterns is not None else question_patterns(answer_terms)
+        arrow = '<-' if reverse else '->'
+        self.name = f"{self.known_label}{arrow}{rel.type}{arrow}{self.answer_label}"
+
+    def score(self, text: str) -> int:
+        """
+        计算问题（已去掉实体名称）与模板的匹配分数
+
+        Args:
+            text: 去掉实体名称后的问题
+
+        Returns:
+            询问句式、目标类型表达和关系关键词在问题中覆盖的字符数；没有出现询问句式时为0
+        """
+        if not any(pattern in text for pattern in self.patterns):
+            return 0
+        covered = set()
+        for term in self.patterns + self.answer_terms + self.keywords:
+            start = text.find(term)
+            while start != -1:
+                covered.update(range(start, start + len(term)))
+                start = text.find(term, start + 1)
+        return len(covered)
+
+    def has_keyword(self, text: str) -> bool:
+        """问题中是否出现了关系关键词"""
+        return any(keyword in text for keyword in self.keywords)
+
+    def build(self, entity_name: str, limit: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        生成参数化的 Cypher 查询
+
+        Args:
+            entity_name: 已知实体名称
+            limit: 返回结果数量上限（可选）
+
+        Returns:
+            (Cypher查询, 查询参数)
+        """
+        if self.reverse:
+            pattern = f"(t:{self.answer_label})-[:{self.rel.type}]->(e:{self.known_label})"
+        else:
+            pattern = f"(e:{self.known_label})-[:{self.rel.type}]->(t:{self.answer_label})"
+        cypher_query = (
+            f"MATCH {pattern} WHERE e.{self.known_prop} = $name "
+            f"RETURN DISTINCT t.{self.answer_prop} AS name"
+        )
+        parameters: Dict[str, Any] = {'name': entity_name}
+        if limit:
+            cypher_query += " LIMIT $limit"
+            parameters['limit'] = limit
+        return cypher_query, parameters
+
+
+class TemplateMatch:
+    """模板匹配结果"""
+
+    def __init__(self, template: CypherTemplate, entity_name: str, cypher_query: str, parameters: Dict[str, Any],
+                 confidence: float = TEMPLATE_MAX_CONFIDENCE):
+        self.template = template
+        self.entity_name = entity_name
+        self.cypher_query = cypher_query
+        self.parameters = parameters
+        self.confidence = confidence
+
+
+def question_patterns(answer_terms: List[str]) -> List[str]:
+    """
+    生成询问目标类型的句式
+
+    Args:
+        answer_terms: 目标类型的中文表达（第一个为节点描述）
+
+    Returns:
+        句式列表（如"什么症状"、"症状有哪些"）
+    """
+    patterns = []
+    for term in answer_terms:
+        patterns.extend(prefix + term for prefix in QUESTION_PREFIXES)
+        patterns.extend(term + suffix for suffix in QUESTION_SUFFIXES)
+    return patterns + QUESTION_PATTERNS.get(answer_terms[0], [])
+
+
+class TemplateMatcher:
+    """
+    基于模板的问题识别
+
+    为图模式中的每个关系生成正向、反向两个模板；问题只提到一个实体、只询问一种目标类型、
+    同时出现询问句式和关系关键词、最高分模板明显领先且置信度足够时才认为匹配可信，否则交给 LLM 生成
+    """
+
+    def __init__(self, schema: GraphSchema):
+        """
+        根据图模式生成模板
+
+        Args:
+            schema: 图模式
+        """
+        generator = PromptGenerator(schema)
+        properties = {node.label: node.properties for node in schema.nodes}
+        self.templates: Dict[str, List[CypherTemplate]] = {}
+
+        for rel in schema.relationships:
+            from_prop = name_property(properties.get(rel.from_node, {}))
+            to_prop = name_property(properties.get(rel.to_node, {}))
+            if not from_prop or not to_prop:
+                continue
+            keywords = generator.relationship_keywords(rel)
+            for reverse in (False, True):
+                answer_label = rel.from_node if reverse else rel.to_node
+                description = generator.node_description(answer_label)
+                template = CypherTemplate(
+                    rel,
+                    reverse,
+                    known_prop=to_prop if reverse else from_prop,
+                    answer_prop=from_prop if reverse else to_prop,
+                    answer_terms=[description] + TERM_ALIASES.get(description, []),
+                    keywords=keywords
+                )
+                self.templates.setdefault(template.known_label, []).append(template)
+
+    def match(
+        self,
+        question: str,
+        mentions: List[Tuple[str, str, int]],
+        limit: Optional[int] = None
+    ) -> Optional[TemplateMatch]:
+        """
+        匹配问题
+
+        Args:
+            question: 用户问题
+            mentions: 问题中提到的实体（EntityIndex.find 的结果）
+            limit: 返回结果数量上限（可选）
+
+        Returns:
+            TemplateMatch，没有可信的匹配时返回None
+        """
+        names = {name for name, _, _ in mentions}
+        if len(names) != 1:
+            return None
+        entity_name = names.pop()
+        # 去掉实体名称和标点（替换为空格，避免关键词跨越边界匹配）
+        text = re.sub(r'[\W_]+', ' ', question.replace(entity_name, ' '))
+
+        scored = []
+        for _, label, _ in mentions:
+            for template in self.templates.get(label, []):
+                score = template.score(text)
+                if score:
+                    scored.append((score, template))
+        if not scored:
+            return None
+        if len({template.answer_label for _, template in scored}) > 1:
+            # 同时询问多种类型（如"感冒不能吃什么药"中的"吃什么"和"什么药"），交给 LLM 判断
+            return None
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        best_score, template = scored[0]
+        if not template.has_keyword(text):
+            # 只有询问句式、没有关系关键词（如"感冒的症状是什么原因引起的"）
+            return None
+        if len(scored) > 1 and best_score - scored[1][0] < TEMPLATE_MIN_MARGIN:
+            # 多个模板得分接近（如"感冒吃什么"），交给 LLM 判断
+            return None
+
+        # 置信度随覆盖比例在 0.5 ~ TEMPLATE_MAX_CONFIDENCE 之间线性变化
+        coverage = best_score / max(len(text.replace(' ', '')), 1)
+        confidence = round(0.5 + (TEMPLATE_MAX_CONFIDENCE - 0.5) * coverage, 2)
+        if confidence < TEMPLATE_MIN_CONFIDENCE:
+            return None
+
+        cypher_query, parameters = template.build(entity_name, limit)
+        return TemplateMatch(template, entity_name, cypher_query, parameters, confidence)
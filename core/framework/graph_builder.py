@@ -3,11 +3,20 @@
 根据推断出的图模式动态构建知识图谱
 """
 import json
+import random
 import re
-from typing import Dict, Any, List, Set, Optional, Tuple
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Set, Optional, Tuple
 from pathlib import Path
+from neo4j.exceptions import TransientError
+from config.settings import settings
 from core.graph.neo4j_client import Neo4jClient
-from core.framework.data_reader import DataReader
+from core.graph.result_cache import bump_graph_generation
+from core.graph.entity_index import EntityIndex
+from core.graph.schema_provisioner import SchemaProvisioner
 from core.framework.schema_config import SchemaConfig
 from core.graph.schemas import GraphSchema, NodeSchema, RelationshipSchema
 
@@ -15,16 +24,23 @@ from core.graph.schemas import GraphSchema, NodeSchema, RelationshipSchema
 class GraphBuilder:
     """通用图谱构建器类"""
     
-    def __init__(self, schema: GraphSchema, neo4j_client: Optional[Neo4jClient] = None):
+    def __init__(self, schema: GraphSchema, neo4j_client: Optional[Neo4jClient] = None,
+                 entity_batch_size: Optional[int] = None, relationship_workers: Optional[int] = None):
         """
         初始化图谱构建器
         
         Args:
             schema: GraphSchema对象，包含节点和关系定义
             neo4j_client: Neo4j客户端，如果为None则自动创建
+            entity_batch_size: 主实体每批写入的行数（主实体属性较多时可单独调小），为None时使用 build_graph 的 batch_size
+            relationship_workers: 并行写入关系的线程数，为None时使用 GRAPH_BUILD_RELATIONSHIP_WORKERS
         """
         self.schema = schema
         self.client = neo4j_client or Neo4jClient()
+        self.entity_batch_size = entity_batch_size
+        self.relationship_workers = max(1, relationship_workers or settings.GRAPH_BUILD_RELATIONSHIP_WORKERS)
+        self.max_retries = settings.GRAPH_BUILD_MAX_RETRIES
+        self.retry_backoff = settings.GRAPH_BUILD_RETRY_BACKOFF
         
         # 构建节点标签映射（label -> NodeSchema）
         self.node_schemas = {node.label: node for node in schema.nodes}
@@ -43,6 +59,9 @@ class GraphBuilder:
         
         # 数据解析映射（字段名 -> 关系类型 -> 目标节点）
         self.field_mapping = self._build_field_mapping()
+        
+        # 构建完成后由本次写入的节点名称生成的实体索引（可直接用于实体链接，无需再读取 Neo4j）
+        self.entity_index: Optional[EntityIndex] = None
     
     def _identify_main_entity(self) -> str:
         """
@@ -287,14 +306,17 @@ class GraphBuilder:
         
         return main_entity_props, relationships
     
-    def build_graph(self, data_file: str, batch_size: int = 100, clear_existing: bool = False):
+    def build_graph(self, data_file: str, batch_size: int = 100, clear_existing: bool = False,
+                    streaming: bool = False, provision: bool = True):
         """
         构建知识图谱
         
         Args:
             data_file: 数据文件路径
-            batch_size: 批量处理大小
+            batch_size: 批量处理大小（每次 UNWIND 写入的最大行数）
             clear_existing: 是否清空现有图谱
+            streaming: 是否流式构建（边解析边按批写入，内存占用与 batch_size 成正比，与数据量无关）
+            provision: 写入前是否创建名称属性的约束和索引（MERGE / MATCH 按名称查找节点时使用）
         """
         print("=" * 80)
         print("开始构建知识图谱")
@@ -317,68 +339,13 @@ class GraphBuilder:
             print(f"节点类型: {[node.label for node in self.schema.nodes]}")
             print(f"关系类型: {[rel.type for rel in self.schema.relationships]}")
             
-            print(f"\n[步骤2] 读取完整数据文件: {data_file}")
-            reader = DataReader(data_file)
-            
-            # 批量处理数据
-            main_entities = []
-            all_relationships = []
-            node_collections: Dict[str, Set[str]] = {node.label: set() for node in self.schema.nodes}
-            
-            count = 0
-            with open(data_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    
-                    try:
-                        data = json.loads(line.strip())
-                        main_props, relationships = self.parse_data(data)
-                        
-                        # 收集主实体
-                        if main_props.get('name'):
-                            main_entities.append(main_props)
-                            node_collections[self.main_entity_label].add(main_props['name'])
-                        
-                        # 收集关系和关联实体
-                        for rel_type, target_label, target_name, extra_props in relationships:
-                            all_relationships.append((main_props.get('name'), rel_type, target_label, target_name))
-                            node_collections[target_label].add(target_name)
-                        
-                        count += 1
-                        if count % 100 == 0:
-                            print(f"  已解析 {count} 条数据...")
-                    
-                    except Exception as e:
-                        print(f"  警告: 解析第 {count + 1} 行数据失败: {str(e)}")
-                        continue
-            
-            print(f"✅ 数据读取完成，共 {count} 条记录")
-            print(f"  主实体数量: {len(main_entities)}")
-            print(f"  关系数量: {len(all_relationships)}")
-            
-            # 步骤3: 根据模式动态解析数据（已在上面完成）
-            print(f"\n[步骤3] 数据解析完成")
-            print(f"  识别到的主实体: {self.main_entity_label} ({len(main_entities)} 个)")
-            for label, nodes in node_collections.items():
-                if nodes:
-                    print(f"  识别到的关联实体: {label} ({len(nodes)} 个)")
-            
-            # 步骤4: 批量创建节点和关系
-            print(f"\n[步骤4] 批量创建节点和关系...")
-            
-            # 创建所有节点
-            for label, nodes in node_collections.items():
-                if nodes:
-                    self._create_nodes_batch(label, list(nodes))
-            
-            # 创建主实体节点（带属性）
-            if main_entities:
-                self._create_main_entities_batch(main_entities)
+            if provision:
+                self._provision_schema()
             
-            # 创建关系
-            if all_relationships:
-                self._create_relationships_batch(all_relationships)
+            if streaming:
+                self._build_streaming(data_file, batch_size)
+            else:
+                self._build_in_memory(data_file, batch_size)
             
             # 步骤5: 验证图谱完整性
             print(f"\n[步骤5] 验证图谱完整性...")
@@ -396,26 +363,181 @@ class GraphBuilder:
             print("=" * 80)
         
         finally:
+            # 无论构建是否完整，图谱都可能已变化，更新版本号使服务端的查询结果缓存失效
+            self._bump_generation()
             self.client.close()
     
+    def _iter_records(self, data_file: str) -> Iterator[Tuple[Dict[str, Any], List[Tuple[str, str, str, Any]]]]:
+        """
+        逐行读取并解析数据文件（解析失败的行打印警告后跳过）
+        
+        Args:
+            data_file: 数据文件路径（JSONL）
+            
+        Yields:
+            (主实体属性字典, 关系列表)，格式同 parse_data
+        """
+        count = 0
+        with open(data_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                
+                try:
+                    data = json.loads(line.strip())
+                    parsed = self.parse_data(data)
+                except Exception as e:
+                    print(f"  警告: 解析第 {count + 1} 行数据失败: {str(e)}")
+                    continue
+                
+                count += 1
+                yield parsed
+    
+    def _build_in_memory(self, data_file: str, batch_size: int):
+        """
+        读取完整数据文件后再写入（步骤2-4），内存占用与数据量成正比
+        
+        Args:
+            data_file: 数据文件路径
+            batch_size: 每次写入的最大行数
+        """
+        print(f"\n[步骤2] 读取完整数据文件: {data_file}")
+        
+        # 批量处理数据
+        main_entities = []
+        all_relationships = []
+        node_collections: Dict[str, Set[str]] = {node.label: set() for node in self.schema.nodes}
+        
+        count = 0
+        for main_props, relationships in self._iter_records(data_file):
+            # 收集主实体
+            if main_props.get('name'):
+                main_entities.append(main_props)
+                node_collections[self.main_entity_label].add(main_props['name'])
+            
+            # 收集关系和关联实体
+            for rel_type, target_label, target_name, extra_props in relationships:
+                all_relationships.append((main_props.get('name'), rel_type, target_label, target_name))
+                node_collections[target_label].add(target_name)
+            
+            count += 1
+            if count % 100 == 0:
+                print(f"  已解析 {count} 条数据...")
+        
+        print(f"✅ 数据读取完成，共 {count} 条记录")
+        print(f"  主实体数量: {len(main_entities)}")
+        print(f"  关系数量: {len(all_relationships)}")
+        
+        # 步骤3: 根据模式动态解析数据（已在上面完成）
+        print(f"\n[步骤3] 数据解析完成")
+        print(f"  识别到的主实体: {self.main_entity_label} ({len(main_entities)} 个)")
+        for label, nodes in node_collections.items():
+            if nodes:
+                print(f"  识别到的关联实体: {label} ({len(nodes)} 个)")
+        
+        # 步骤4: 批量创建节点和关系
+        print(f"\n[步骤4] 批量创建节点和关系...")
+        
+        # 创建所有节点
+        for label, nodes in node_collections.items():
+            if nodes:
+                self._create_nodes_batch(label, list(nodes), batch_size)
+        
+        # 创建主实体节点（带属性）
+        if main_entities:
+            self._create_main_entities_batch(main_entities, batch_size)
+        
+        # 创建关系
+        if all_relationships:
+            self._create_relationships_batch(all_relationships, batch_size)
+        
+        self.entity_index = EntityIndex.from_collections(node_collections)
+        print(f"  实体索引: {len(self.entity_index)} 个名称")
+    
+    def _build_streaming(self, data_file: str, batch_size: int):
+        """
+        流式构建（步骤2-4合并）：逐行解析，节点、主实体、每种关系各自攒满 batch_size 条即写入
+        
+        写入关系前先写入所有待写入的节点和主实体，保证关系两端的节点已存在；
+        缓冲区数量由图模式决定，内存占用与 batch_size 成正比。流式构建不保存 entity_index
+        （需要全部名称，与数据量成正比），服务端从 Neo4j 加载
+        
+        Args:
+            data_file: 数据文件路径
+            batch_size: 每次写入的最大行数
+        """
+        print(f"\n[步骤2-4] 流式读取并写入数据: {data_file}（批大小 {batch_size}）")
+        
+        buffer = _StreamingBuffer(self, batch_size)
+        progress_every = batch_size * 10
+        count = 0
+        for main_props, relationships in self._iter_records(data_file):
+            buffer.add(main_props, relationships)
+            count += 1
+            if count % progress_every == 0:
+                buffer.report(count)
+        buffer.flush()
+        buffer.report(count, final=True)
+        self.entity_index = None
+    
+    def _provision_schema(self):
+        """创建名称属性的约束和索引并等待上线（失败时打印警告，继续构建）"""
+        print(f"\n[准备] 创建约束和索引...")
+        try:
+            report = SchemaProvisioner(self.client.driver, self.schema).provision()
+        except Exception as e:
+            print(f"⚠️ 创建约束和索引失败，写入时将按标签扫描: {str(e)}")
+            return
+        print(f"  新建: {report['created'] or '无'}")
+        print(f"  已存在: {len(report['existing'])} 个")
+        for index in report['recreated']:
+            print(f"  ⚠️ 索引状态为 FAILED，已删除重建: {index}")
+        for failure in report['failed']:
+            print(f"  ⚠️ {failure}")
+        if report['online']:
+            print("✅ 约束和索引已上线")
+    
+    def _bump_generation(self):
+        """更新图谱版本号"""
+        try:
+            with self.client.driver.session() as session:
+                generation = bump_graph_generation(session)
+            print(f"图谱版本号已更新: {generation}")
+        except Exception as e:
+            print(f"⚠️ 更新图谱版本号失败，查询服务的结果缓存可能需要等待重启后才会失效: {str(e)}")
+    
     def _clear_graph(self):
         """清空图谱"""
         with self.client.driver.session() as session:
             session.run("MATCH (n) DETACH DELETE n")
     
-    def _create_nodes_batch(self, label: str, node_names: List[str]):
+    def _create_nodes_batch(self, label: str, node_names: List[str], batch_size: int = 100):
         """
         批量创建简单节点（只有name属性）
         
         Args:
             label: 节点标签
             node_names: 节点名称列表
+            batch_size: 每次写入的最大行数
         """
         if not node_names:
             return
         
         print(f"  创建 {label} 节点 ({len(node_names)} 个)...")
         
+        for i in range(0, len(node_names), batch_size):
+            self._merge_nodes(label, node_names[i:i + batch_size])
+        
+        print(f"    ✅ {label} 节点创建完成")
+    
+    def _merge_nodes(self, label: str, node_names: List[str]):
+        """
+        写入一批简单节点
+        
+        Args:
+            label: 节点标签
+            node_names: 节点名称列表
+        """
         with self.client.driver.session() as session:
             # 使用 UNWIND 批量创建
             query = f"""
@@ -423,87 +545,205 @@ class GraphBuilder:
             MERGE (n:{label} {{name: node_name}})
             """
             session.run(query, nodes=node_names)
-        
-        print(f"    ✅ {label} 节点创建完成")
     
-    def _create_main_entities_batch(self, entities: List[Dict[str, Any]]):
+    def _create_main_entities_batch(self, entities: List[Dict[str, Any]], batch_size: int = 100):
         """
         批量创建主实体节点（带完整属性）
         
         Args:
             entities: 主实体属性列表
+            batch_size: 每次写入的最大行数（构建器指定了 entity_batch_size 时以其为准）
         """
         if not entities:
             return
         
         print(f"  创建 {self.main_entity_label} 节点 ({len(entities)} 个)...")
         
+        failed = self._merge_main_entities(entities, batch_size)
+        
+        if failed:
+            print(f"    ⚠️ {self.main_entity_label} 节点创建完成，{failed} 个写入失败")
+        else:
+            print(f"    ✅ {self.main_entity_label} 节点创建完成")
+    
+    def _merge_main_entities(self, entities: List[Dict[str, Any]], batch_size: int = 100) -> int:
+        """
+        按批写入主实体节点：每批一条参数化的 UNWIND 语句（SET n += row.props），在一个写事务中执行
+        
+        Args:
+            entities: 主实体属性列表
+            batch_size: 每次写入的最大行数（构建器指定了 entity_batch_size 时以其为准）
+            
+        Returns:
+            写入失败的节点数量
+        """
+        rows = []
+        for entity in entities:
+            if not entity.get('name'):
+                continue
+            props = {key: value for key, value in entity.items() if key != 'name' and value}
+            rows.append({'name': entity['name'], 'props': props})
+        
+        batch_size = self.entity_batch_size or batch_size
+        failed = 0
         with self.client.driver.session() as session:
-            for entity in entities:
-                try:
-                    # 构建 SET 子句
-                    set_clauses = []
-                    params = {'name': entity.get('name', '')}
-                    
-                    for key, value in entity.items():
-                        if key != 'name' and value:
-                            set_clauses.append(f"n.{key} = ${key}")
-                            params[key] = value
-                    
-                    if set_clauses:
-                        query = f"""
-                        MERGE (n:{self.main_entity_label} {{name: $name}})
-                        SET {', '.join(set_clauses)}
-                        """
-                    else:
-                        query = f"""
-                        MERGE (n:{self.main_entity_label} {{name: $name}})
-                        """
-                    
-                    session.run(query, **params)
-                
-                except Exception as e:
-                    print(f"    警告: 创建节点失败 {entity.get('name', 'unknown')}: {str(e)}")
+            for i in range(0, len(rows), batch_size):
+                failed += self._write_entity_rows(session, rows[i:i + batch_size])
+        return failed
+    
+    def _write_entity_rows(self, session, rows: List[Dict[str, Any]]) -> int:
+        """
+        写入一批主实体；失败时二分重试，定位并跳过无法写入的行（如属性值类型不受支持）
         
-        print(f"    ✅ {self.main_entity_label} 节点创建完成")
+        Args:
+            session: Neo4j 会话
+            rows: {'name': 名称, 'props': 其余属性} 列表
+            
+        Returns:
+            写入失败的节点数量
+        """
+        query = f"""
+        UNWIND $rows AS row
+        MERGE (n:{self.main_entity_label} {{name: row.name}})
+        SET n += row.props
+        """
+        try:
+            # 写事务由驱动对临时错误（如锁冲突）自动重试
+            session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+            return 0
+        except Exception as e:
+            if len(rows) == 1:
+                print(f"    警告: 创建节点失败 {rows[0]['name']}: {str(e)}")
+                return 1
+            middle = len(rows) // 2
+            return self._write_entity_rows(session, rows[:middle]) + self._write_entity_rows(session, rows[middle:])
     
-    def _create_relationships_batch(self, relationships: List[Tuple[str, str, str, str]]):
+    def _create_relationships_batch(self, relationships: List[Tuple[str, str, str, str]], batch_size: int = 100):
         """
-        批量创建关系
+        批量创建关系：按关系类型依次写入，同一类型内按主实体名称哈希分区，由多个工作线程并行写入
+        
+        同一主实体的关系总在同一分区中按顺序写入，减少并行事务之间的锁冲突
         
         Args:
             relationships: 关系列表，格式: (主实体名称, 关系类型, 目标节点标签, 目标节点名称)
+            batch_size: 每次写入的最大行数
+            
+        Returns:
+            dict: 关系类型 -> 写入统计（见 _load_relationship_type）
         """
         if not relationships:
-            return
+            return {}
         
         # 按关系类型分组
-        rel_groups: Dict[str, List[Tuple[str, str, str]]] = {}
+        rel_groups: Dict[str, List[Tuple[str, str]]] = {}
         for main_name, rel_type, target_label, target_name in relationships:
             key = f"{rel_type}:{target_label}"
             if key not in rel_groups:
                 rel_groups[key] = []
             rel_groups[key].append((main_name, target_name))
         
-        print(f"  创建关系 ({len(relationships)} 条)...")
+        print(f"  创建关系 ({len(relationships)} 条，{self.relationship_workers} 个写入线程)...")
+        
+        report = {}
+        for key, rels in rel_groups.items():
+            rel_type, target_label = key.split(':')
+            stats = self._load_relationship_type(rel_type, target_label, rels, batch_size)
+            report[key] = stats
+            status = "✅" if not stats['failed'] else "⚠️"
+            print(
+                f"    {status} {rel_type} 关系创建完成 ({stats['written']}/{len(rels)} 条，"
+                f"{stats['batches']} 批，耗时 {stats['seconds']:.2f}秒，{stats['rows_per_second']:.0f} 条/秒，"
+                f"重试 {stats['retries']} 次)"
+            )
+        
+        total_rows = sum(stats['written'] for stats in report.values())
+        total_seconds = sum(stats['seconds'] for stats in report.values())
+        print(f"    关系合计: {total_rows} 条，耗时 {total_seconds:.2f}秒，{total_rows / max(total_seconds, 1e-9):.0f} 条/秒")
+        return report
+    
+    def _load_relationship_type(self, rel_type: str, target_label: str, rels: List[Tuple[str, str]],
+                                batch_size: int) -> Dict[str, Any]:
+        """
+        并行写入一种关系：每个分区由一个工作线程按批顺序写入
         
-        with self.client.driver.session() as session:
-            for key, rels in rel_groups.items():
-                rel_type, target_label = key.split(':')
-                
+        Args:
+            rel_type: 关系类型
+            target_label: 目标节点标签
+            rels: (主实体名称, 目标节点名称) 列表
+            batch_size: 每次写入的最大行数
+            
+        Returns:
+            dict: written（写入条数）、failed（失败条数）、batches、retries、seconds、rows_per_second
+        """
+        stats = {'written': 0, 'failed': 0, 'batches': 0, 'retries': 0}
+        lock = threading.Lock()
+        
+        def load_partition(partition: List[Tuple[str, str]]):
+            for i in range(0, len(partition), batch_size):
+                batch = partition[i:i + batch_size]
                 try:
-                    query = f"""
-                    UNWIND $rels AS rel
-                    MATCH (a:{self.main_entity_label} {{name: rel.from}})
-                    MATCH (b:{target_label} {{name: rel.to}})
-                    MERGE (a)-[r:{rel_type}]->(b)
-                    """
-                    rel_data = [{"from": f, "to": t} for f, t in rels]
-                    session.run(query, rels=rel_data)
-                    print(f"    ✅ {rel_type} 关系创建完成 ({len(rels)} 条)")
-                
+                    retries = self._merge_relationships(rel_type, target_label, batch)
+                    with lock:
+                        stats['written'] += len(batch)
+                        stats['batches'] += 1
+                        stats['retries'] += retries
                 except Exception as e:
-                    print(f"    警告: 创建关系失败 {rel_type}: {str(e)}")
+                    with lock:
+                        stats['failed'] += len(batch)
+                        stats['batches'] += 1
+                    print(f"    警告: 创建关系失败 {rel_type}（{len(batch)} 条）: {str(e)}")
+        
+        start = time.perf_counter()
+        partitions = [p for p in partition_by_source(rels, self.relationship_workers) if p]
+        if len(partitions) <= 1:
+            for partition in partitions:
+                load_partition(partition)
+        else:
+            with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+                list(executor.map(load_partition, partitions))
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_second'] = stats['written'] / max(stats['seconds'], 1e-9)
+        return stats
+    
+    def _merge_relationships(self, rel_type: str, target_label: str, rels: List[Tuple[str, str]]) -> int:
+        """
+        在一个写事务中写入一批同类型的关系（两端节点需已存在）
+        
+        锁冲突、死锁等临时错误按指数退避重试，最多 max_retries 次
+        
+        Args:
+            rel_type: 关系类型
+            target_label: 目标节点标签
+            rels: (主实体名称, 目标节点名称) 列表
+            
+        Returns:
+            重试次数
+            
+        Raises:
+            TransientError: 重试次数用尽；其他错误直接抛出
+        """
+        query = f"""
+        UNWIND $rels AS rel
+        MATCH (a:{self.main_entity_label} {{name: rel.from}})
+        MATCH (b:{target_label} {{name: rel.to}})
+        MERGE (a)-[r:{rel_type}]->(b)
+        """
+        rel_data = [{"from": f, "to": t} for f, t in rels]
+        
+        attempt = 0
+        while True:
+            try:
+                with self.client.driver.session() as session:
+                    with session.begin_transaction() as tx:
+                        tx.run(query, rels=rel_data).consume()
+                        tx.commit()
+                return attempt
+            except TransientError:
+                if attempt >= self.max_retries:
+                    raise
+                # 指数退避并加入随机抖动，避免冲突的事务同时重试
+                time.sleep(self.retry_backoff * (2 ** attempt) * (1 + random.random()))
+                attempt += 1
     
     def _validate_graph(self) -> Dict[str, Any]:
         """
@@ -534,3 +774,130 @@ class GraphBuilder:
         
         return stats
 
+
+
+def partition_by_source(rels: List[Tuple[str, str]], partitions: int) -> List[List[Tuple[str, str]]]:
+    """
+    按主实体名称的哈希（crc32，跨进程稳定）将关系分区，同一主实体的关系总在同一分区
+    
+    Args:
+        rels: (主实体名称, 目标节点名称) 列表
+        partitions: 分区数量
+        
+    Returns:
+        分区列表（可能有空分区）
+    """
+    result: List[List[Tuple[str, str]]] = [[] for _ in range(max(1, partitions))]
+    for rel in rels:
+        result[zlib.crc32(str(rel[0]).encode('utf-8')) % len(result)].append(rel)
+    return result
+
+
+class _StreamingBuffer:
+    """流式构建的写入缓冲：简单节点按标签、关系按类型分别缓冲，攒满 batch_size 条即写入 Neo4j"""
+    
+    def __init__(self, builder: GraphBuilder, batch_size: int):
+        """
+        初始化缓冲
+        
+        Args:
+            builder: 图谱构建器（负责实际写入）
+            batch_size: 每次写入的最大行数
+        """
+        self.builder = builder
+        self.batch_size = batch_size
+        self.nodes: Dict[str, Set[str]] = {}
+        self.entities: List[Dict[str, Any]] = []
+        self.relationships: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self.written = {'nodes': 0, 'entities': 0, 'relationships': 0}
+        self.failed_entities = 0
+        self.failed_relationships = 0
+        self.retries = 0
+        self.start = time.perf_counter()
+    
+    def add(self, main_props: Dict[str, Any], relationships: List[Tuple[str, str, str, Any]]):
+        """
+        加入一条解析后的记录，缓冲区满时写入
+        
+        Args:
+            main_props: 主实体属性
+            relationships: 关系列表，格式同 parse_data
+        """
+        main_name = main_props.get('name')
+        if main_name:
+            self.entities.append(main_props)
+            if len(self.entities) >= self.batch_size:
+                self.flush_entities()
+        
+        for rel_type, target_label, target_name, _ in relationships:
+            names = self.nodes.setdefault(target_label, set())
+            names.add(target_name)
+            if len(names) >= self.batch_size:
+                self.flush_nodes(target_label)
+            
+            rels = self.relationships.setdefault((rel_type, target_label), [])
+            rels.append((main_name, target_name))
+            if len(rels) >= self.batch_size:
+                self.flush_relationships(rel_type, target_label)
+    
+    def flush_nodes(self, label: str):
+        """写入某个标签缓冲的简单节点"""
+        names = self.nodes.pop(label, None)
+        if names:
+            self.builder._merge_nodes(label, list(names))
+            self.written['nodes'] += len(names)
+    
+    def flush_entities(self):
+        """写入缓冲的主实体"""
+        if self.entities:
+            failed = self.builder._merge_main_entities(self.entities, self.batch_size)
+            self.written['entities'] += len(self.entities) - failed
+            self.failed_entities += failed
+            self.entities = []
+    
+    def flush_relationships(self, rel_type: str, target_label: str):
+        """写入某种关系缓冲的关系（先写入所有缓冲的节点，保证两端已存在）"""
+        rels = self.relationships.pop((rel_type, target_label), None)
+        if not rels:
+            return
+        for label in list(self.nodes):
+            self.flush_nodes(label)
+        self.flush_entities()
+        try:
+            self.retries += self.builder._merge_relationships(rel_type, target_label, rels)
+            self.written['relationships'] += len(rels)
+        except Exception as e:
+            self.failed_relationships += len(rels)
+            print(f"    警告: 创建关系失败 {rel_type}（{len(rels)} 条）: {str(e)}")
+    
+    def flush(self):
+        """写入所有缓冲的数据"""
+        for label in list(self.nodes):
+            self.flush_nodes(label)
+        self.flush_entities()
+        for rel_type, target_label in list(self.relationships):
+            self.flush_relationships(rel_type, target_label)
+    
+    def report(self, count: int, final: bool = False):
+        """
+        打印进度和吞吐量
+        
+        Args:
+            count: 已解析的记录数
+            final: 是否为最终汇总
+        """
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        written = self.written
+        rows = written['nodes'] + written['entities'] + written['relationships']
+        prefix = "✅ 流式构建完成，共" if final else "  已处理"
+        print(
+            f"{prefix} {count} 条记录，写入节点 {written['nodes']} 行、{self.builder.main_entity_label} {written['entities']} 行、"
+            f"关系 {written['relationships']} 行，耗时 {elapsed:.1f}秒"
+            f"（{count / elapsed:.1f} 条记录/秒，{rows / elapsed:.1f} 行/秒）"
+        )
+        if final and self.failed_entities:
+            print(f"  ⚠️ 写入失败的{self.builder.main_entity_label}: {self.failed_entities} 个")
+        if final and self.retries:
+            print(f"  关系写入因锁冲突重试: {self.retries} 次")
+        if final and self.failed_relationships:
+            print(f"  ⚠️ 写入失败的关系: {self.failed_relationships} 条")
@@ -344,22 +344,7 @@ Cypher: "MATCH ({main_var}:{main_label})-[r:{rel.type}]->({target_var}:{rel.to_n
         description = semantic['description']
         
         # 推断关键词
-        keywords = []
-        
-        # 否定关系关键词
-        if any(neg in rel_lower for neg in ['not', 'no', 'avoid', '禁止', '忌']):
-            keywords.extend(['忌', '不能', '禁止', '避免', '忌口', '忌吃', '不能吃', '禁止吃'])
-        # 推荐关系关键词
-        elif any(rec in rel_lower for rec in ['recommend', 'suggest', 'recommand', '推荐', '建议']):
-            keywords.extend(['推荐', '建议', '宜', '推荐吃', '建议吃', '推荐用'])
-        # 拥有关系关键词
-        elif rel_lower.startswith('has_') or rel_lower.startswith('have_'):
-            keywords.extend(['有', '包含', '具备', '有什么'])
-        # 动作关系关键词
-        else:
-            action = self._extract_action_from_rel(rel_type)
-            if action:
-                keywords.append(action)
+        keywords = self.relationship_keywords(rel)
         
         # 生成示例
         main_label = semantic['main_entity']
@@ -383,6 +368,48 @@ Cypher: "MATCH ({main_var}:{main_label})-[r:{rel.type}]->({target_var}:{rel.to_n
             'example': example
         }
     
+    def relationship_keywords(self, rel: RelationshipSchema) -> List[str]:
+        """
+        推断关系对应的中文关键词（如否定关系对应"忌"、"不能"）
+        
+        Args:
+            rel: 关系模式
+            
+        Returns:
+            关键词列表（无法推断时为空列表）
+        """
+        rel_lower = rel.type.lower()
+        keywords = []
+        
+        # 否定关系关键词
+        if any(neg in rel_lower for neg in ['not', 'no', 'avoid', '禁止', '忌']):
+            keywords.extend(['忌', '不能', '禁止', '避免', '忌口', '忌吃', '不能吃', '禁止吃'])
+        # 推荐关系关键词
+        elif any(rec in rel_lower for rec in ['recommend', 'suggest', 'recommand', '推荐', '建议']):
+            keywords.extend(['推荐', '建议', '宜', '推荐吃', '建议吃', '推荐用'])
+        # 拥有关系关键词
+        elif rel_lower.startswith('has_') or rel_lower.startswith('have_'):
+            keywords.extend(['有', '包含', '具备', '有什么'])
+        # 动作关系关键词
+        else:
+            action = self._extract_action_from_rel(rel.type)
+            if action:
+                keywords.append(action)
+        
+        return keywords
+    
+    def node_description(self, label: str) -> str:
+        """
+        获取节点类型的中文描述（如 Symptom -> 症状）
+        
+        Args:
+            label: 节点标签
+            
+        Returns:
+            中文描述
+        """
+        return self._get_node_description(label)
+    
     def _get_node_description(self, label: str) -> str:
         """
         获取节点的中文描述（基于命名模式自动推断）
@@ -78,6 +78,22 @@ class SchemaConfig:
         Returns:
             GraphSchema对象，如果文件不存在则返回None
         """
+        config_file = self.resolve_schema_file(domain, version)
+        if config_file is None:
+            return None
+        return self.load_schema_file(config_file)
+    
+    def resolve_schema_file(self, domain: str, version: Optional[str] = None) -> Optional[Path]:
+        """
+        查找图模式配置文件
+        
+        Args:
+            domain: 领域名称
+            version: 版本号，如果为None则查找最新版本
+            
+        Returns:
+            配置文件路径，如果文件不存在则返回None
+        """
         if version:
             config_file = self.config_dir / f"{domain}_schema_v{version}.json"
         else:
@@ -90,9 +106,18 @@ class SchemaConfig:
             files.sort(key=lambda x: self._extract_version(x.stem), reverse=True)
             config_file = files[0]
         
-        if not config_file.exists():
-            return None
+        return config_file if config_file.exists() else None
+    
+    def load_schema_file(self, config_file: Path) -> GraphSchema:
+        """
+        从指定的配置文件加载图模式
         
+        Args:
+            config_file: 配置文件路径
+            
+        Returns:
+            GraphSchema对象
+        """
         with open(config_file, 'r', encoding='utf-8') as f:
             config_data = json.load(f)
         
@@ -0,0 +1,135 @@
+"""
+图模式注册表
+进程内缓存每个 (领域, 版本) 的图模式及其派生数据（系统提示词、验证用的标签/关系集合、模式指纹、查询模板），
+配置文件修改时间变化后自动重新加载
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+from core.framework.cypher_templates import TemplateMatcher
+from core.framework.prompt_generator import PromptGenerator
+from core.framework.schema_config import SchemaConfig
+from core.graph.cypher_cache import schema_fingerprint
+from core.graph.prompts import create_system_prompt
+from core.graph.schemas import EXAMPLE_SCHEMA, GraphSchema
+
+
+class SchemaEntry:
+    """一个图模式及其预先计算好的派生数据"""
+
+    def __init__(self, schema: GraphSchema, system_prompt: str, path: Optional[Path] = None, mtime_ns: int = 0):
+        """
+        初始化条目
+
+        Args:
+            schema: 图模式
+            system_prompt: NL2Cypher 系统提示词
+            path: 配置文件路径（默认模式为None）
+            mtime_ns: 加载时配置文件的修改时间
+        """
+        self.schema = schema
+        self.system_prompt = system_prompt
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.schema_dict = schema.model_dump()
+        self.fingerprint = schema_fingerprint(schema)
+        self.node_labels = frozenset(node.label for node in schema.nodes)
+        self.rel_types = frozenset(rel.type for rel in schema.relationships)
+        self.templates = TemplateMatcher(schema)
+
+
+class SchemaRegistry:
+    """
+    图模式注册表
+
+    每个 (领域, 版本) 只加载一次；最多每 reload_interval 秒检查一次配置文件
+    （版本为None时同时重新查找最新版本），文件修改时间变化时重新加载
+    """
+
+    def __init__(self, config_dir: Optional[str] = None, reload_interval: Optional[float] = None):
+        """
+        初始化注册表
+
+        Args:
+            config_dir: 模式配置目录，为None时使用 SchemaConfig 的默认目录
+            reload_interval: 检查配置文件变化的间隔（秒），为None时使用 SCHEMA_RELOAD_INTERVAL
+        """
+        self.config = SchemaConfig(config_dir)
+        self.reload_interval = settings.SCHEMA_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        self._entries: Dict[Tuple[str, Optional[str]], SchemaEntry] = {}
+        self._checked_at: Dict[Tuple[str, Optional[str]], float] = {}
+        self._lock = threading.Lock()
+        self._default: Optional[SchemaEntry] = None
+
+    def default(self) -> SchemaEntry:
+        """
+        获取默认图模式（EXAMPLE_SCHEMA）
+
+        Returns:
+            默认模式条目
+        """
+        if self._default is None:
+            self._default = SchemaEntry(EXAMPLE_SCHEMA, create_system_prompt(str(EXAMPLE_SCHEMA.model_dump())))
+        return self._default
+
+    def get(self, domain: Optional[str] = None, version: Optional[str] = None) -> Optional[SchemaEntry]:
+        """
+        获取图模式
+
+        Args:
+            domain: 领域名称，为None时返回默认模式
+            version: 版本号，为None时使用最新版本
+
+        Returns:
+            模式条目，配置文件不存在时返回None
+        """
+        if not domain:
+            return self.default()
+
+        key = (domain, version)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - self._checked_at.get(key, 0.0) < self.reload_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            path = self.config.resolve_schema_file(domain, version)
+            if path is None:
+                self._entries.pop(key, None)
+                self._checked_at.pop(key, None)
+                return None
+
+            mtime_ns = path.stat().st_mtime_ns
+            if entry is None or entry.path != path or entry.mtime_ns != mtime_ns:
+                schema = self.config.load_schema_file(path)
+                entry = SchemaEntry(schema, PromptGenerator(schema).generate_system_prompt(), path, mtime_ns)
+                self._entries[key] = entry
+                print(f"已加载图模式: {path.name}（指纹 {entry.fingerprint}）")
+            self._checked_at[key] = now
+            return entry
+
+    def clear(self):
+        """清空已加载的模式，下次获取时重新读取配置文件"""
+        with self._lock:
+            self._entries.clear()
+            self._checked_at.clear()
+
+
+_schema_registry: Optional[SchemaRegistry] = None
+
+
+def get_schema_registry() -> SchemaRegistry:
+    """
+    获取进程级的图模式注册表（首次调用时创建）
+
+    Returns:
+        SchemaRegistry 实例
+    """
+    global _schema_registry
+    if _schema_registry is None:
+        _schema_registry = SchemaRegistry()
+    return _schema_registry
@@ -6,7 +6,11 @@ from core.graph.schemas import EXAMPLE_SCHEMA, GraphSchema, NodeSchema, Relation
 from core.graph.validators import CypherValidator, RuleBasedValidator
 from core.graph.prompts import create_system_prompt, create_validation_prompt
 from core.graph.neo4j_client import Neo4jClient
-from core.graph.models import NL2CypherRequest, CypherResponse, ValidationRequest, ValidationResponse, QueryType
+from core.graph.cypher_cache import CypherGenerationCache, schema_fingerprint, normalize_question
+from core.graph.result_cache import CypherResultCache, bump_graph_generation, read_graph_generation
+from core.graph.entity_index import EntityIndex, EntityIndexService, entity_name_properties
+from core.graph.schema_provisioner import IndexSpec, SchemaProvisioner
+from core.graph.models import NL2CypherRequest, CypherResponse, ValidationRequest, ValidationResponse, ExplanationResponse, SuggestionResponse, AnswerRequest, AnswerResponse, QueryType
 
 __all__ = [
     'EXAMPLE_SCHEMA',
@@ -18,10 +22,25 @@ __all__ = [
     'create_system_prompt',
     'create_validation_prompt',
     'Neo4jClient',
+    'CypherGenerationCache',
+    'schema_fingerprint',
+    'normalize_question',
+    'CypherResultCache',
+    'bump_graph_generation',
+    'read_graph_generation',
+    'EntityIndex',
+    'EntityIndexService',
+    'entity_name_properties',
+    'IndexSpec',
+    'SchemaProvisioner',
     'NL2CypherRequest',
     'CypherResponse',
     'ValidationRequest',
     'ValidationResponse',
+    'ExplanationResponse',
+    'SuggestionResponse',
+    'AnswerRequest',
+    'AnswerResponse',
     'QueryType'
 ]
 
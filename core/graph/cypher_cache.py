@@ -0,0 +1,190 @@
+"""
+NL2Cypher 生成结果缓存
+按 (规范化后的问题, 查询类型, 图模式指纹) 缓存生成的 Cypher 及验证结果，
+按 (文本类型, Cypher) 缓存按需生成的查询解释与改进建议，
+进程内 LRU 为第一级，可选 Redis 为多进程共享的第二级
+图模式变化后指纹随之变化，旧条目不会再被命中
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from core.graph.schemas import GraphSchema
+
+
+def schema_fingerprint(schema: GraphSchema) -> str:
+    """
+    计算图模式指纹
+
+    Args:
+        schema: 图模式
+
+    Returns:
+        模式内容的 sha256 摘要（前16位）
+    """
+    content = json.dumps(schema.model_dump(), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+def normalize_question(question: str) -> str:
+    """
+    规范化问题文本：去除首尾空白与结尾标点，合并连续空白，英文转小写
+
+    Args:
+        question: 自然语言问题
+
+    Returns:
+        规范化后的问题
+    """
+    text = re.sub(r'\s+', ' ', question.strip()).lower()
+    return re.sub(r'[?？。.!！\s]+$', '', text)
+
+
+class CypherGenerationCache:
+    """NL2Cypher 生成结果缓存（进程内 LRU + 可选 Redis）"""
+
+    REDIS_PREFIX = 'graph:cypher:'
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        use_redis: Optional[bool] = None,
+        redis_client=None
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 进程内最多缓存的条目数量，为None时使用 CYPHER_CACHE_MAX_ENTRIES
+            ttl: Redis 中条目的过期时间（秒），为None时使用 CYPHER_CACHE_TTL
+            use_redis: 是否启用 Redis 二级缓存，为None时使用 CYPHER_CACHE_REDIS_ENABLED
+            redis_client: Redis客户端实例，为None时使用 get_redis_client() 获取
+        """
+        self.max_entries = max_entries or settings.CYPHER_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.CYPHER_CACHE_TTL
+        self.use_redis = settings.CYPHER_CACHE_REDIS_ENABLED if use_redis is None else use_redis
+        self._redis = redis_client
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self):
+        """Redis客户端"""
+        if self._redis is None:
+            from core.cache.redis_client import get_redis_client
+            return get_redis_client()
+        return self._redis
+
+    @staticmethod
+    def make_key(question: str, query_type: Optional[str], fingerprint: str) -> str:
+        """
+        生成缓存键
+
+        Args:
+            question: 自然语言问题
+            query_type: 查询类型（可选）
+            fingerprint: 图模式指纹
+
+        Returns:
+            缓存键
+        """
+        raw = '\x00'.join([
+            settings.OPENROUTER_LLM_MODEL,
+            fingerprint,
+            query_type or '',
+            normalize_question(question)
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_text_key(kind: str, cypher_query: str) -> str:
+        """
+        生成查询解释、改进建议等按需生成文本的缓存键
+
+        Args:
+            kind: 文本类型（如 explanation、suggestions）
+            cypher_query: Cypher查询语句
+
+        Returns:
+            缓存键
+        """
+        raw = '\x00'.join([settings.OPENROUTER_LLM_MODEL, kind, cypher_query.strip()])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的生成结果（cypher_query、confidence、validated、validation_errors），未命中返回None
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(value)
+
+        if self.use_redis:
+            try:
+                raw = self.redis.get(self.REDIS_PREFIX + key)
+            except Exception as e:
+                print(f"⚠️ 读取 Redis Cypher 缓存失败: {str(e)}")
+                raw = None
+            if raw:
+                value = json.loads(raw)
+                self._put_local(key, value)
+                with self._lock:
+                    self.hits += 1
+                return dict(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 生成结果
+        """
+        self._put_local(key, value)
+        if self.use_redis:
+            try:
+                self.redis.set(self.REDIS_PREFIX + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            except Exception as e:
+                print(f"⚠️ 写入 Redis Cypher 缓存失败: {str(e)}")
+
+    def _put_local(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = dict(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空进程内缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        缓存统计信息
+
+        Returns:
+            包含 hits、misses、size 的字典
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,333 @@
+"""
+实体名称索引
+基于 Aho-Corasick 自动机保存知识图谱中各标签节点的名称，一次扫描即可找出问题中提到的全部实体（最长匹配），无需调用 LLM；
+EntityIndexService 持有当前索引，图谱版本号变化（重新构建）后在后台重新加载
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+from core.graph.result_cache import read_graph_generation
+from core.graph.schemas import GraphSchema
+
+
+class EntityIndex:
+    """实体名称索引（Aho-Corasick 自动机，名称 -> 标签）"""
+
+    def __init__(self, min_length: int = 2):
+        """
+        初始化索引
+
+        Args:
+            min_length: 参与匹配的最短名称长度（过短的名称容易误匹配）
+        """
+        self.min_length = min_length
+        self._labels: Dict[str, set] = {}
+        # 自动机：字典树的转移、失败指针、节点对应的名称、输出指针（最近的、对应某个名称的失败链祖先）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._word: List[Optional[str]] = [None]
+        self._output: List[int] = [0]
+        self._built = True
+
+    def add(self, name: str, label: str):
+        """
+        添加实体名称
+
+        Args:
+            name: 实体名称
+            label: 节点标签
+        """
+        name = (name or '').strip()
+        if len(name) < self.min_length:
+            return
+        labels = self._labels.get(name)
+        if labels is not None:
+            labels.add(label)
+            return
+        self._labels[name] = {label}
+
+        state = 0
+        for char in name:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._word.append(None)
+                self._output.append(0)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._word[state] = name
+        self._built = False
+
+    def add_all(self, names: Iterable[str], label: str):
+        """
+        批量添加同一标签的实体名称
+
+        Args:
+            names: 实体名称
+            label: 节点标签
+        """
+        for name in names:
+            self.add(name, label)
+
+    def build(self):
+        """计算失败指针和输出指针（添加名称后首次查找时自动调用）"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            self._output[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] = fail if self._word[fail] is not None else self._output[fail]
+                queue.append(next_state)
+
+        self._built = True
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def labels_of(self, name: str) -> List[str]:
+        """
+        获取实体名称所属的标签
+
+        Args:
+            name: 实体名称
+
+        Returns:
+            标签列表（不存在时为空列表）
+        """
+        return sorted(self._labels.get(name, ()))
+
+    def find(self, text: str) -> List[Tuple[str, str, int]]:
+        """
+        查找文本中提到的实体：同一位置取最长的名称，从左到右取互不重叠的匹配
+
+        Args:
+            text: 文本（如用户问题）
+
+        Returns:
+            list: (实体名称, 节点标签, 起始位置)，同一名称属于多个标签时每个标签一项
+        """
+        if not self._built:
+            self.build()
+
+        goto, fail, word, output = self._goto, self._fail, self._word, self._output
+        matches = []
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            hit = state if word[state] is not None else output[state]
+            while hit:
+                name = word[hit]
+                matches.append((i - len(name) + 1, name))
+                hit = output[hit]
+
+        matches.sort(key=lambda match: (match[0], -len(match[1])))
+        mentions = []
+        end = 0
+        for start, name in matches:
+            if start < end:
+                continue
+            for label in sorted(self._labels[name]):
+                mentions.append((name, label, start))
+            end = start + len(name)
+        return mentions
+
+    @classmethod
+    def from_collections(cls, collections: Dict[str, Iterable[str]], min_length: int = 2) -> 'EntityIndex':
+        """
+        从各标签的实体名称集合构建索引（如图谱构建时收集的节点）
+
+        Args:
+            collections: 标签 -> 实体名称
+            min_length: 参与匹配的最短名称长度
+
+        Returns:
+            EntityIndex 实例
+        """
+        index = cls(min_length)
+        for label, names in collections.items():
+            index.add_all(names, label)
+        index.build()
+        return index
+
+    @classmethod
+    def from_driver(cls, driver, name_properties: Dict[str, str], min_length: int = 2) -> 'EntityIndex':
+        """
+        从 Neo4j 读取各标签节点的名称构建索引
+
+        Args:
+            driver: Neo4j驱动
+            name_properties: 标签 -> 名称属性（如 {'Disease': 'name'}）
+            min_length: 参与匹配的最短名称长度
+
+        Returns:
+            EntityIndex 实例
+        """
+        index = cls(min_length)
+        with driver.session() as session:
+            for label, name_prop in name_properties.items():
+                result = session.run(
+                    f"MATCH (n:`{label}`) WHERE n.`{name_prop}` IS NOT NULL RETURN n.`{name_prop}` AS name"
+                )
+                index.add_all((str(record['name']) for record in result), label)
+        index.build()
+        return index
+
+
+def name_property(properties: Dict[str, str]) -> Optional[str]:
+    """
+    获取节点的名称属性（优先 name，否则第一个属性）
+
+    Args:
+        properties: 节点属性定义
+
+    Returns:
+        属性名，节点没有属性时返回None
+    """
+    if 'name' in properties:
+        return 'name'
+    return next(iter(properties), None)
+
+
+def entity_name_properties(schema: GraphSchema) -> Dict[str, str]:
+    """
+    获取图模式中各标签的名称属性
+
+    Args:
+        schema: 图模式
+
+    Returns:
+        标签 -> 名称属性（没有属性的标签不包含在内）
+    """
+    name_properties = {}
+    for node in schema.nodes:
+        prop = name_property(node.properties)
+        if prop:
+            name_properties[node.label] = prop
+    return name_properties
+
+
+class EntityIndexService:
+    """
+    实体链接服务
+
+    持有当前的实体索引供各处复用（上下文增强、查询模板等）；查找时最多每 check_interval 秒
+    在后台线程检查一次图谱版本号，变化后重新加载并原子替换索引，查找本身从不等待 Neo4j
+    """
+
+    def __init__(self, driver, name_properties: Dict[str, str], check_interval: Optional[float] = None):
+        """
+        初始化服务（不立即加载，需调用 load）
+
+        Args:
+            driver: Neo4j驱动
+            name_properties: 标签 -> 名称属性
+            check_interval: 检查图谱版本号的间隔（秒），为None时使用 GRAPH_GENERATION_CHECK_INTERVAL
+        """
+        self.driver = driver
+        self.name_properties = name_properties
+        self.check_interval = settings.GRAPH_GENERATION_CHECK_INTERVAL if check_interval is None else check_interval
+        self._index = EntityIndex()
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self._load_seconds = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def load(self) -> EntityIndex:
+        """
+        从 Neo4j 加载索引并替换当前索引（同步，启动时调用）
+
+        Returns:
+            新的索引
+        """
+        generation = read_graph_generation(self.driver)
+        start = time.perf_counter()
+        index = EntityIndex.from_driver(self.driver, self.name_properties)
+        self._load_seconds = time.perf_counter() - start
+        self._index = index
+        self._generation = generation
+        self._checked_at = time.monotonic()
+        print(f"实体索引加载完成，共 {len(index)} 个名称，耗时 {self._load_seconds:.3f}秒（图谱版本号 {generation}）")
+        return index
+
+    @property
+    def index(self) -> EntityIndex:
+        """当前的实体索引（到达检查间隔时在后台检查图谱版本号）"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._schedule_refresh()
+        return self._index
+
+    def find(self, text: str) -> List[Tuple[str, str, int]]:
+        """
+        查找文本中提到的实体
+
+        Args:
+            text: 文本
+
+        Returns:
+            list: (实体名称, 节点标签, 起始位置)
+        """
+        return self.index.find(text)
+
+    def entity_names(self, text: str) -> List[str]:
+        """
+        查找文本中提到的实体名称（去重，按出现顺序），可作为上下文增强的实体匹配器
+
+        Args:
+            text: 文本
+
+        Returns:
+            实体名称列表
+        """
+        names = []
+        for name, _, _ in self.find(text):
+            if name not in names:
+                names.append(name)
+        return names
+
+    def stats(self) -> Dict[str, object]:
+        """
+        获取索引状态
+
+        Returns:
+            包含 size、generation、load_seconds 的字典
+        """
+        return {
+            'size': len(self._index),
+            'generation': self._generation,
+            'load_seconds': self._load_seconds
+        }
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._checked_at = time.monotonic()
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            if read_graph_generation(self.driver) != self._generation:
+                print("图谱版本号已变化，重新加载实体索引")
+                self.load()
+        except Exception as e:
+            print(f"⚠️ 重新加载实体索引失败，继续使用旧索引: {str(e)}")
+        finally:
+            self._refreshing = False
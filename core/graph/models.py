@@ -45,8 +45,8 @@ class CypherResponse(BaseModel):
     )
     
     explanation: str = Field(
-        ...,
-        description="对生成的Cypher查询的解释"
+        default="",
+        description="对生成的Cypher查询的解释（仅在请求 explain=true 时生成）"
     )
     
     confidence: float = Field(
@@ -65,6 +65,21 @@ class CypherResponse(BaseModel):
         default_factory=list,
         description="验证过程中发现的错误"
     )
+    
+    cached: bool = Field(
+        default=False,
+        description="是否命中生成缓存（未调用 LLM）"
+    )
+    
+    parameters: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="查询参数（模板生成的参数化查询使用，执行时需一并传入）"
+    )
+    
+    template: Optional[str] = Field(
+        default=None,
+        description="匹配的查询模板（未调用 LLM），由 LLM 生成时为None"
+    )
 
 
 class ValidationRequest(BaseModel):
@@ -73,6 +88,11 @@ class ValidationRequest(BaseModel):
         ...,
         description="需要验证的Cypher查询"
     )
+    
+    parameters: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="查询参数（执行参数化查询时使用）"
+    )
 
 
 class ValidationResponse(BaseModel):
@@ -87,8 +107,108 @@ class ValidationResponse(BaseModel):
         description="发现的错误列表"
     )
     
+    suggestions: List[str] = Field(
+        default_factory=list,
+        description="改进建议（仅在请求 include_suggestions=true 且验证失败时生成）"
+    )
+
+
+class ExplanationResponse(BaseModel):
+    """Cypher查询解释响应模型"""
+    cypher_query: str = Field(
+        ...,
+        description="被解释的Cypher查询"
+    )
+    
+    explanation: str = Field(
+        ...,
+        description="对Cypher查询的解释"
+    )
+
+
+class SuggestionResponse(BaseModel):
+    """Cypher查询改进建议响应模型"""
+    cypher_query: str = Field(
+        ...,
+        description="需要改进的Cypher查询"
+    )
+    
     suggestions: List[str] = Field(
         default_factory=list,
         description="改进建议"
     )
 
+
+class AnswerRequest(NL2CypherRequest):
+    """一次往返完成生成、验证、执行的请求模型"""
+    min_confidence: float = Field(
+        default=0.7,
+        description="执行查询所需的最低置信度",
+        ge=0,
+        le=1
+    )
+
+
+class AnswerResponse(BaseModel):
+    """一次往返完成生成、验证、执行的响应模型"""
+    cypher_query: str = Field(
+        ...,
+        description="生成的Cypher查询语句"
+    )
+    
+    confidence: float = Field(
+        ...,
+        description="模型对生成查询的信心度(0-1)",
+        ge=0,
+        le=1,
+    )
+    
+    validated: bool = Field(
+        default=False,
+        description="查询是否通过验证"
+    )
+    
+    validation_errors: List[str] = Field(
+        default_factory=list,
+        description="验证过程中发现的错误"
+    )
+    
+    cached: bool = Field(
+        default=False,
+        description="是否命中生成缓存（未调用 LLM）"
+    )
+    
+    parameters: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="查询参数（模板生成的参数化查询使用，执行时需一并传入）"
+    )
+    
+    template: Optional[str] = Field(
+        default=None,
+        description="匹配的查询模板（未调用 LLM），由 LLM 生成时为None"
+    )
+    
+    executed: bool = Field(
+        default=False,
+        description="查询是否已执行（未通过验证或置信度不足时不执行）"
+    )
+    
+    records: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="查询结果记录"
+    )
+    
+    count: int = Field(
+        default=0,
+        description="结果记录数量"
+    )
+    
+    error: Optional[str] = Field(
+        default=None,
+        description="执行失败时的错误信息"
+    )
+    
+    timings: Dict[str, float] = Field(
+        default_factory=dict,
+        description="各阶段耗时（秒）：generate、validate（命中生成缓存或查询模板时没有）、execute、total"
+    )
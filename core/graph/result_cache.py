@@ -0,0 +1,204 @@
+"""
+Cypher 查询结果缓存
+图谱只在构建脚本运行时变化，查询结果按 (清理后的查询, 参数) 缓存，并以图谱版本号（generation）标记；
+GraphBuilder 构建完成后更新 Neo4j 中的版本号节点，各服务检测到版本号变化后整体丢弃旧结果
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+
+# 保存图谱版本号的元数据节点
+GRAPH_META_LABEL = '_GraphMeta'
+
+# 包含写操作的查询不缓存
+WRITE_CLAUSE_PATTERN = re.compile(r'\b(CREATE|MERGE|DELETE|SET|REMOVE|DROP|LOAD\s+CSV|FOREACH|CALL)\b', re.IGNORECASE)
+
+
+def is_read_only_query(cypher_query: str) -> bool:
+    """
+    判断查询是否只读
+
+    Args:
+        cypher_query: Cypher查询语句
+
+    Returns:
+        不包含写操作子句时返回True
+    """
+    return not WRITE_CLAUSE_PATTERN.search(cypher_query)
+
+
+def bump_graph_generation(session) -> int:
+    """
+    更新图谱版本号（图谱数据变化后调用）
+
+    Args:
+        session: Neo4j 会话
+
+    Returns:
+        新的版本号（毫秒时间戳）
+    """
+    record = session.run(
+        f"MERGE (m:{GRAPH_META_LABEL} {{key: 'graph'}}) "
+        "SET m.generation = timestamp() "
+        "RETURN m.generation AS generation"
+    ).single()
+    return record['generation']
+
+
+def read_graph_generation(driver) -> int:
+    """
+    读取图谱版本号
+
+    Args:
+        driver: Neo4j驱动
+
+    Returns:
+        版本号，从未构建过（没有元数据节点）时返回0
+    """
+    with driver.session() as session:
+        record = session.run(
+            f"MATCH (m:{GRAPH_META_LABEL} {{key: 'graph'}}) RETURN m.generation AS generation"
+        ).single()
+    return record['generation'] if record and record['generation'] is not None else 0
+
+
+class CypherResultCache:
+    """
+    查询结果缓存（进程内 LRU）
+
+    版本号最多每 check_interval 秒从 Neo4j 读取一次；版本号变化时清空所有条目，
+    读取失败时不使用缓存
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_records: Optional[int] = None,
+        check_interval: Optional[float] = None
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的查询数量，为None时使用 CYPHER_RESULT_CACHE_MAX_ENTRIES
+            max_records: 结果记录数超过该值时不缓存，为None时使用 CYPHER_RESULT_CACHE_MAX_RECORDS
+            check_interval: 检查图谱版本号的间隔（秒），为None时使用 GRAPH_GENERATION_CHECK_INTERVAL
+        """
+        self.max_entries = max_entries or settings.CYPHER_RESULT_CACHE_MAX_ENTRIES
+        self.max_records = max_records or settings.CYPHER_RESULT_CACHE_MAX_RECORDS
+        self.check_interval = settings.GRAPH_GENERATION_CHECK_INTERVAL if check_interval is None else check_interval
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(cypher_query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            cypher_query: 清理后的Cypher查询
+            parameters: 查询参数（可选）
+
+        Returns:
+            缓存键
+        """
+        raw = cypher_query + '\x00' + json.dumps(parameters or {}, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def current_generation(self, driver) -> Optional[int]:
+        """
+        获取当前图谱版本号（按间隔从 Neo4j 刷新，版本号变化时清空缓存）
+
+        Args:
+            driver: Neo4j驱动
+
+        Returns:
+            版本号，读取失败时返回None
+        """
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < self.check_interval:
+            return self._generation
+        try:
+            generation = read_graph_generation(driver)
+        except Exception as e:
+            print(f"⚠️ 读取图谱版本号失败，本次不使用结果缓存: {str(e)}")
+            return None
+        with self._lock:
+            if generation != self._generation:
+                if self._generation is not None:
+                    print(f"图谱版本号变化（{self._generation} -> {generation}），清空查询结果缓存")
+                self._entries.clear()
+                self._generation = generation
+            self._checked_at = now
+        return generation
+
+    def get(self, key: str, generation: int) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存
+
+        Args:
+            key: 缓存键
+            generation: 当前图谱版本号
+
+        Returns:
+            缓存的结果（records、count），未命中返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['generation'] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry['result'])
+            self.misses += 1
+            return None
+
+    def set(self, key: str, generation: int, result: Dict[str, Any]):
+        """
+        写入缓存（记录数超过上限时不缓存）
+
+        Args:
+            key: 缓存键
+            generation: 查询时的图谱版本号
+            result: 查询结果（records、count）
+        """
+        if result.get('count', 0) > self.max_records:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = {'generation': generation, 'result': result}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """清空缓存，并在下次查询时重新读取版本号"""
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计信息
+
+        Returns:
+            包含 hits、misses、size、generation 的字典
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'generation': self._generation
+            }
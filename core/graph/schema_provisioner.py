@@ -0,0 +1,201 @@
+"""
+图模式约束与索引
+根据图模式为每个节点标签的名称属性创建唯一约束（或范围索引）和文本索引：
+图谱构建的 MERGE / MATCH 按名称查找节点，生成的查询常用 CONTAINS 按名称模糊匹配，没有索引时都是按标签全量扫描
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from core.graph.entity_index import entity_name_properties
+from core.graph.schemas import GraphSchema
+
+
+class IndexSpec:
+    """需要的一个约束或索引"""
+
+    def __init__(self, kind: str, label: str, prop: str):
+        """
+        Args:
+            kind: unique（唯一约束，附带范围索引）、range（范围索引）或 text（文本索引）
+            label: 节点标签
+            prop: 属性名
+        """
+        self.kind = kind
+        self.label = label
+        self.prop = prop
+        self.name = f"{label.lower()}_{prop.lower()}_{kind}"
+
+    @property
+    def index_type(self) -> str:
+        """满足该需求的索引类型（唯一约束由范围索引支撑）"""
+        return 'TEXT' if self.kind == 'text' else 'RANGE'
+
+    def create_statement(self) -> str:
+        """
+        生成创建语句（IF NOT EXISTS，重复执行无副作用）
+
+        Returns:
+            Cypher 语句
+        """
+        target = f"(n:`{self.label}`)"
+        if self.kind == 'unique':
+            return f"CREATE CONSTRAINT {self.name} IF NOT EXISTS FOR {target} REQUIRE n.`{self.prop}` IS UNIQUE"
+        if self.kind == 'text':
+            return f"CREATE TEXT INDEX {self.name} IF NOT EXISTS FOR {target} ON (n.`{self.prop}`)"
+        return f"CREATE INDEX {self.name} IF NOT EXISTS FOR {target} ON (n.`{self.prop}`)"
+
+    def __repr__(self) -> str:
+        return f"{self.index_type}({self.label}.{self.prop})"
+
+
+class SchemaProvisioner:
+    """
+    图模式约束与索引的创建与检查
+
+    provision() 创建缺少的约束和索引并等待上线（图谱构建前调用）；
+    verify() 只检查，不做任何修改（graph_service 启动时调用）
+    """
+
+    def __init__(self, driver, schema: GraphSchema, unique_names: Optional[bool] = None,
+                 text_indexes: bool = True):
+        """
+        初始化
+
+        Args:
+            driver: Neo4j驱动
+            schema: 图模式
+            unique_names: 名称属性是否创建唯一约束（否则只创建范围索引），为None时使用 GRAPH_SCHEMA_UNIQUE_NAMES
+            text_indexes: 是否为名称属性创建文本索引（支持 CONTAINS / STARTS WITH）
+        """
+        self.driver = driver
+        self.schema = schema
+        self.unique_names = settings.GRAPH_SCHEMA_UNIQUE_NAMES if unique_names is None else unique_names
+        self.text_indexes = text_indexes
+
+    def plan(self) -> List[IndexSpec]:
+        """
+        根据图模式列出需要的约束和索引
+
+        Returns:
+            IndexSpec 列表
+        """
+        specs = []
+        for label, prop in entity_name_properties(self.schema).items():
+            specs.append(IndexSpec('unique' if self.unique_names else 'range', label, prop))
+            if self.text_indexes:
+                specs.append(IndexSpec('text', label, prop))
+        return specs
+
+    def existing_indexes(self) -> Dict[Tuple[str, str, str], str]:
+        """
+        读取数据库中已有的单标签、单属性索引
+
+        Returns:
+            (索引类型, 标签, 属性) -> 状态（ONLINE、POPULATING、FAILED）
+        """
+        return {key: index['state'] for key, index in self._show_indexes().items()}
+
+    def _show_indexes(self) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """
+        读取数据库中已有的单标签、单属性索引的状态、名称和所属约束
+
+        Returns:
+            (索引类型, 标签, 属性) -> {'state', 'name', 'owningConstraint'}
+        """
+        indexes = {}
+        with self.driver.session() as session:
+            result = session.run(
+                "SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state, owningConstraint "
+                "WHERE entityType = 'NODE' RETURN name, type, labelsOrTypes, properties, state, owningConstraint"
+            )
+            for record in result:
+                labels, properties = record['labelsOrTypes'] or [], record['properties'] or []
+                if len(labels) == 1 and len(properties) == 1:
+                    indexes[(record['type'], labels[0], properties[0])] = {
+                        'state': record['state'],
+                        'name': record['name'],
+                        'owningConstraint': record['owningConstraint']
+                    }
+        return indexes
+
+    def verify(self) -> Dict[str, List[str]]:
+        """
+        检查需要的约束和索引是否都已存在并上线（不做任何修改）
+
+        Returns:
+            dict: online（已上线）、pending（存在但未上线）、missing（不存在）
+        """
+        existing = self.existing_indexes()
+        report = {'online': [], 'pending': [], 'missing': []}
+        for spec in self.plan():
+            state = existing.get((spec.index_type, spec.label, spec.prop))
+            if state is None:
+                report['missing'].append(repr(spec))
+            elif state == 'ONLINE':
+                report['online'].append(repr(spec))
+            else:
+                report['pending'].append(f"{spec!r}: {state}")
+        return report
+
+    def provision(self, await_timeout: Optional[int] = None) -> Dict[str, Any]:
+        """
+        创建缺少的约束和索引，并等待所有索引上线
+
+        名称重复导致唯一约束创建失败时，改为创建范围索引；
+        状态为 FAILED 的索引（及其所属约束）先删除再按图模式重新创建
+
+        Args:
+            await_timeout: 等待索引上线的超时（秒），为None时使用 GRAPH_INDEX_AWAIT_TIMEOUT
+
+        Returns:
+            dict: created（新建）、existing（已存在）、recreated（FAILED 后删除重建）、
+                failed（创建失败及原因）、online（是否已全部上线）
+        """
+        await_timeout = settings.GRAPH_INDEX_AWAIT_TIMEOUT if await_timeout is None else await_timeout
+        existing = self._show_indexes()
+        report: Dict[str, Any] = {'created': [], 'existing': [], 'recreated': [], 'failed': [], 'online': False}
+
+        with self.driver.session() as session:
+            for spec in self.plan():
+                index = existing.get((spec.index_type, spec.label, spec.prop))
+                if index is not None and index['state'] != 'FAILED':
+                    report['existing'].append(repr(spec))
+                    continue
+                if index is not None:
+                    # 填充失败的索引不会自行恢复，db.awaitIndexes 也会因此报错：删除后重新创建
+                    try:
+                        session.run(self._drop_statement(index)).consume()
+                        report['recreated'].append(repr(spec))
+                    except Exception as e:
+                        report['failed'].append(f"{spec!r}: FAILED 索引删除失败: {str(e)}")
+                        continue
+                try:
+                    session.run(spec.create_statement()).consume()
+                    report['created'].append(repr(spec))
+                except Exception as e:
+                    if spec.kind != 'unique':
+                        report['failed'].append(f"{spec!r}: {str(e)}")
+                        continue
+                    # 已有重复名称的节点时无法创建唯一约束，退回范围索引
+                    fallback = IndexSpec('range', spec.label, spec.prop)
+                    try:
+                        session.run(fallback.create_statement()).consume()
+                        report['created'].append(repr(fallback))
+                        report['failed'].append(f"UNIQUE({spec.label}.{spec.prop}): {str(e)}")
+                    except Exception as fallback_error:
+                        report['failed'].append(f"{fallback!r}: {str(fallback_error)}")
+
+            try:
+                session.run("CALL db.awaitIndexes($timeout)", timeout=await_timeout).consume()
+                report['online'] = True
+            except Exception as e:
+                report['failed'].append(f"等待索引上线超时或失败: {str(e)}")
+
+        return report
+
+    @staticmethod
+    def _drop_statement(index: Dict[str, Any]) -> str:
+        """删除索引的语句（由约束支撑的索引需要删除所属约束）"""
+        if index['owningConstraint']:
+            return f"DROP CONSTRAINT `{index['owningConstraint']}` IF EXISTS"
+        return f"DROP INDEX `{index['name']}` IF EXISTS"
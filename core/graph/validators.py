@@ -3,7 +3,7 @@ Cypher查询验证器
 验证Cypher查询的语法和模式
 """
 import re
-from typing import List, Tuple
+from typing import AbstractSet, List, Optional, Tuple
 from neo4j import GraphDatabase
 from core.graph.schemas import GraphSchema
 
@@ -57,13 +57,21 @@ class CypherValidator:
             errors.append(f"语法错误: {str(e)}")
             return False, errors
     
-    def validate_against_schema(self, cypher_query: str, schema: GraphSchema) -> Tuple[bool, List[str]]:
+    def validate_against_schema(
+        self,
+        cypher_query: str,
+        schema: GraphSchema,
+        node_labels: Optional[AbstractSet[str]] = None,
+        rel_types: Optional[AbstractSet[str]] = None
+    ) -> Tuple[bool, List[str]]:
         """
         根据模式验证查询
         
         Args:
             cypher_query: Cypher查询语句
             schema: 图模式
+            node_labels: 预先计算的节点标签集合（可选，不提供时从 schema 提取）
+            rel_types: 预先计算的关系类型集合（可选，不提供时从 schema 提取）
             
         Returns:
             (是否有效, 错误列表)
@@ -71,7 +79,8 @@ class CypherValidator:
         errors = []
         
         # 提取所有节点标签
-        node_labels = [node.label for node in schema.nodes]
+        if node_labels is None:
+            node_labels = {node.label for node in schema.nodes}
         # 匹配节点模式：(var:Label) 或 (:Label)，只提取有冒号的标签
         node_pattern = r'\(([a-zA-Z0-9_]+)?:([a-zA-Z0-9_]+)\)'
         matches = re.findall(node_pattern, cypher_query)
@@ -83,7 +92,8 @@ class CypherValidator:
                 errors.append(f"使用了不存在的节点标签: {node_label}")
         
         # 提取所有关系类型
-        rel_types = [rel.type for rel in schema.relationships]
+        if rel_types is None:
+            rel_types = {rel.type for rel in schema.relationships}
         # 匹配关系模式：[var:Type] 或 [:Type]，只提取有冒号的类型
         rel_pattern = r'\[([a-zA-Z0-9_]+)?:([a-zA-Z0-9_]+)\]'
         rel_matches = re.findall(rel_pattern, cypher_query)
@@ -104,13 +114,21 @@ class CypherValidator:
 class RuleBasedValidator:
     """基于规则的验证器（当无法连接Neo4j时使用）"""
     
-    def validate_against_schema(self, cypher_query: str, schema: GraphSchema) -> Tuple[bool, List[str]]:
+    def validate_against_schema(
+        self,
+        cypher_query: str,
+        schema: GraphSchema,
+        node_labels: Optional[AbstractSet[str]] = None,
+        rel_types: Optional[AbstractSet[str]] = None
+    ) -> Tuple[bool, List[str]]:
         """
         根据模式验证查询（基于规则的验证）
         
         Args:
             cypher_query: Cypher查询语句
             schema: 图模式
+            node_labels: 预先计算的节点标签集合（可选，不提供时从 schema 提取）
+            rel_types: 预先计算的关系类型集合（可选，不提供时从 schema 提取）
             
         Returns:
             (是否有效, 错误列表)
@@ -143,7 +161,8 @@ class RuleBasedValidator:
             errors.append("CREATE查询应该明确创建节点或关系")
         
         # 提取所有节点标签
-        node_labels = [node.label for node in schema.nodes]
+        if node_labels is None:
+            node_labels = {node.label for node in schema.nodes}
         # 匹配节点模式：(var:Label) 或 (:Label)，只提取有冒号的标签
         node_pattern = r'\(([a-zA-Z0-9_]+)?:([a-zA-Z0-9_]+)\)'
         matches = re.findall(node_pattern, cypher_query)
@@ -155,7 +174,8 @@ class RuleBasedValidator:
                 errors.append(f"使用了不存在的节点标签: {node_label}")
         
         # 提取所有关系类型
-        rel_types = [rel.type for rel in schema.relationships]
+        if rel_types is None:
+            rel_types = {rel.type for rel in schema.relationships}
         # 匹配关系模式：[var:Type] 或 [:Type]，只提取有冒号的类型
         rel_pattern = r'\[([a-zA-Z0-9_]+)?:([a-zA-Z0-9_]+)\]'
         rel_matches = re.findall(rel_pattern, cypher_query)
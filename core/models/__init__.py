@@ -3,10 +3,13 @@
 包含Embedding模型和LLM模型
 """
 from core.models.embeddings import ZhipuAIEmbeddings
+from core.models.embedding_cache import CachedEmbeddings, create_embedding_model
 from core.models.llm import create_openrouter_client, create_deepseek_client, generate_answer, generate_deepseek_answer
 
 __all__ = [
     'ZhipuAIEmbeddings',
+    'CachedEmbeddings',
+    'create_embedding_model',
     'create_openrouter_client',
     'create_deepseek_client',  # 向后兼容
     'generate_answer',
@@ -0,0 +1,298 @@
+"""
+内容寻址的 Embedding 缓存
+按 (模型, 维度, sha256(文本)) 缓存向量，避免对相同文本重复调用 embeddings 接口
+本地使用 SQLite 文件存储 float32 向量，可选 Redis 作为共享的第二级缓存
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+from config.settings import settings
+from core.models.embeddings import ZhipuAIEmbeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    带持久化缓存的 Embedding 模型封装
+
+    查找顺序：SQLite 本地缓存 -> Redis（可选）-> embeddings 接口
+    未命中的文本去重后统一交给底层模型批量生成，再写回各级缓存
+    """
+
+    REDIS_PREFIX = 'emb:'
+    # SQLite 单条语句的参数数量上限较低，批量查找时按该大小分段
+    _SQL_CHUNK = 500
+
+    def __init__(
+        self,
+        embeddings: Optional[ZhipuAIEmbeddings] = None,
+        db_path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        use_redis: Optional[bool] = None,
+        redis_client=None,
+        redis_ttl: Optional[int] = None
+    ):
+        """
+        初始化缓存
+
+        Args:
+            embeddings: 底层 Embedding 模型，为None时自动创建 ZhipuAIEmbeddings
+            db_path: SQLite 缓存文件路径，为None时使用 EMBEDDING_CACHE_DB
+            max_entries: 本地缓存最多保存的向量数量，超出时按最近访问时间淘汰
+            use_redis: 是否启用 Redis 二级缓存，为None时使用 EMBEDDING_CACHE_REDIS_ENABLED
+            redis_client: Redis客户端实例，为None时使用 get_redis_client() 获取
+            redis_ttl: Redis 中向量的过期时间（秒）
+        """
+        self.embeddings = embeddings or ZhipuAIEmbeddings()
+        self.model = self.embeddings.model
+        self.dimensions = getattr(self.embeddings, 'dimensions', None)
+        self.db_path = db_path or settings.EMBEDDING_CACHE_DB
+        self.max_entries = max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES
+        self.use_redis = settings.EMBEDDING_CACHE_REDIS_ENABLED if use_redis is None else use_redis
+        self._redis = redis_client
+        self.redis_ttl = redis_ttl or settings.EMBEDDING_CACHE_REDIS_TTL
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # 同一个连接会被多个线程使用（asyncio.to_thread、线程池），由锁串行化访问
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            'key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)')
+        self._conn.commit()
+        self._size = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    @property
+    def redis(self):
+        """Redis客户端"""
+        if self._redis is None:
+            from core.cache.redis_client import get_redis_client
+            return get_redis_client()
+        return self._redis
+
+    def cache_key(self, text: str) -> str:
+        """
+        计算文本的缓存键
+
+        Args:
+            text: 文本
+
+        Returns:
+            sha256(模型, 维度, 文本) 的十六进制摘要
+        """
+        raw = f"{self.model}\x00{self.dimensions or 'default'}\x00{text}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _to_blob(vector: List[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _from_blob(blob: bytes) -> List[float]:
+        return np.frombuffer(blob, dtype=np.float32).tolist()
+
+    def _lookup_local(self, keys: List[str]) -> Dict[str, bytes]:
+        """批量从 SQLite 读取向量，并刷新命中条目的访问时间"""
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for i in range(0, len(keys), self._SQL_CHUNK):
+                chunk = keys[i:i + self._SQL_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    'UPDATE embeddings SET last_access = ? WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _lookup_redis(self, keys: List[str]) -> Dict[str, bytes]:
+        """批量从 Redis 读取向量（一次 MGET）"""
+        if not self.use_redis or not keys:
+            return {}
+        try:
+            blobs = self.redis.mget([self.REDIS_PREFIX + key for key in keys])
+        except Exception as e:
+            print(f"⚠️ 读取 Redis Embedding 缓存失败: {str(e)}")
+            return {}
+        return {key: blob for key, blob in zip(keys, blobs) if blob is not None}
+
+    def _store_local(self, items: Dict[str, bytes]):
+        """写入 SQLite，超出容量时淘汰最久未访问的条目"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)',
+                [(key, blob, now) for key, blob in items.items()]
+            )
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                overflow = self._size - self.max_entries
+                self._conn.execute(
+                    'DELETE FROM embeddings WHERE key IN '
+                    '(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)',
+                    (overflow,)
+                )
+                self._size -= overflow
+            self._conn.commit()
+
+    def _store_redis(self, items: Dict[str, bytes]):
+        """写入 Redis（一次 pipeline）"""
+        if not self.use_redis or not items:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, blob in items.items():
+                pipe.set(self.REDIS_PREFIX + key, blob, ex=self.redis_ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"⚠️ 写入 Redis Embedding 缓存失败: {str(e)}")
+
+    def _resolve_cached(self, texts: List[str]):
+        """
+        查找各级缓存
+
+        Returns:
+            (每个文本的缓存键, 已找到的向量, 需要调用接口生成的文本（去重后）及其缓存键)
+        """
+        keys = [self.cache_key(text) for text in texts]
+        unique: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            unique.setdefault(key, text)
+
+        found = self._lookup_local(list(unique))
+        self.hits += len(found)
+
+        remaining = [key for key in unique if key not in found]
+        from_redis = self._lookup_redis(remaining)
+        if from_redis:
+            self.redis_hits += len(from_redis)
+            found.update(from_redis)
+            # Redis 命中的向量回填到本地缓存
+            self._store_local(from_redis)
+
+        missing_keys = [key for key in remaining if key not in from_redis]
+        self.misses += len(missing_keys)
+        return keys, found, missing_keys, [unique[key] for key in missing_keys]
+
+    def _merge(self, keys, found, missing_keys, vectors) -> List[List[float]]:
+        """写回新生成的向量，并按输入顺序组装结果"""
+        new_items = {key: self._to_blob(vector) for key, vector in zip(missing_keys, vectors)}
+        self._store_local(new_items)
+        self._store_redis(new_items)
+        found.update(new_items)
+        return [self._from_blob(found[key]) for key in keys]
+
+    def embed_documents(self, texts: list) -> list:
+        """
+        批量生成文档的嵌入向量（优先使用缓存）
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            嵌入向量列表（与输入顺序一致）
+        """
+        if not texts:
+            return []
+        keys, found, missing_keys, missing_texts = self._resolve_cached(list(texts))
+        vectors = self.embeddings.embed_documents(missing_texts) if missing_texts else []
+        return self._merge(keys, found, missing_keys, vectors)
+
+    async def aembed_documents(self, texts: list) -> list:
+        """
+        异步批量生成文档的嵌入向量（优先使用缓存）
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            嵌入向量列表（与输入顺序一致）
+        """
+        if not texts:
+            return []
+        keys, found, missing_keys, missing_texts = await asyncio.to_thread(self._resolve_cached, list(texts))
+        vectors = await self.embeddings.aembed_documents(missing_texts) if missing_texts else []
+        return await asyncio.to_thread(self._merge, keys, found, missing_keys, vectors)
+
+    def embed_query(self, text: str) -> list:
+        """
+        生成查询文本的嵌入向量（优先使用缓存）
+
+        Args:
+            text: 查询文本
+
+        Returns:
+            嵌入向量
+        """
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> list:
+        """
+        异步生成查询文本的嵌入向量（优先使用缓存）
+
+        Args:
+            text: 查询文本
+
+        Returns:
+            嵌入向量
+        """
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        缓存统计信息
+
+        Returns:
+            包含 hits、redis_hits、misses、size 的字典
+        """
+        return {
+            'hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'size': self._size
+        }
+
+    def close(self):
+        """关闭 SQLite 连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_embedding_model(embeddings: Optional[ZhipuAIEmbeddings] = None) -> Embeddings:
+    """
+    创建 Embedding 模型（EMBEDDING_CACHE_ENABLED 为 True 时包装持久化缓存）
+
+    Args:
+        embeddings: 底层 Embedding 模型，为None时自动创建 ZhipuAIEmbeddings
+
+    Returns:
+        Embedding 模型实例
+    """
+    embeddings = embeddings or ZhipuAIEmbeddings()
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    return CachedEmbeddings(embeddings)
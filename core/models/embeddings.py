@@ -2,25 +2,51 @@
 统一的 Embedding 模型封装
 使用智谱官方 OpenAI 兼容接口生成向量
 """
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
 from langchain.embeddings.base import Embeddings
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError
 from config.settings import settings
 
 
+ZHIPU_BASE_URL = 'https://open.bigmodel.cn/api/paas/v4'
+
+
 class ZhipuAIEmbeddings(Embeddings):
     """
     Embedding模型封装（使用智谱官方 API）
     保持向后兼容的类名
     统一管理，避免在多个文件中重复定义
+
+    embed_documents 按 batch_size 分批调用接口（一次请求携带多条文本），
+    最多 max_concurrency 个批次同时在途，结果保持与输入相同的顺序
     """
     
-    def __init__(self, client: OpenAI = None, model: str = None):
+    def __init__(
+        self,
+        client: OpenAI = None,
+        model: str = None,
+        dimensions: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None
+    ):
         """
         初始化Embedding模型
         
         Args:
             client: OpenAI 兼容客户端实例（智谱），如果为None则自动创建
             model: 模型名称，如果为None则使用配置中的默认模型
+            dimensions: 向量维度，为None时使用 ZHIPU_EMBEDDING_DIMENSIONS（未配置时使用模型默认维度）
+            batch_size: 单次请求携带的文本数量，为None时使用 EMBEDDING_BATCH_SIZE
+            max_concurrency: 同时在途的批次数量，为None时使用 EMBEDDING_MAX_CONCURRENCY
+            max_retries: 单个批次失败后的最大重试次数，为None时使用 EMBEDDING_MAX_RETRIES
+                （只重试限流、超时、连接错误和 5xx；自动创建的客户端关闭 SDK 自带的重试）
+            retry_backoff: 重试的初始退避时间（秒，按指数增长），为None时使用 EMBEDDING_RETRY_BACKOFF
         """
         if client is None:
             api_key = settings.ZHIPU_API_KEY
@@ -30,13 +56,101 @@ class ZhipuAIEmbeddings(Embeddings):
             self.client = OpenAI(
                 api_key=api_key,
                 # 智谱官方 OpenAI 兼容接口
-                base_url='https://open.bigmodel.cn/api/paas/v4'
+                base_url=ZHIPU_BASE_URL,
+                # 重试由 _embed_batch 按指数退避统一处理，避免与 SDK 的重试叠加
+                max_retries=0
             )
         else:
             self.client = client
         
         self.model = model or settings.ZHIPU_EMBEDDING_MODEL
-    
+        self.dimensions = dimensions or settings.ZHIPU_EMBEDDING_DIMENSIONS
+        self.batch_size = max(1, batch_size or settings.EMBEDDING_BATCH_SIZE)
+        self.max_concurrency = max(1, max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY)
+        self.max_retries = max_retries if max_retries is not None else settings.EMBEDDING_MAX_RETRIES
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.EMBEDDING_RETRY_BACKOFF
+        self._async_client: Optional[AsyncOpenAI] = None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """异步客户端（首次使用时按同步客户端的配置创建）"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.client.api_key,
+                base_url=str(self.client.base_url),
+                max_retries=self.client.max_retries
+            )
+        return self._async_client
+
+    def _request_kwargs(self, batch: List[str]) -> dict:
+        """embeddings 接口的请求参数"""
+        kwargs = {'model': self.model, 'input': batch}
+        if self.dimensions:
+            kwargs['dimensions'] = self.dimensions
+        return kwargs
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        """按 batch_size 切分文本列表"""
+        return [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+    @staticmethod
+    def _parse_response(response, expected: int) -> List[List[float]]:
+        """按 index 排序取出向量，确保与请求中的文本顺序一致"""
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != expected:
+            raise ValueError(f"返回的向量数量 {len(data)} 与输入文本数量 {expected} 不一致")
+        return [item.embedding for item in data]
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """限流、超时、连接错误和服务端 5xx 错误可以重试；其他错误（如 API Key 无效、请求参数错误）直接抛出"""
+        if isinstance(error, (RateLimitError, APIConnectionError)):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code >= 500
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """
+        同步生成一个批次的向量（可重试的错误按指数退避重试）
+
+        Args:
+            batch: 文本列表
+
+        Returns:
+            嵌入向量列表
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 使用智谱 OpenAI 兼容 embeddings API，一次请求携带整个批次
+                response = self.client.embeddings.create(**self._request_kwargs(batch))
+                return self._parse_response(response, len(batch))
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise ValueError(f"Embedding 生成失败: {str(e)}，请检查模型 {self.model} 是否支持 embedding")
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"⚠️ Embedding 批次失败（{len(batch)} 条），{delay:.1f} 秒后重试（第 {attempt + 1} 次）: {str(e)}")
+                time.sleep(delay)
+
+    async def _aembed_batch(self, batch: List[str]) -> List[List[float]]:
+        """
+        异步生成一个批次的向量（可重试的错误按指数退避重试）
+
+        Args:
+            batch: 文本列表
+
+        Returns:
+            嵌入向量列表
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.async_client.embeddings.create(**self._request_kwargs(batch))
+                return self._parse_response(response, len(batch))
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise ValueError(f"Embedding 生成失败: {str(e)}，请检查模型 {self.model} 是否支持 embedding")
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"⚠️ Embedding 批次失败（{len(batch)} 条），{delay:.1f} 秒后重试（第 {attempt + 1} 次）: {str(e)}")
+                await asyncio.sleep(delay)
+
     def embed_documents(self, texts: list) -> list:
         """
         批量生成文档的嵌入向量
@@ -45,20 +159,39 @@ class ZhipuAIEmbeddings(Embeddings):
             texts: 文本列表
             
         Returns:
-            嵌入向量列表
+            嵌入向量列表（与输入顺序一致）
         """
-        embeddings = []
-        for text in texts:
-            try:
-                # 使用智谱 OpenAI 兼容 embeddings API
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=text
-                )
-                embeddings.append(response.data[0].embedding)
-            except Exception as e:
-                raise ValueError(f"Embedding 生成失败: {str(e)}，请检查模型 {self.model} 是否支持 embedding")
-        return embeddings
+        if not texts:
+            return []
+        batches = self._batches(list(texts))
+        if len(batches) == 1 or self.max_concurrency == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                # executor.map 按提交顺序返回结果
+                results = list(executor.map(self._embed_batch, batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def aembed_documents(self, texts: list) -> list:
+        """
+        异步批量生成文档的嵌入向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            嵌入向量列表（与输入顺序一致）
+        """
+        if not texts:
+            return []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        results = await asyncio.gather(*(run(batch) for batch in self._batches(list(texts))))
+        return [vector for batch_vectors in results for vector in batch_vectors]
     
     def embed_query(self, text: str) -> list:
         """
@@ -70,5 +203,16 @@ class ZhipuAIEmbeddings(Embeddings):
         Returns:
             嵌入向量
         """
-        return self.embed_documents([text])[0]
+        return self._embed_batch([text])[0]
+
+    async def aembed_query(self, text: str) -> list:
+        """
+        异步生成查询文本的嵌入向量
 
+        Args:
+            text: 查询文本
+
+        Returns:
+            嵌入向量
+        """
+        return (await self._aembed_batch([text]))[0]
@@ -5,10 +5,18 @@
 """
 import os
 import re
-from openai import OpenAI
+from typing import Optional
+from openai import OpenAI, AsyncOpenAI
 from config.settings import settings
 
 
+OPENROUTER_BASE_URL = 'https://openrouter.ai/api/v1'
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://github.com/your-repo",  # 可选：用于追踪
+    "X-Title": "GraphRAG",  # 可选：应用名称
+}
+
+
 def create_openrouter_client(model: str = None) -> OpenAI:
     """
     创建 OpenRouter 客户端
@@ -25,15 +33,37 @@ def create_openrouter_client(model: str = None) -> OpenAI:
     
     client = OpenAI(
         api_key=api_key,
-        base_url='https://openrouter.ai/api/v1',
-        default_headers={
-            "HTTP-Referer": "https://github.com/your-repo",  # 可选：用于追踪
-            "X-Title": "GraphRAG",  # 可选：应用名称
-        }
+        base_url=OPENROUTER_BASE_URL,
+        default_headers=OPENROUTER_HEADERS
     )
     return client
 
 
+def create_async_openrouter_client(timeout: Optional[float] = None, max_retries: int = 2) -> AsyncOpenAI:
+    """
+    创建 OpenRouter 异步客户端
+    
+    Args:
+        timeout: 单次调用超时时间（秒），为None时使用 openai 库的默认值
+        max_retries: 失败后的最大重试次数
+        
+    Returns:
+        AsyncOpenAI客户端实例（配置为 OpenRouter API）
+    """
+    api_key = settings.OPENROUTER_API_KEY
+    if not api_key:
+        raise ValueError("OPENROUTER_API_KEY 未配置，请设置环境变量或 .env 文件")
+    
+    kwargs = {'timeout': timeout} if timeout is not None else {}
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=OPENROUTER_BASE_URL,
+        default_headers=OPENROUTER_HEADERS,
+        max_retries=max_retries,
+        **kwargs
+    )
+
+
 def create_deepseek_client() -> OpenAI:
     """
     创建 LLM 客户端（使用 OpenRouter）
@@ -10,6 +10,7 @@ from langchain.storage import InMemoryStore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.retrievers import ParentDocumentRetriever
 from core.models.embeddings import ZhipuAIEmbeddings
+from core.models.embedding_cache import create_embedding_model
 from config.settings import settings
 # 已迁移到 OpenRouter，不再使用 zai SDK
 
@@ -29,8 +30,8 @@ class MilvusVectorStore:
             uri: Milvus数据库URI，如果为None则使用配置中的默认值
         """
         if embedding_model is None:
-            # 使用 OpenRouter 的 Embedding 模型
-            self.embeddings = ZhipuAIEmbeddings()
+            # 带持久化缓存的 Embedding 模型：重建向量库时未变化的文本不再重复调用接口
+            self.embeddings = create_embedding_model()
         else:
             self.embeddings = embedding_model
         
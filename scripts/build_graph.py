@@ -11,7 +11,7 @@ from typing import Optional
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from core.framework import SchemaConfig, DataReader
+from core.framework import SchemaConfig
 from core.framework.graph_builder import GraphBuilder
 from core.graph.neo4j_client import Neo4jClient
 
@@ -20,7 +20,11 @@ def build_graph_from_schema(
     schema_file: str,
     data_file: str,
     clear_existing: bool = False,
-    batch_size: int = 100
+    batch_size: int = 100,
+    streaming: bool = False,
+    entity_batch_size: Optional[int] = None,
+    provision: bool = True,
+    relationship_workers: Optional[int] = None
 ):
     """
     根据模式文件构建知识图谱
@@ -30,6 +34,10 @@ def build_graph_from_schema(
         data_file: 数据文件路径
         clear_existing: 是否清空现有图谱
         batch_size: 批量处理大小
+        streaming: 是否流式构建（边解析边写入，内存占用与 batch_size 成正比）
+        entity_batch_size: 主实体每批写入的行数（可选，默认同 batch_size）
+        provision: 写入前是否创建名称属性的约束和索引
+        relationship_workers: 并行写入关系的线程数（可选，默认 GRAPH_BUILD_RELATIONSHIP_WORKERS）
     """
     print("=" * 80)
     print("开始图谱构建流程")
@@ -62,13 +70,19 @@ def build_graph_from_schema(
     print(f"  关系类型: {len(schema.relationships)} 个")
     
     # 创建图谱构建器
-    builder = GraphBuilder(schema)
+    builder = GraphBuilder(
+        schema,
+        entity_batch_size=entity_batch_size,
+        relationship_workers=relationship_workers
+    )
     
     # 构建图谱（包含步骤2-5）
     builder.build_graph(
         data_file=data_file,
         batch_size=batch_size,
-        clear_existing=clear_existing
+        clear_existing=clear_existing,
+        streaming=streaming,
+        provision=provision
     )
 
 
@@ -96,6 +110,28 @@ def main():
         default=100,
         help="批量处理大小（默认：100）"
     )
+    parser.add_argument(
+        "--entity-batch-size",
+        type=int,
+        default=None,
+        help="主实体每批写入的行数（默认与 --batch-size 相同；主实体属性较多时可单独调小）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="并行写入关系的线程数（默认：GRAPH_BUILD_RELATIONSHIP_WORKERS）"
+    )
+    parser.add_argument(
+        "--skip-provision",
+        action="store_true",
+        help="不创建名称属性的约束和索引（默认在写入前创建并等待上线）"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="流式构建：边解析边按批写入，适合内存放不下的大数据文件（仅支持JSONL）"
+    )
     
     args = parser.parse_args()
     
@@ -104,7 +140,11 @@ def main():
             schema_file=args.schema_file,
             data_file=args.data_file,
             clear_existing=args.clear,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            streaming=args.streaming,
+            entity_batch_size=args.entity_batch_size,
+            provision=not args.skip_provision,
+            relationship_workers=args.workers
         )
         print("\n✅ 图谱构建流程执行成功！")
         return 0
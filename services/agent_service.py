@@ -6,25 +6,34 @@
 import os
 import re
 import json
+import asyncio
 import datetime
 import uuid
-import requests
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
 from pathlib import Path
+from typing import Optional
+from contextlib import asynccontextmanager
 from langchain_milvus import Milvus, BM25BuiltInFunction
 
 from config.settings import settings
 from config.neo4j_config import NEO4J_CONFIG
-from core.models.embeddings import ZhipuAIEmbeddings
-from core.models.llm import create_openrouter_client, generate_answer
-from core.cache.redis_client import get_redis_client, save_conversation_history, save_session_to_history, get_conversation_history_list, get_session_conversations
+from core.models.embedding_cache import create_embedding_model
+from core.models.llm import create_openrouter_client, create_async_openrouter_client, generate_answer
+from core.cache.semantic_cache import SemanticAnswerCache
+from core.context import set_entity_matcher
+from core.graph.entity_index import EntityIndexService, entity_name_properties
+from core.graph.schemas import EXAMPLE_SCHEMA
+from core.cache.redis_client import get_redis_client, close_redis_client, get_redis_pool_stats, save_conversation_history, save_session_to_history, get_conversation_history_page, get_session_conversations, migrate_session_index
 # 已迁移到 OpenRouter，不再使用 zai SDK
 from neo4j import GraphDatabase
 
-from .streaming_handler import chatbot_stream
+from .streaming_handler import chatbot_stream, cancel_on_disconnect
+from .metrics import metrics
+from .retrieval import RetrievalState, stream_retrieval
+from .graph_client import get_graph_client, close_graph_client
 
 
 # 设置环境变量
@@ -34,8 +43,38 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 os.environ["GRPC_VERBOSITY"] = "ERROR"  # 只显示错误级别的 gRPC 日志
 os.environ["GLOG_minloglevel"] = "2"  # 抑制 INFO 级别的日志（0=INFO, 1=WARNING, 2=ERROR）
 
+# 生命周期管理
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时创建进程级的图谱服务客户端（异步连接池，复用长连接）
+    app.state.graph_client = get_graph_client()
+    # 进程级的 Redis 客户端（所有请求共享同一个连接池）
+    app.state.redis_client = get_redis_client()
+    # 将旧版会话列表迁移到新的会话索引（已迁移时无操作）
+    try:
+        migrate_session_index(app.state.redis_client)
+    except Exception as e:
+        print(f"迁移会话索引失败: {str(e)}")
+    # 实体链接服务：上下文增强据此本地识别问题中的实体，图谱重新构建后自动重新加载
+    if neo4j_driver is not None and settings.CONTEXT_ENTITY_LINKING_ENABLED:
+        entity_service = EntityIndexService(neo4j_driver, entity_name_properties(EXAMPLE_SCHEMA))
+        try:
+            await asyncio.to_thread(entity_service.load)
+            set_entity_matcher(entity_service.entity_names)
+        except Exception as e:
+            print(f"⚠️ 加载实体名称索引失败，上下文增强将不使用实体识别: {str(e)}")
+    yield
+
+    set_entity_matcher(None)
+
+    # 关闭时释放连接池
+    await close_graph_client()
+    await async_client_llm.close()
+    close_redis_client()
+
+
 # 创建FastAPI应用
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # 添加CORS中间件
 app.add_middleware(
@@ -52,9 +91,12 @@ if web_dir.exists():
     app.mount("/static", StaticFiles(directory=str(web_dir)), name="static")
 
 # 初始化Embedding模型（智谱官方接口）
-embedding_model = ZhipuAIEmbeddings()
+embedding_model = create_embedding_model()
 print('embedding模型创建成功！！')
 
+# 语义答案缓存（相似问题直接返回缓存的答案）
+answer_cache = SemanticAnswerCache(embedding_model) if settings.SEMANTIC_CACHE_ENABLED else None
+
 # 创建 Milvus 向量存储（基于JSON文本）
 try:
     milvus_vectorstore = Milvus(
@@ -99,8 +141,9 @@ except Exception as e:
         print(f"❌ Milvus连接失败: {error_msg}")
         raise
 
-# 创建大语言模型客户端（使用 OpenRouter）
+# 创建大语言模型客户端（使用 OpenRouter）；流式接口使用异步客户端，等待片段时不阻塞其他请求
 client_llm = create_openrouter_client()
+async_client_llm = create_async_openrouter_client(timeout=settings.AGENT_LLM_TIMEOUT)
 print('创建 OpenRouter LLM 客户端成功...')
 
 # 初始化 Neo4j 驱动（用于知识图谱查询）
@@ -114,10 +157,6 @@ except Exception as e:
     neo4j_driver = None
     print(f'Neo4j 连接失败: {str(e)}，将跳过知识图谱查询')
 
-# 知识图谱服务地址
-GRAPH_API_URL = f'http://localhost:{settings.GRAPH_SERVICE_PORT}'
-GRAPH_API_URL_BACKUP = f'http://0.0.0.0:{settings.GRAPH_SERVICE_PORT}'
-
 
 def format_docs(docs):
     """格式化文档列表为字符串"""
@@ -179,12 +218,20 @@ async def api_info():
             "POST /": "问答接口，需要传递 {'question': '你的问题'}",
             "GET /api/info": "API信息",
             "POST /api/new_session": "创建新会话",
-            "GET /api/sessions": "获取历史会话列表"
+            "GET /api/sessions": "获取历史会话列表（支持 cursor、limit 分页参数）",
+            "GET /api/metrics": "服务运行指标"
         },
-        "port": settings.AGENT_SERVICE_PORT
+        "port": settings.AGENT_SERVICE_PORT,
+        "redis_pool": get_redis_pool_stats()
     }
 
 
+@app.get("/api/metrics")
+async def api_metrics():
+    """服务运行指标接口（流式请求完成/取消次数、首个回答片段耗时等）"""
+    return metrics.snapshot()
+
+
 @app.post("/api/new_session")
 async def create_new_session(request: Request):
     """
@@ -224,19 +271,24 @@ async def create_new_session(request: Request):
 
 
 @app.get("/api/sessions")
-async def get_sessions():
+async def get_sessions(cursor: Optional[str] = None, limit: int = 50):
     """
     获取历史会话列表接口
-    返回所有历史会话，用于在右侧历史记录中显示
+    返回历史会话，用于在右侧历史记录中显示；支持游标分页
+    
+    Args:
+        cursor: 上一页返回的 next_cursor，为空时从最新的会话开始
+        limit: 每页数量，默认50
     """
     try:
         redis_client = get_redis_client()
-        sessions = get_conversation_history_list(redis_client)
+        sessions, next_cursor = get_conversation_history_page(redis_client, limit=max(1, min(limit, 200)), cursor=cursor)
         
         return {
             'status': 200,
             'sessions': sessions,
-            'count': len(sessions)
+            'count': len(sessions),
+            'next_cursor': next_cursor
         }
     except Exception as e:
         print(f"获取历史会话列表失败: {str(e)}")
@@ -244,6 +296,7 @@ async def get_sessions():
             'status': 500,
             'sessions': [],
             'count': 0,
+            'next_cursor': None,
             'error': str(e)
         }
 
@@ -276,6 +329,76 @@ async def get_session_detail(session_id: str):
             'error': str(e)
         }
 
+async def answer_with_retrieval(query: str):
+    """
+    检索增强生成：并发检索向量库与知识图谱，合并上下文后调用 LLM 生成回答
+    
+    Args:
+        query: 用户问题
+        
+    Returns:
+        tuple: (response, search_path, search_stages)
+    """
+    # 并发执行向量检索与知识图谱查询，共享同一个截止时间
+    retrieval_state = RetrievalState()
+    async for _ in stream_retrieval(
+        query,
+        retrieval_state,
+        milvus_vectorstore=milvus_vectorstore,
+        format_docs_func=format_docs,
+        graph_client=get_graph_client()
+    ):
+        pass
+    search_path = retrieval_state.search_path
+    search_stages = retrieval_state.search_stages
+    context = retrieval_state.context
+
+    # 定义系统提示和用户提示
+    SYSTEM_PROMPT = """
+        System: 你是一个非常得力的医学助手, 你可以通过从数据库中检索出的信息找到问题的答案.
+        
+        重要要求：
+        1. 回答必须使用纯文本格式，不要使用任何 Markdown 格式（如 **粗体**、*斜体*、# 标题等）
+        2. 不要使用任何 HTML 标签（如 <p>、<br>、<div> 等）
+        3. 不要使用代码块格式（如 ``` 等）
+        4. 直接使用普通的中文文本回答，使用换行符分隔段落
+        5. 保持回答简洁、清晰、专业
+        6. **以知识图谱为核心，结合向量搜索结果**：
+           - 如果上下文中包含"【知识图谱查询结果】"部分，这些信息是从结构化知识图谱数据库中查询到的准确信息，必须作为回答的核心依据。
+           - 如果上下文中还包含"【向量检索补充信息】"部分，这些信息来自向量数据库检索，应该结合知识图谱结果一起使用，帮助完善和丰富答案。
+           - 知识图谱结果具有更高的准确性和权威性，应该优先使用；向量检索结果可以作为补充，提供更全面的信息。
+    """
+
+    USER_PROMPT = f"""
+        User: 利用介于<context>和</context>之间的从数据库中检索出的信息来回答问题, 具体的问题介于<question>和</question>之间.
+        
+        **重要提示 - 综合使用两路查询结果**：
+        1. **以知识图谱为核心**：如果上下文中包含"【知识图谱查询结果】"部分，这些信息是从结构化知识图谱数据库中查询到的准确信息，必须作为回答的核心依据和主要信息来源。
+        2. **结合向量搜索结果**：如果上下文中还包含"【向量检索补充信息】"部分，这些信息来自向量数据库检索，应该与知识图谱结果结合使用，帮助完善、丰富和补充答案，提供更全面的信息。
+        3. **综合策略**：
+           - 优先使用知识图谱查询结果作为核心答案
+           - 使用向量检索结果补充细节、背景信息或相关知识点
+           - 如果知识图谱结果和向量检索结果有冲突，以知识图谱结果为准
+           - 如果只有向量检索结果，可以使用它作为主要信息来源
+        4. 如果提供的信息为空, 则按照你的经验知识来给出尽可能严谨准确的回答。
+        5. 不知道的时候坦诚的承认不了解, 不要编造不真实的信息。
+        6. 请用纯文本格式回答，不要使用任何特殊标签或格式标记。
+        
+        <context>
+        {context}
+        </context>
+
+        <question>
+        {query}
+        </question>
+    """
+
+    # 使用 OpenRouter LLM 模型生成回复
+    response = generate_answer(client_llm, SYSTEM_PROMPT + USER_PROMPT)
+
+    return response, search_path, search_stages
+
+
 @app.post("/")
 async def chatbot(request: Request):
     """
@@ -314,15 +437,19 @@ async def chatbot(request: Request):
     
     if use_stream:
         # 返回流式响应
+        # 客户端断开连接时取消检索与回答生成
         return StreamingResponse(
-            chatbot_stream(
-                query=query,
-                session_id=session_id,
-                milvus_vectorstore=milvus_vectorstore,
-                client_llm=client_llm,
-                graph_api_url=GRAPH_API_URL,
-                graph_api_url_backup=GRAPH_API_URL_BACKUP,
-                format_docs_func=format_docs
+            cancel_on_disconnect(
+                chatbot_stream(
+                    query=query,
+                    session_id=session_id,
+                    milvus_vectorstore=milvus_vectorstore,
+                    client_llm=async_client_llm,
+                    graph_client=get_graph_client(),
+                    format_docs_func=format_docs,
+                    answer_cache=answer_cache
+                ),
+                request.is_disconnected
             ),
             media_type="text/event-stream",
             headers={
@@ -332,208 +459,28 @@ async def chatbot(request: Request):
             }
         )
 
-    # 初始化搜索路径和结果追踪
-    search_path = []
-    search_stages = {
-        'milvus_vector': {'status': 'pending', 'results': [], 'count': 0, 'description': '向量数据库检索'},
-        'knowledge_graph': {'status': 'pending', 'results': [], 'count': 0, 'description': '知识图谱查询', 'cypher_query': '', 'confidence': 0}
-    }
-
-    # 1、向量数据库检索
-    try:
-        recall_rerank_milvus = milvus_vectorstore.similarity_search(
-            query,
-            k=10,
-            ranker_type='rrf',
-            ranker_params={'k': 100}
-        )
-        
-        if recall_rerank_milvus:
-            context = format_docs(recall_rerank_milvus)
-            search_stages['milvus_vector']['status'] = 'success'
-            search_stages['milvus_vector']['count'] = len(recall_rerank_milvus)
-            search_stages['milvus_vector']['results'] = [
-                doc.page_content[:200] + '...' if len(doc.page_content) > 200 else doc.page_content
-                for doc in recall_rerank_milvus[:3]
-            ]
-            search_path.append('milvus_vector')
-        else:
-            context = ""
-            search_stages['milvus_vector']['status'] = 'empty'
-    except Exception as e:
-        context = ""
-        search_stages['milvus_vector']['status'] = 'error'
-        search_stages['milvus_vector']['error'] = str(e)
-        print(f'向量检索错误: {str(e)}')
-
-    # 2、知识图谱查询
-    graph_context = ""
-    current_api_url = GRAPH_API_URL
-    
-    try:
-        graph_data = {'natural_language_query': query}
-        
+    # 语义答案缓存：相似问题直接返回缓存的答案，跳过检索和 LLM 调用
+    cache_embedding = None
+    cached = None
+    if answer_cache is not None:
         try:
-            graph_response = requests.post(
-                f'{current_api_url}/generate',
-                json=graph_data,
-                timeout=60,
-                proxies={'http': None, 'https': None}
-            )
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-            print(f'⚠️ 主地址连接失败，尝试备用地址: {GRAPH_API_URL_BACKUP}')
-            current_api_url = GRAPH_API_URL_BACKUP
-            graph_response = requests.post(
-                f'{current_api_url}/generate',
-                json=graph_data,
-                timeout=60,
-                proxies={'http': None, 'https': None}
-            )
-        
-        if graph_response.status_code == 200:
-            graph_response_data = graph_response.json()
-            cypher_query = graph_response_data.get('cypher_query')
-            confidence = graph_response_data.get('confidence', 0)
-            is_valid = graph_response_data.get('validated', False)
-            
-            search_stages['knowledge_graph']['cypher_query'] = cypher_query or ''
-            search_stages['knowledge_graph']['confidence'] = float(confidence) if confidence else 0
-            
-            if cypher_query and float(confidence) >= 0.7 and is_valid:
-                print(f'知识图谱查询生成成功，置信度: {confidence}')
-                
-                # 验证查询
-                validate_data = {'cypher_query': cypher_query}
-                validate_response = requests.post(
-                    f'{current_api_url}/validate',
-                    json=validate_data,
-                    timeout=15,
-                    proxies={'http': None, 'https': None}
-                )
-                
-                if validate_response.status_code == 200:
-                    validate_data = validate_response.json()
-                    if validate_data.get('is_valid', False):
-                        # 执行查询
-                        execute_data = {'cypher_query': cypher_query}
-                        execute_response = requests.post(
-                            f'{current_api_url}/execute',
-                            json=execute_data,
-                            timeout=20,
-                            proxies={'http': None, 'https': None}
-                        )
-                        
-                        if execute_response.status_code == 200:
-                            execute_result = execute_response.json()
-                            if execute_result.get('success') and execute_result.get('records'):
-                                records = execute_result['records']
-                                
-                                # 格式化知识图谱查询结果
-                                graph_results = []
-                                entity_names = []
-                                
-                                for record in records:
-                                    for key, value in record.items():
-                                        if isinstance(value, dict):
-                                            if value.get('type') == 'Node':
-                                                props = value.get('properties', {})
-                                                if 'name' in props:
-                                                    entity_names.append(props['name'])
-                                            elif value.get('type') == 'Relationship':
-                                                props = value.get('properties', {})
-                                                if 'name' in props:
-                                                    entity_names.append(props['name'])
-                                        else:
-                                            if value is not None:
-                                                value_str = str(value).strip()
-                                                if value_str:
-                                                    entity_names.append(value_str)
-                                
-                                # 生成描述性文本
-                                if entity_names:
-                                    graph_results.append(f"查询结果：{', '.join(entity_names)}")
-                                
-                                if graph_results:
-                                    graph_context = "【知识图谱查询结果 - 这是从结构化知识图谱数据库中查询到的准确信息，请作为回答的核心依据】\n" + "\n".join(graph_results)
-                                    search_stages['knowledge_graph']['status'] = 'success'
-                                    search_stages['knowledge_graph']['count'] = len(entity_names)
-                                    search_stages['knowledge_graph']['results'] = graph_results
-                                    search_path.append('knowledge_graph')
-                                    print(f'✅ 知识图谱查询成功，返回 {len(entity_names)} 条结果')
-                                
-    except requests.exceptions.Timeout as e:
-        search_stages['knowledge_graph']['status'] = 'error'
-        search_stages['knowledge_graph']['error'] = f'请求超时: {str(e)}'
-        print(f'⚠️ 知识图谱服务请求超时: {str(e)}')
-    except requests.exceptions.ConnectionError as e:
-        search_stages['knowledge_graph']['status'] = 'error'
-        search_stages['knowledge_graph']['error'] = f'连接失败: {str(e)}'
-        print(f'⚠️ 知识图谱服务连接失败: {str(e)}')
-    except Exception as e:
-        search_stages['knowledge_graph']['status'] = 'error'
-        search_stages['knowledge_graph']['error'] = f'查询异常: {str(e)}'
-        print(f'⚠️ 知识图谱查询异常: {str(e)}')
-    
-    # 合并所有上下文 - 以知识图谱为核心，结合向量搜索结果
-    vector_context_label = ""
-    if context:
-        vector_context_label = "【向量检索补充信息 - 这些信息来自向量数据库检索，可作为补充和参考，帮助完善答案】"
-    
-    if graph_context:
-        # 如果有知识图谱结果，以知识图谱为核心，向量检索作为补充
-        if context:
-            context = graph_context + '\n\n' + vector_context_label + '\n' + context
-        else:
-            context = graph_context
-        print(f'📝 最终上下文长度: {len(context)} 字符（知识图谱为核心，向量检索作为补充）')
-    else:
-        # 如果没有知识图谱结果，使用向量检索结果
-        if context:
-            context = vector_context_label + '\n' + context
-        print('⚠️ 本次查询未使用知识图谱结果，仅使用向量检索结果')
-
-    # 定义系统提示和用户提示
-    SYSTEM_PROMPT = """
-        System: 你是一个非常得力的医学助手, 你可以通过从数据库中检索出的信息找到问题的答案.
-        
-        重要要求：
-        1. 回答必须使用纯文本格式，不要使用任何 Markdown 格式（如 **粗体**、*斜体*、# 标题等）
-        2. 不要使用任何 HTML 标签（如 <p>、<br>、<div> 等）
-        3. 不要使用代码块格式（如 ``` 等）
-        4. 直接使用普通的中文文本回答，使用换行符分隔段落
-        5. 保持回答简洁、清晰、专业
-        6. **以知识图谱为核心，结合向量搜索结果**：
-           - 如果上下文中包含"【知识图谱查询结果】"部分，这些信息是从结构化知识图谱数据库中查询到的准确信息，必须作为回答的核心依据。
-           - 如果上下文中还包含"【向量检索补充信息】"部分，这些信息来自向量数据库检索，应该结合知识图谱结果一起使用，帮助完善和丰富答案。
-           - 知识图谱结果具有更高的准确性和权威性，应该优先使用；向量检索结果可以作为补充，提供更全面的信息。
-    """
-
-    USER_PROMPT = f"""
-        User: 利用介于<context>和</context>之间的从数据库中检索出的信息来回答问题, 具体的问题介于<question>和</question>之间.
-        
-        **重要提示 - 综合使用两路查询结果**：
-        1. **以知识图谱为核心**：如果上下文中包含"【知识图谱查询结果】"部分，这些信息是从结构化知识图谱数据库中查询到的准确信息，必须作为回答的核心依据和主要信息来源。
-        2. **结合向量搜索结果**：如果上下文中还包含"【向量检索补充信息】"部分，这些信息来自向量数据库检索，应该与知识图谱结果结合使用，帮助完善、丰富和补充答案，提供更全面的信息。
-        3. **综合策略**：
-           - 优先使用知识图谱查询结果作为核心答案
-           - 使用向量检索结果补充细节、背景信息或相关知识点
-           - 如果知识图谱结果和向量检索结果有冲突，以知识图谱结果为准
-           - 如果只有向量检索结果，可以使用它作为主要信息来源
-        4. 如果提供的信息为空, 则按照你的经验知识来给出尽可能严谨准确的回答。
-        5. 不知道的时候坦诚的承认不了解, 不要编造不真实的信息。
-        6. 请用纯文本格式回答，不要使用任何特殊标签或格式标记。
-        
-        <context>
-        {context}
-        </context>
-
-        <question>
-        {query}
-        </question>
-    """
+            cache_embedding = await asyncio.to_thread(answer_cache.embed, query)
+            cached = await asyncio.to_thread(answer_cache.lookup, query, cache_embedding)
+        except Exception as e:
+            print(f"语义缓存查询失败: {str(e)}")
 
-    # 使用 OpenRouter LLM 模型生成回复
-    response = generate_answer(client_llm, SYSTEM_PROMPT + USER_PROMPT)
+    if cached:
+        print(f"✅ 语义缓存命中（相似度 {cached['similarity']:.3f}）: {cached['question']}")
+        response = cached['answer']
+        search_path = cached['search_path']
+        search_stages = cached['search_stages']
+    else:
+        response, search_path, search_stages = await answer_with_retrieval(query)
+        if answer_cache is not None:
+            try:
+                await asyncio.to_thread(answer_cache.store, query, response, search_stages, search_path, cache_embedding)
+            except Exception as e:
+                print(f"写入语义缓存失败: {str(e)}")
 
     # 保存对话历史到Redis
     new_session_id = None
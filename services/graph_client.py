@@ -0,0 +1,124 @@
+"""
+知识图谱服务客户端
+基于 httpx.AsyncClient 的进程级异步 HTTP 客户端，复用长连接调用 graph_service
+"""
+import time
+import httpx
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+
+class GraphServiceClient:
+    """知识图谱服务异步客户端（连接池 + 主备地址 + 单次调用超时）"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        backup_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None
+    ):
+        """
+        初始化客户端
+
+        Args:
+            base_url: 图谱服务主地址，为None时使用 localhost:GRAPH_SERVICE_PORT
+            backup_url: 图谱服务备用地址，为None时使用 0.0.0.0:GRAPH_SERVICE_PORT
+            max_connections: 连接池最大连接数，为None时使用 GRAPH_CLIENT_MAX_CONNECTIONS
+            max_keepalive_connections: 最大保持的空闲长连接数（0 表示不保持长连接），为None时使用 GRAPH_CLIENT_MAX_KEEPALIVE
+            keepalive_expiry: 空闲长连接的过期时间（秒），为None时使用 GRAPH_CLIENT_KEEPALIVE_EXPIRY
+        """
+        self.base_url = base_url or f'http://localhost:{settings.GRAPH_SERVICE_PORT}'
+        self.backup_url = backup_url or f'http://0.0.0.0:{settings.GRAPH_SERVICE_PORT}'
+
+        if max_connections is None:
+            max_connections = settings.GRAPH_CLIENT_MAX_CONNECTIONS
+        if max_keepalive_connections is None:
+            max_keepalive_connections = settings.GRAPH_CLIENT_MAX_KEEPALIVE
+        if keepalive_expiry is None:
+            keepalive_expiry = settings.GRAPH_CLIENT_KEEPALIVE_EXPIRY
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        # trust_env=False：不使用系统代理，等价于原先的 proxies={'http': None, 'https': None}
+        self._client = httpx.AsyncClient(limits=limits, trust_env=False)
+
+    async def post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        timeout: float,
+        deadline: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        向图谱服务发送 POST 请求
+        主地址连接失败时切换到备用地址；主地址超时只在请求截止时间前仍有剩余时间时才切换，
+        未设置截止时间时超时直接抛出，避免备用地址再等待一个完整的超时
+
+        Args:
+            path: 接口路径（如 /generate）
+            payload: JSON 请求体
+            timeout: 本次调用的超时时间（秒）
+            deadline: 请求级绝对截止时间（time.monotonic()），本次调用不会超过该时间
+
+        Returns:
+            httpx.Response 响应对象
+        """
+        # 已超过截止时间时直接抛出，不尝试备用地址
+        primary_timeout = self._effective_timeout(timeout, deadline)
+        try:
+            return await self._client.post(f'{self.base_url}{path}', json=payload, timeout=primary_timeout)
+        except httpx.ConnectError:
+            print(f'⚠️ 主地址连接失败，尝试备用地址: {self.backup_url}')
+        except httpx.TimeoutException:
+            if deadline is None or deadline - time.monotonic() <= 0:
+                raise
+            print(f'⚠️ 主地址请求超时，使用剩余时间尝试备用地址: {self.backup_url}')
+
+        return await self._client.post(
+            f'{self.backup_url}{path}',
+            json=payload,
+            timeout=self._effective_timeout(timeout, deadline)
+        )
+
+    @staticmethod
+    def _effective_timeout(timeout: float, deadline: Optional[float]) -> float:
+        """取单次调用超时与请求剩余时间中的较小值"""
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException("已超过请求截止时间")
+        return min(timeout, remaining)
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self._client.aclose()
+
+
+_graph_client: Optional[GraphServiceClient] = None
+
+
+def get_graph_client() -> GraphServiceClient:
+    """
+    获取进程级的图谱服务客户端（首次调用时创建）
+
+    Returns:
+        GraphServiceClient 实例
+    """
+    global _graph_client
+    if _graph_client is None:
+        _graph_client = GraphServiceClient()
+    return _graph_client
+
+
+async def close_graph_client():
+    """关闭进程级的图谱服务客户端"""
+    global _graph_client
+    if _graph_client is not None:
+        await _graph_client.aclose()
+        _graph_client = None
@@ -5,24 +5,34 @@
 """
 import os
 import re
+import time
+import asyncio
 import logging
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from contextlib import asynccontextmanager
-from openai import OpenAI
+from openai import APITimeoutError
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 from typing import List, Dict, Any
 
 from config.settings import settings
 from config.neo4j_config import NEO4J_CONFIG
-from core.graph.models import NL2CypherRequest, CypherResponse, ValidationRequest, ValidationResponse
-from core.graph.schemas import EXAMPLE_SCHEMA, GraphSchema
-from core.graph.prompts import create_system_prompt, create_validation_prompt
+from core.graph.models import (
+    NL2CypherRequest, CypherResponse, ValidationRequest, ValidationResponse,
+    ExplanationResponse, SuggestionResponse, AnswerRequest, AnswerResponse
+)
+from core.graph.schemas import GraphSchema
+from core.graph.prompts import create_validation_prompt
 from core.graph.validators import CypherValidator, RuleBasedValidator
-from core.framework import SchemaConfig, PromptGenerator
+from core.graph.cypher_cache import CypherGenerationCache
+from core.graph.result_cache import CypherResultCache, bump_graph_generation, is_read_only_query
+from core.graph.entity_index import EntityIndexService, entity_name_properties
+from core.graph.schema_provisioner import SchemaProvisioner
+from core.framework import PromptGenerator
+from core.framework.schema_registry import SchemaEntry, get_schema_registry
 from pydantic import BaseModel
 from typing import Optional
 
@@ -343,6 +353,10 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"连接 Neo4j 失败: {str(e)}")
             app.state.neo4j_driver = None
+        if app.state.neo4j_driver and settings.GRAPH_SCHEMA_VERIFY_ON_STARTUP:
+            await asyncio.to_thread(verify_graph_schema, app.state.neo4j_driver)
+        if app.state.neo4j_driver and settings.CYPHER_TEMPLATES_ENABLED:
+            await asyncio.to_thread(load_entity_index, app.state.neo4j_driver)
     else:
         app.state.validator = RuleBasedValidator()
         app.state.neo4j_driver = None
@@ -355,14 +369,28 @@ async def lifespan(app: FastAPI):
         logger.info("Neo4j 连接已关闭")
     if hasattr(app.state.validator, "close"):
         app.state.validator.close()
+    await client.close()
 
 
 # 创建 FastAPI 应用
 app = FastAPI(title='NL2Cypher API', lifespan=lifespan)
 
-# 初始化 OpenRouter 客户端
-from core.models.llm import create_openrouter_client
-client = create_openrouter_client()
+# 初始化 OpenRouter 异步客户端；LLM 调用不阻塞事件循环，同时在途的调用数量由信号量限制
+from core.models.llm import create_async_openrouter_client
+client = create_async_openrouter_client(timeout=settings.GRAPH_LLM_TIMEOUT, max_retries=1)
+llm_semaphore = asyncio.Semaphore(settings.GRAPH_LLM_MAX_CONCURRENCY)
+
+# NL2Cypher 生成结果缓存（按规范化问题 + 图模式指纹）
+cypher_cache = CypherGenerationCache() if settings.CYPHER_CACHE_ENABLED else None
+
+# 图模式注册表（每个领域/版本只加载一次，配置文件修改后自动重新加载）
+schema_registry = get_schema_registry()
+
+# Cypher 查询结果缓存（按清理后的查询 + 参数，随图谱版本号整体失效）
+result_cache = CypherResultCache() if settings.CYPHER_RESULT_CACHE_ENABLED else None
+
+# 实体链接服务（启动时从 Neo4j 加载，图谱重新构建后自动重新加载），用于查询模板识别问题中提到的实体
+entity_service: Optional[EntityIndexService] = None
 
 # 添加CORS中间件
 app.add_middleware(
@@ -374,8 +402,27 @@ app.add_middleware(
 )
 
 
-def generate_cypher_query(natural_language: str, query_type: str = None, 
-                          schema: GraphSchema = None, domain: str = None, version: str = None) -> str:
+async def chat_completion(messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """
+    调用 LLM 并返回回复文本（受并发信号量限制，超时由客户端的 GRAPH_LLM_TIMEOUT 控制）
+    
+    Args:
+        messages: 对话消息
+        max_tokens: 最大生成 token 数
+    """
+    async with llm_semaphore:
+        response = await client.chat.completions.create(
+            model=settings.OPENROUTER_LLM_MODEL,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=max_tokens,
+            stream=False
+        )
+    return response.choices[0].message.content.strip()
+
+
+async def generate_cypher_query(natural_language: str, query_type: str = None, 
+                                schema: GraphSchema = None, domain: str = None, version: str = None) -> str:
     """
     使用 OpenRouter LLM 生成 Cypher 查询
     
@@ -383,7 +430,7 @@ def generate_cypher_query(natural_language: str, query_type: str = None,
         natural_language: 自然语言查询
         query_type: 查询类型
         schema: GraphSchema对象（可选，如果提供则使用动态模式）
-        domain: 领域名称（可选，如果提供则从配置加载模式）
+        domain: 领域名称（可选，如果提供则从模式注册表获取，系统提示词已预先生成）
         version: 版本号（可选，配合domain使用）
     """
     # 确定使用的模式
@@ -391,70 +438,136 @@ def generate_cypher_query(natural_language: str, query_type: str = None,
         # 使用提供的模式
         prompt_generator = PromptGenerator(schema)
         system_prompt = prompt_generator.generate_system_prompt()
-    elif domain:
-        # 从配置加载模式
-        config_manager = SchemaConfig()
-        loaded_schema = config_manager.load_schema(domain, version)
-        if not loaded_schema:
-            raise HTTPException(status_code=404, detail=f"无法加载模式: {domain} v{version or 'latest'}")
-        prompt_generator = PromptGenerator(loaded_schema)
-        system_prompt = prompt_generator.generate_system_prompt()
     else:
-        # 使用默认模式
-        system_prompt = create_system_prompt(str(EXAMPLE_SCHEMA.model_dump()))
+        # 从模式注册表获取（未指定领域时为默认模式）
+        system_prompt = load_domain_schema(domain, version).system_prompt
     
     user_prompt = natural_language
     if query_type:
         user_prompt = f"{query_type}查询: {natural_language}"
     
     try:
-        response = client.chat.completions.create(
-            model=settings.OPENROUTER_LLM_MODEL,
-            messages=[
+        raw_query = await chat_completion(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.1,
-            max_tokens=2048,
-            stream=False
+            max_tokens=2048
         )
-        raw_query = response.choices[0].message.content.strip()
         return clean_cypher_query(raw_query)
+    except APITimeoutError:
+        raise HTTPException(status_code=504, detail=f"OpenRouter API超时（{settings.GRAPH_LLM_TIMEOUT} 秒）")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenRouter API错误: {str(e)}")
 
 
-def explain_cypher_query(cypher_query: str) -> str:
-    """解释Cypher查询"""
+async def explain_cypher_query(cypher_query: str) -> str:
+    """
+    解释Cypher查询（结果按查询缓存，生成失败时不缓存）
+    
+    Args:
+        cypher_query: Cypher查询语句
+    
+    Returns:
+        查询解释
+    """
+    cache_key = cypher_cache.make_text_key('explanation', cypher_query) if cypher_cache is not None else None
+    if cache_key:
+        cached = cypher_cache.get(cache_key)
+        if cached is not None:
+            return cached['text']
+    
     try:
-        response = client.chat.completions.create(
-            model=settings.OPENROUTER_LLM_MODEL,
-            messages=[
+        explanation = await chat_completion(
+            [
                 {"role": "system", "content": "你是一个Neo4j专家, 请用简单明了的语言解释Cypher查询."},
                 {"role": "user", "content": f"请解释以下Cypher查询: {cypher_query}"}
             ],
-            temperature=0.1,
-            max_tokens=1024,
-            stream=False
+            max_tokens=1024
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         return f"无法生成解释: {str(e)}"
+    
+    if cache_key:
+        cypher_cache.set(cache_key, {'text': explanation})
+    return explanation
+
+
+async def suggest_cypher_fixes(cypher_query: str) -> List[str]:
+    """
+    生成Cypher查询的改进建议（结果按查询缓存，生成失败时不缓存）
+    
+    Args:
+        cypher_query: Cypher查询语句
+    
+    Returns:
+        改进建议列表
+    """
+    cache_key = cypher_cache.make_text_key('suggestions', cypher_query) if cypher_cache is not None else None
+    if cache_key:
+        cached = cypher_cache.get(cache_key)
+        if cached is not None:
+            return cached['suggestions']
+    
+    try:
+        suggestions = [await chat_completion(
+            [
+                {"role": "system", "content": "你是一个Neo4j专家, 请提供Cypher查询的改进建议."},
+                {"role": "user", "content": create_validation_prompt(cypher_query)}
+            ],
+            max_tokens=1024
+        )]
+        logger.info(f"生成改进建议: {suggestions}")
+    except Exception as e:
+        logger.error(f"生成改进建议失败: {str(e)}")
+        return ["无法生成建议"]
+    
+    if cache_key:
+        cypher_cache.set(cache_key, {'suggestions': suggestions})
+    return suggestions
 
 
-def execute_cypher_query(cypher_query: str, driver) -> Dict[str, Any]:
-    """执行Cypher查询并返回结果"""
+def execute_cypher_query(
+    cypher_query: str,
+    driver,
+    clean: bool = True,
+    parameters: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    执行Cypher查询并返回结果
+    
+    只读查询的结果按 (清理后的查询, 参数) 缓存，图谱重新构建（版本号变化）后失效；
+    写操作执行后更新图谱版本号，使所有服务实例的结果缓存失效
+    
+    Args:
+        cypher_query: Cypher查询语句
+        driver: Neo4j驱动
+        clean: 是否先清理查询（由 generate_cypher_query 生成的查询已清理过，可跳过）
+        parameters: 查询参数（可选）
+    """
     if not driver:
         raise HTTPException(status_code=503, detail="Neo4j 连接不可用")
     
-    cypher_query = clean_cypher_query(cypher_query)
+    if clean:
+        cypher_query = clean_cypher_query(cypher_query)
+    
+    read_only = is_read_only_query(cypher_query)
+    generation = None
+    if result_cache is not None and read_only:
+        generation = result_cache.current_generation(driver)
+        if generation is not None:
+            cache_key = result_cache.make_key(cypher_query, parameters)
+            cached = result_cache.get(cache_key, generation)
+            if cached is not None:
+                logger.info(f"查询结果缓存命中，返回 {cached['count']} 条记录")
+                return {"success": True, **cached, "execution_time": 0.0, "cached": True}
     
     logger.info(f"执行 Cypher 查询: {cypher_query}")
     start_time = datetime.now()
     
     try:
         with driver.session() as session:
-            result = session.run(cypher_query)
+            result = session.run(cypher_query, parameters or {})
             
             records = []
             for record in result:
@@ -485,11 +598,18 @@ def execute_cypher_query(cypher_query: str, driver) -> Dict[str, Any]:
             
             logger.info(f"查询执行成功，耗时: {execution_time:.3f}秒，返回 {result_count} 条记录")
             
+            if generation is not None:
+                result_cache.set(cache_key, generation, {"records": records, "count": result_count})
+            elif not read_only and result_cache is not None:
+                bump_graph_generation(session)
+                result_cache.invalidate()
+            
             return {
                 "success": True,
                 "records": records,
                 "count": result_count,
-                "execution_time": execution_time
+                "execution_time": execution_time,
+                "cached": False
             }
     except Exception as e:
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -498,21 +618,116 @@ def execute_cypher_query(cypher_query: str, driver) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"查询执行失败: {error_msg}")
 
 
-@app.post("/generate", response_model=CypherResponse)
-async def generate_cypher(request: NL2CypherRequest):
-    """生成Cypher查询端点"""
-    logger.info(f"收到生成查询请求: {request.natural_language_query}")
+def verify_graph_schema(driver):
+    """
+    检查默认图模式需要的约束和索引是否齐全（只检查，不创建；由 scripts/build_graph.py 创建）
     
-    cypher_query = generate_cypher_query(
-        request.natural_language_query,
-        request.query_type.value if request.query_type else None
-    )
-    logger.info(f"生成的 Cypher 查询: {cypher_query}")
+    Args:
+        driver: Neo4j驱动
+    """
+    try:
+        report = SchemaProvisioner(driver, schema_registry.default().schema).verify()
+    except Exception as e:
+        logger.error(f"检查约束和索引失败: {str(e)}")
+        return
+    if report['missing'] or report['pending']:
+        logger.warning(
+            f"图模式约束/索引不完整，按名称查找节点将按标签扫描；缺少: {report['missing']}，未上线: {report['pending']}"
+            "（运行 scripts/build_graph.py 构建图谱时会自动创建）"
+        )
+    else:
+        logger.info(f"图模式约束和索引已就绪（{len(report['online'])} 个）")
+
+
+def load_entity_index(driver):
+    """
+    创建实体链接服务，从 Neo4j 加载默认图模式中各标签节点的名称
     
-    explanation = explain_cypher_query(cypher_query)
-    logger.info(f"查询解释: {explanation}")
+    Args:
+        driver: Neo4j驱动
+    """
+    global entity_service
+    service = EntityIndexService(driver, entity_name_properties(schema_registry.default().schema))
+    try:
+        service.load()
+        entity_service = service
+    except Exception as e:
+        logger.error(f"加载实体名称索引失败，查询模板不可用: {str(e)}")
+
+
+def load_domain_schema(domain: str = None, version: str = None) -> SchemaEntry:
+    """
+    从模式注册表获取指定领域的图模式（含预先生成的系统提示词、标签集合和指纹）
+    
+    Args:
+        domain: 领域名称（可选，不提供时返回默认模式）
+        version: 版本号（可选，默认最新版本）
+    """
+    entry = schema_registry.get(domain, version)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"无法加载模式: {domain} v{version or 'latest'}")
+    return entry
+
+
+async def resolve_cypher_query(natural_language: str, query_type: str = None, domain: str = None,
+                         version: str = None, timings: Dict[str, float] = None,
+                         limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    生成并验证 Cypher 查询
+    
+    单实体、单关系的问题按查询模板直接生成参数化查询；其余问题调用 LLM 生成，
+    相同问题（同一图模式下）直接返回缓存结果
+    
+    Args:
+        natural_language: 自然语言查询
+        query_type: 查询类型
+        domain: 领域名称（可选，不提供时使用默认模式）
+        version: 版本号（可选，配合domain使用）
+        timings: 各阶段耗时记录（可选），写入 generate、validate
+        limit: 模板查询的结果数量上限（可选）
+        
+    Returns:
+        dict: cypher_query、confidence、validated、validation_errors、cached，模板查询另有 parameters、template
+    """
+    entry = load_domain_schema(domain, version)
+    timings = timings if timings is not None else {}
+    
+    if settings.CYPHER_TEMPLATES_ENABLED and entity_service is not None and query_type in (None, 'MATCH'):
+        phase_start = time.perf_counter()
+        matched = entry.templates.match(natural_language, entity_service.find(natural_language), limit)
+        if matched:
+            timings['generate'] = time.perf_counter() - phase_start
+            logger.info(f"命中查询模板 {matched.template.name}（实体: {matched.entity_name}）: {matched.cypher_query}")
+            # 模板由图模式生成，不需要再验证
+            return {
+                'cypher_query': matched.cypher_query,
+                'parameters': matched.parameters,
+                'template': matched.template.name,
+                'confidence': matched.confidence,
+                'validated': True,
+                'validation_errors': [],
+                'cached': False
+            }
+    
+    cache_key = None
+    if cypher_cache is not None:
+        cache_key = cypher_cache.make_key(natural_language, query_type, entry.fingerprint)
+        cached = cypher_cache.get(cache_key)
+        if cached:
+            logger.info(f"命中 Cypher 生成缓存: {cached['cypher_query']}")
+            cached['cached'] = True
+            return cached
+    
+    phase_start = time.perf_counter()
+    cypher_query = await generate_cypher_query(natural_language, query_type, domain=domain, version=version)
+    timings['generate'] = time.perf_counter() - phase_start
+    logger.info(f"生成的 Cypher 查询: {cypher_query}")
     
-    is_valid, errors = app.state.validator.validate_against_schema(cypher_query, EXAMPLE_SCHEMA)
+    phase_start = time.perf_counter()
+    is_valid, errors = app.state.validator.validate_against_schema(
+        cypher_query, entry.schema, entry.node_labels, entry.rel_types
+    )
+    timings['validate'] = time.perf_counter() - phase_start
     if errors:
         logger.warning(f"查询验证发现错误: {errors}")
     else:
@@ -522,21 +737,69 @@ async def generate_cypher(request: NL2CypherRequest):
     if errors:
         confidence = max(0.3, confidence - len(errors) * 0.1)
     
-    return CypherResponse(
-        cypher_query=cypher_query,
-        explanation=explanation,
-        confidence=confidence,
-        validated=is_valid,
-        validation_errors=errors
+    result = {
+        'cypher_query': cypher_query,
+        'confidence': confidence,
+        'validated': is_valid,
+        'validation_errors': errors
+    }
+    if cypher_cache is not None and cypher_query:
+        cypher_cache.set(cache_key, result)
+    return {**result, 'cached': False}
+
+
+@app.post("/generate", response_model=CypherResponse)
+async def generate_cypher(request: NL2CypherRequest, explain: bool = False):
+    """
+    生成Cypher查询端点
+    
+    默认只返回生成的查询；explain=true 时额外调用 LLM 生成解释（也可之后调用 /explain 获取）
+    """
+    logger.info(f"收到生成查询请求: {request.natural_language_query}")
+    
+    result = await resolve_cypher_query(
+        request.natural_language_query,
+        request.query_type.value if request.query_type else None,
+        limit=request.limit
     )
+    
+    explanation = ""
+    if explain and result['cypher_query']:
+        explanation = await explain_cypher_query(result['cypher_query'])
+        logger.info(f"查询解释: {explanation}")
+    
+    return CypherResponse(explanation=explanation, **result)
+
+
+@app.post("/explain", response_model=ExplanationResponse)
+async def explain_cypher(request: ValidationRequest):
+    """解释Cypher查询端点（按需调用，结果缓存）"""
+    logger.info(f"收到解释查询请求: {request.cypher_query}")
+    explanation = await explain_cypher_query(request.cypher_query)
+    return ExplanationResponse(cypher_query=request.cypher_query, explanation=explanation)
+
+
+@app.post("/suggest", response_model=SuggestionResponse)
+async def suggest_cypher(request: ValidationRequest):
+    """Cypher查询改进建议端点（按需调用，结果缓存）"""
+    logger.info(f"收到改进建议请求: {request.cypher_query}")
+    suggestions = await suggest_cypher_fixes(request.cypher_query)
+    return SuggestionResponse(cypher_query=request.cypher_query, suggestions=suggestions)
 
 
 @app.post("/validate", response_model=ValidationResponse)
-async def validate_cypher(request: ValidationRequest):
-    """验证Cypher查询端点"""
+async def validate_cypher(request: ValidationRequest, include_suggestions: bool = False):
+    """
+    验证Cypher查询端点
+    
+    默认只返回验证结果；include_suggestions=true 且验证失败时额外调用 LLM 生成改进建议（也可之后调用 /suggest 获取）
+    """
     logger.info(f"收到验证查询请求: {request.cypher_query}")
     
-    is_valid, errors = app.state.validator.validate_against_schema(request.cypher_query, EXAMPLE_SCHEMA)
+    entry = schema_registry.default()
+    is_valid, errors = app.state.validator.validate_against_schema(
+        request.cypher_query, entry.schema, entry.node_labels, entry.rel_types
+    )
     
     if is_valid:
         logger.info("查询验证通过")
@@ -544,23 +807,8 @@ async def validate_cypher(request: ValidationRequest):
         logger.warning(f"查询验证失败，发现 {len(errors)} 个错误: {errors}")
     
     suggestions = []
-    if errors:
-        try:
-            response = client.chat.completions.create(
-                model=settings.OPENROUTER_LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": "你是一个Neo4j专家, 请提供Cypher查询的改进建议."},
-                    {"role": "user", "content": create_validation_prompt(request.cypher_query)}
-                ],
-                temperature=0.1,
-                max_tokens=1024,
-                stream=False
-            )
-            suggestions = [response.choices[0].message.content.strip()]
-            logger.info(f"生成改进建议: {suggestions}")
-        except Exception as e:
-            suggestions = ["无法生成建议"]
-            logger.error(f"生成改进建议失败: {str(e)}")
+    if errors and include_suggestions:
+        suggestions = await suggest_cypher_fixes(request.cypher_query)
     
     return ValidationResponse(
         is_valid=is_valid,
@@ -578,7 +826,10 @@ async def execute_query(request: ValidationRequest):
         raise HTTPException(status_code=503, detail="Neo4j 连接不可用，无法执行查询")
     
     try:
-        result = execute_cypher_query(request.cypher_query, app.state.neo4j_driver)
+        # Neo4j 驱动是同步的，放到线程池中执行，避免阻塞事件循环
+        result = await asyncio.to_thread(
+            execute_cypher_query, request.cypher_query, app.state.neo4j_driver, parameters=request.parameters
+        )
         logger.info(f"查询执行完成，返回 {result['count']} 条记录")
         return result
     except HTTPException:
@@ -588,6 +839,47 @@ async def execute_query(request: ValidationRequest):
         raise HTTPException(status_code=500, detail=f"执行查询失败: {str(e)}")
 
 
+@app.post("/answer", response_model=AnswerResponse)
+async def answer_query(request: AnswerRequest):
+    """
+    一次往返完成生成、验证、执行
+    
+    生成的查询只验证一次、只清理一次；未通过验证或置信度不足时不执行，
+    执行失败时返回错误信息而不是抛出异常，调用方仍可拿到 Cypher 与置信度
+    """
+    logger.info(f"收到问答查询请求: {request.natural_language_query}")
+    timings = {}
+    start = time.perf_counter()
+    
+    generated = await resolve_cypher_query(
+        request.natural_language_query,
+        request.query_type.value if request.query_type else None,
+        timings=timings,
+        limit=request.limit
+    )
+    cypher_query = generated['cypher_query']
+    response = AnswerResponse(**generated)
+    
+    if response.validated and cypher_query and response.confidence >= request.min_confidence:
+        phase_start = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(
+                execute_cypher_query, cypher_query, getattr(app.state, "neo4j_driver", None),
+                clean=False, parameters=response.parameters
+            )
+            response.executed = True
+            response.records = result['records']
+            response.count = result['count']
+        except HTTPException as e:
+            response.error = str(e.detail)
+        timings['execute'] = time.perf_counter() - phase_start
+    
+    timings['total'] = time.perf_counter() - start
+    response.timings = timings
+    logger.info(f"问答查询完成，执行: {response.executed}，返回 {response.count} 条记录，耗时: {timings['total']:.3f}秒")
+    return response
+
+
 @app.get("/")
 async def root():
     """根路径，返回服务信息"""
@@ -599,11 +891,16 @@ async def root():
         "endpoints": {
             "POST /generate": "生成 Cypher 查询",
             "POST /validate": "验证 Cypher 查询",
+            "POST /explain": "解释 Cypher 查询（按需）",
+            "POST /suggest": "生成 Cypher 查询改进建议（按需）",
             "POST /execute": "执行 Cypher 查询",
+            "POST /answer": "一次往返完成生成、验证、执行",
             "GET /schema": "获取图数据库模式"
         },
         "port": settings.GRAPH_SERVICE_PORT,
-        "neo4j_connected": hasattr(app.state, "neo4j_driver") and app.state.neo4j_driver is not None
+        "neo4j_connected": hasattr(app.state, "neo4j_driver") and app.state.neo4j_driver is not None,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "entity_index": entity_service.stats() if entity_service is not None else None
     }
 
 
@@ -618,16 +915,8 @@ async def get_schema(domain: Optional[str] = None, version: Optional[str] = None
     """
     logger.info(f"获取图模式请求 - domain: {domain}, version: {version}")
     
-    if domain:
-        # 从配置加载模式
-        config_manager = SchemaConfig()
-        schema = config_manager.load_schema(domain, version)
-        if not schema:
-            raise HTTPException(status_code=404, detail=f"无法加载模式: {domain} v{version or 'latest'}")
-        return schema.model_dump()
-    else:
-        # 返回默认模式
-        return EXAMPLE_SCHEMA.model_dump()
+    # 从模式注册表获取（未指定领域时为默认模式）
+    return load_domain_schema(domain, version).schema_dict
 
 
 class DynamicNL2CypherRequest(BaseModel):
@@ -639,53 +928,28 @@ class DynamicNL2CypherRequest(BaseModel):
 
 
 @app.post("/generate-dynamic", response_model=CypherResponse)
-async def generate_cypher_dynamic(request: DynamicNL2CypherRequest):
+async def generate_cypher_dynamic(request: DynamicNL2CypherRequest, explain: bool = False):
     """
     生成Cypher查询端点（支持动态模式）
     
-    支持通过 domain 和 version 参数动态加载图模式
+    支持通过 domain 和 version 参数动态加载图模式；explain=true 时额外生成查询解释
     """
     logger.info(f"收到动态生成查询请求: {request.natural_language_query}, domain: {request.domain}")
     
     try:
-        cypher_query = generate_cypher_query(
+        result = await resolve_cypher_query(
             request.natural_language_query,
             request.query_type,
             domain=request.domain,
             version=request.version
         )
-        logger.info(f"生成的 Cypher 查询: {cypher_query}")
-        
-        explanation = explain_cypher_query(cypher_query)
-        logger.info(f"查询解释: {explanation}")
-        
-        # 加载用于验证的模式
-        if request.domain:
-            config_manager = SchemaConfig()
-            validation_schema = config_manager.load_schema(request.domain, request.version)
-            if not validation_schema:
-                logger.warning(f"无法加载验证模式: {request.domain} v{request.version or 'latest'}")
-                validation_schema = EXAMPLE_SCHEMA
-        else:
-            validation_schema = EXAMPLE_SCHEMA
-        
-        is_valid, errors = app.state.validator.validate_against_schema(cypher_query, validation_schema)
-        if errors:
-            logger.warning(f"查询验证发现错误: {errors}")
-        else:
-            logger.info("查询验证通过")
         
-        confidence = 0.9
-        if errors:
-            confidence = max(0.3, confidence - len(errors) * 0.1)
+        explanation = ""
+        if explain and result['cypher_query']:
+            explanation = await explain_cypher_query(result['cypher_query'])
+            logger.info(f"查询解释: {explanation}")
         
-        return CypherResponse(
-            cypher_query=cypher_query,
-            explanation=explanation,
-            confidence=confidence,
-            validated=is_valid,
-            validation_errors=errors
-        )
+        return CypherResponse(explanation=explanation, **result)
     except HTTPException:
         raise
     except Exception as e:
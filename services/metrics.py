@@ -0,0 +1,70 @@
+"""
+服务运行指标
+进程内的计数器与耗时统计，通过 Agent 服务的 /api/metrics 接口查看
+"""
+import threading
+from typing import Any, Dict
+
+
+class ServiceMetrics:
+    """进程内指标（计数器 + 数值观测的次数、总和、最大值）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._observations: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: int = 1):
+        """
+        增加计数器
+
+        Args:
+            name: 指标名称
+            value: 增加的数量
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        """
+        记录一次数值观测（如耗时）
+
+        Args:
+            name: 指标名称
+            value: 观测值
+        """
+        with self._lock:
+            stats = self._observations.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += value
+            stats['max'] = max(stats['max'], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取当前指标
+
+        Returns:
+            包含 counters 与 observations（count、avg、max）的字典
+        """
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'observations': {
+                    name: {
+                        'count': stats['count'],
+                        'avg': stats['total'] / stats['count'] if stats['count'] else 0.0,
+                        'max': stats['max']
+                    }
+                    for name, stats in self._observations.items()
+                }
+            }
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+
+# 进程级指标实例
+metrics = ServiceMetrics()
@@ -0,0 +1,421 @@
+"""
+检索编排服务
+并发执行向量检索与知识图谱检索，在共享的请求截止时间内合并两路结果
+"""
+import asyncio
+import time
+import httpx
+from typing import AsyncGenerator, Callable, Dict, Any, List, Optional, Tuple
+
+from config.settings import settings
+from services.graph_client import GraphServiceClient
+
+
+GRAPH_CONTEXT_HEADER = "【知识图谱查询结果 - 这是从结构化知识图谱数据库中查询到的准确信息，请作为回答的核心依据】"
+VECTOR_CONTEXT_LABEL = "【向量检索补充信息 - 这些信息来自向量数据库检索，可作为补充和参考，帮助完善答案】"
+
+
+def init_search_stages() -> Dict[str, Dict[str, Any]]:
+    """
+    初始化检索阶段追踪信息
+
+    Returns:
+        各检索阶段的初始状态字典
+    """
+    return {
+        'milvus_vector': {'status': 'pending', 'results': [], 'count': 0, 'description': '向量数据库检索'},
+        'knowledge_graph': {'status': 'pending', 'results': [], 'count': 0, 'description': '知识图谱查询', 'cypher_query': '', 'confidence': 0}
+    }
+
+
+class RetrievalState:
+    """单次请求的检索状态（检索路径、各阶段结果和两路上下文）"""
+
+    def __init__(self):
+        self.search_path: List[str] = []
+        self.search_stages = init_search_stages()
+        self.vector_context = ""
+        self.graph_context = ""
+
+    @property
+    def context(self) -> str:
+        """合并后的上下文"""
+        return merge_contexts(self.vector_context, self.graph_context)
+
+
+def merge_contexts(vector_context: str, graph_context: str) -> str:
+    """
+    合并所有上下文 - 以知识图谱为核心，结合向量搜索结果
+
+    Args:
+        vector_context: 向量检索上下文
+        graph_context: 知识图谱查询上下文
+
+    Returns:
+        合并后的上下文字符串
+    """
+    if graph_context:
+        # 如果有知识图谱结果，以知识图谱为核心，向量检索作为补充
+        if vector_context:
+            context = graph_context + '\n\n' + VECTOR_CONTEXT_LABEL + '\n' + vector_context
+        else:
+            context = graph_context
+        print(f'📝 最终上下文长度: {len(context)} 字符（知识图谱为核心，向量检索作为补充）')
+        return context
+
+    # 如果没有知识图谱结果，使用向量检索结果
+    print('⚠️ 本次查询未使用知识图谱结果，仅使用向量检索结果')
+    if vector_context:
+        return VECTOR_CONTEXT_LABEL + '\n' + vector_context
+    return ""
+
+
+def format_graph_records(records: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """
+    格式化知识图谱查询结果
+
+    Args:
+        records: 图谱服务返回的记录列表
+
+    Returns:
+        (描述性结果列表, 实体名称列表)
+    """
+    graph_results = []
+    entity_names = []
+
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, dict):
+                if value.get('type') in ('Node', 'Relationship'):
+                    props = value.get('properties', {})
+                    if 'name' in props:
+                        entity_names.append(props['name'])
+            else:
+                if value is not None:
+                    value_str = str(value).strip()
+                    if value_str:
+                        entity_names.append(value_str)
+
+    # 生成描述性文本
+    if entity_names:
+        graph_results.append(f"查询结果：{', '.join(entity_names)}")
+
+    return graph_results, entity_names
+
+
+def search_vector(milvus_vectorstore, query: str, format_docs_func) -> Dict[str, Any]:
+    """
+    向量数据库检索（同步，在线程中执行）
+
+    Args:
+        milvus_vectorstore: Milvus向量存储实例
+        query: 检索问题
+        format_docs_func: 格式化文档的函数
+
+    Returns:
+        dict: context（上下文）、stage（阶段状态更新）、event（阶段完成事件）
+    """
+    try:
+        recall_rerank_milvus = milvus_vectorstore.similarity_search(
+            query,
+            k=10,
+            ranker_type='rrf',
+            ranker_params={'k': 100}
+        )
+
+        if recall_rerank_milvus:
+            results = [
+                doc.page_content[:200] + '...' if len(doc.page_content) > 200 else doc.page_content
+                for doc in recall_rerank_milvus[:3]
+            ]
+            return {
+                'context': format_docs_func(recall_rerank_milvus),
+                'stage': {'status': 'success', 'count': len(recall_rerank_milvus), 'results': results},
+                'event': {
+                    'stage': 'milvus_vector',
+                    'status': 'success',
+                    'count': len(recall_rerank_milvus),
+                    'results': results,
+                    'message': f'向量检索完成，找到 {len(recall_rerank_milvus)} 条结果'
+                }
+            }
+
+        return {
+            'context': "",
+            'stage': {'status': 'empty'},
+            'event': {'stage': 'milvus_vector', 'status': 'empty', 'message': '向量检索未找到结果'}
+        }
+    except Exception as e:
+        print(f'向量检索错误: {str(e)}')
+        return {
+            'context': "",
+            'stage': {'status': 'error', 'error': str(e)},
+            'event': {
+                'stage': 'milvus_vector',
+                'status': 'error',
+                'error': str(e),
+                'message': f'向量检索失败: {str(e)}'
+            }
+        }
+
+
+async def search_graph(
+    query: str,
+    graph_client: GraphServiceClient,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    知识图谱查询（异步，不阻塞事件循环）
+
+    Args:
+        query: 检索问题
+        graph_client: 图谱服务客户端
+        on_progress: 进度回调，接收中间阶段事件（可选）
+        deadline: 请求级绝对截止时间（time.monotonic()），可选
+
+    Returns:
+        dict: context（上下文）、stage（阶段状态更新）、event（阶段完成事件，无结果时为None）
+            未执行（置信度不足或验证未通过）时 stage 状态为 skipped，执行后没有结果时为 empty
+    """
+    def report(event: Dict[str, Any]):
+        if on_progress:
+            on_progress(event)
+
+    stage: Dict[str, Any] = {}
+
+    try:
+        # 一次往返完成生成、验证与执行
+        answer_response = await graph_client.post(
+            '/answer',
+            {'natural_language_query': query, 'min_confidence': 0.7},
+            timeout=settings.GRAPH_ANSWER_TIMEOUT,
+            deadline=deadline
+        )
+        if answer_response.status_code != 200:
+            error = f'图谱服务返回状态码 {answer_response.status_code}'
+            print(f'⚠️ {error}')
+            stage.update({'status': 'error', 'error': error})
+            return {
+                'context': "",
+                'stage': stage,
+                'event': {'stage': 'knowledge_graph', 'status': 'error', 'error': error, 'message': '知识图谱查询失败'}
+            }
+
+        answer_data = answer_response.json()
+        cypher_query = answer_data.get('cypher_query')
+        confidence = answer_data.get('confidence', 0)
+
+        stage['cypher_query'] = cypher_query or ''
+        stage['confidence'] = float(confidence) if confidence else 0
+        stage['timings'] = answer_data.get('timings', {})
+
+        if answer_data.get('executed') and answer_data.get('records'):
+            print(f'知识图谱查询生成成功，置信度: {confidence}')
+            graph_results, entity_names = format_graph_records(answer_data['records'])
+            if graph_results:
+                print(f'✅ 知识图谱查询成功，返回 {len(entity_names)} 条结果')
+                stage.update({'status': 'success', 'count': len(entity_names), 'results': graph_results})
+                return {
+                    'context': GRAPH_CONTEXT_HEADER + "\n" + "\n".join(graph_results),
+                    'stage': stage,
+                    'event': {
+                        'stage': 'knowledge_graph',
+                        'status': 'success',
+                        'count': len(entity_names),
+                        'results': graph_results,
+                        'cypher_query': cypher_query,
+                        'confidence': stage['confidence'],
+                        'message': f'知识图谱查询完成，找到 {len(entity_names)} 条结果'
+                    }
+                }
+
+        # 未执行或无结果：仍然把生成的 Cypher 和置信度告知前端
+        report({
+            'stage': 'knowledge_graph',
+            'status': 'pending',
+            'cypher_query': stage['cypher_query'],
+            'confidence': stage['confidence'],
+            'message': f'已生成Cypher查询，置信度: {confidence}',
+            'stage_detail': 'executing' if answer_data.get('executed') else 'validating'
+        })
+        # 正常的检索结果（不是故障），与出错区分开，不影响答案缓存
+        stage['status'] = 'empty' if answer_data.get('executed') else 'skipped'
+        return {'context': "", 'stage': stage, 'event': None}
+
+    except httpx.TimeoutException as e:
+        print(f'⚠️ 知识图谱服务请求超时: {str(e)}')
+        stage.update({'status': 'error', 'error': f'请求超时: {str(e)}'})
+        event = {'stage': 'knowledge_graph', 'status': 'error', 'error': f'请求超时: {str(e)}', 'message': '知识图谱查询超时'}
+    except httpx.TransportError as e:
+        print(f'⚠️ 知识图谱服务连接失败: {str(e)}')
+        stage.update({'status': 'error', 'error': f'连接失败: {str(e)}'})
+        event = {'stage': 'knowledge_graph', 'status': 'error', 'error': f'连接失败: {str(e)}', 'message': '知识图谱服务连接失败'}
+    except Exception as e:
+        print(f'⚠️ 知识图谱查询异常: {str(e)}')
+        stage.update({'status': 'error', 'error': f'查询异常: {str(e)}'})
+        event = {'stage': 'knowledge_graph', 'status': 'error', 'error': str(e), 'message': '知识图谱查询异常'}
+
+    return {'context': "", 'stage': stage, 'event': event}
+
+
+async def stream_retrieval(
+    query: str,
+    state: RetrievalState,
+    milvus_vectorstore,
+    format_docs_func,
+    graph_client: GraphServiceClient,
+    deadline: Optional[float] = None
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    并发执行向量检索与知识图谱检索
+    按完成顺序产出 search_stage 事件，并将结果写入 state
+    两路检索共享同一个截止时间，超时未完成的分支标记为错误，其结果被丢弃
+
+    Args:
+        query: 检索问题
+        state: 检索状态对象，用于接收合并结果
+        milvus_vectorstore: Milvus向量存储实例
+        format_docs_func: 格式化文档的函数
+        graph_client: 图谱服务客户端
+        deadline: 绝对截止时间（time.monotonic()），为None时使用 RETRIEVAL_DEADLINE_SECONDS
+
+    Yields:
+        search_stage 事件数据
+    """
+    if deadline is None:
+        deadline = time.monotonic() + settings.RETRIEVAL_DEADLINE_SECONDS
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_graph_progress(event: Dict[str, Any]):
+        events.put_nowait(('progress', 'knowledge_graph', event))
+
+    tasks = {
+        'milvus_vector': asyncio.create_task(
+            asyncio.to_thread(search_vector, milvus_vectorstore, query, format_docs_func)
+        ),
+        'knowledge_graph': asyncio.create_task(
+            search_graph(query, graph_client, on_graph_progress, deadline)
+        ),
+    }
+    for stage_name, task in tasks.items():
+        task.add_done_callback(lambda t, name=stage_name: events.put_nowait(('done', name, t)))
+
+    yield {'stage': 'milvus_vector', 'status': 'pending', 'message': '开始向量数据库检索...'}
+    yield {
+        'stage': 'knowledge_graph',
+        'status': 'pending',
+        'message': '开始知识图谱查询...',
+        'stage_detail': 'generating'  # 正在生成 Cypher 查询
+    }
+
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                kind, stage_name, payload = await asyncio.wait_for(events.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+
+            if stage_name not in pending:
+                continue
+            if kind == 'progress':
+                yield payload
+                continue
+
+            pending.discard(stage_name)
+            if payload.cancelled():
+                continue
+            result = payload.result()
+            state.search_stages[stage_name].update(result['stage'])
+            if stage_name == 'milvus_vector':
+                state.vector_context = result['context']
+            else:
+                state.graph_context = result['context']
+            if state.search_stages[stage_name]['status'] == 'success':
+                state.search_path.append(stage_name)
+            if result['event']:
+                yield result['event']
+
+        # 截止时间已到，放弃未完成的分支
+        for stage_name in pending:
+            tasks[stage_name].cancel()
+            timeout_msg = '检索超时，已超过本次请求的截止时间'
+            state.search_stages[stage_name].update({'status': 'error', 'error': timeout_msg})
+            print(f'⚠️ {state.search_stages[stage_name]["description"]}超时，已跳过')
+            yield {'stage': stage_name, 'status': 'error', 'error': timeout_msg, 'message': timeout_msg}
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+
+
+class BackgroundRetrieval:
+    """
+    在后台任务中执行检索，缓存产出的 search_stage 事件
+
+    用于推测执行：上下文增强进行的同时先用原问题开始检索，
+    增强后问题不变时直接读取已缓存的事件和结果，问题被改写时取消
+    """
+
+    def __init__(
+        self,
+        query: str,
+        milvus_vectorstore,
+        format_docs_func,
+        graph_client: GraphServiceClient,
+        deadline: Optional[float] = None
+    ):
+        """
+        创建后台任务并立即开始检索（需要在事件循环中调用）
+
+        Args:
+            query: 检索问题
+            milvus_vectorstore: Milvus向量存储实例
+            format_docs_func: 格式化文档的函数
+            graph_client: 图谱服务客户端
+            deadline: 绝对截止时间（time.monotonic()），为None时使用 RETRIEVAL_DEADLINE_SECONDS
+        """
+        self.query = query
+        self.state = RetrievalState()
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(
+            milvus_vectorstore=milvus_vectorstore,
+            format_docs_func=format_docs_func,
+            graph_client=graph_client,
+            deadline=deadline
+        ))
+
+    async def _run(self, **kwargs):
+        try:
+            async for event in stream_retrieval(self.query, self.state, **kwargs):
+                self._events.put_nowait(event)
+        finally:
+            # 结束标记：正常完成、出错或被取消都会放入
+            self._events.put_nowait(None)
+
+    async def events(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        按产生顺序读取 search_stage 事件（包括读取前已缓存的事件），检索完成后结束
+
+        Yields:
+            search_stage 事件数据
+        """
+        while True:
+            event = await self._events.get()
+            if event is None:
+                break
+            yield event
+        # 检索出错时在这里抛出异常（已取消的检索直接结束）
+        await asyncio.wait({self._task})
+        if not self._task.cancelled() and self._task.exception():
+            raise self._task.exception()
+
+    def cancel(self):
+        """取消检索（已在线程中执行的向量检索会继续到结束，但结果被丢弃）"""
+        if not self._task.done():
+            self._task.cancel()
@@ -4,11 +4,17 @@
 """
 import json
 import re
+import time
+import asyncio
 import datetime
-import requests
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Awaitable, Callable, Optional
 
+from config.settings import settings
 from core.cache.redis_client import save_conversation_history
+from core.context.topic_memory import update_topic_memory
+from .retrieval import BackgroundRetrieval, RetrievalState, stream_retrieval
+from .graph_client import GraphServiceClient
+from .metrics import metrics
 
 
 async def send_event(event_type: str, data: dict) -> str:
@@ -26,14 +32,109 @@ async def send_event(event_type: str, data: dict) -> str:
     return f"event: {event_type}\ndata: {event_data}\n\n"
 
 
+def save_topic_memory(redis_client, session_id: str, new_session_id: Optional[str], enhanced_query: str, main_topic: Optional[str]):
+    """
+    回答完成后更新会话主题记忆，自动创建新会话时同时写入新会话，使后续追问仍能补全主题
+    
+    Args:
+        redis_client: Redis客户端实例
+        session_id: 当前会话ID
+        new_session_id: 自动创建的新会话ID（没有时为None）
+        enhanced_query: 本轮增强后的问题
+        main_topic: 本轮问题的核心主题
+    """
+    try:
+        for sid in filter(None, (session_id, new_session_id)):
+            update_topic_memory(redis_client, sid, enhanced_query, main_topic)
+    except Exception as e:
+        print(f"⚠️ 更新会话主题记忆失败: {str(e)}")
+
+
+async def cancel_on_disconnect(
+    events: AsyncGenerator[str, None],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: Optional[float] = None
+) -> AsyncGenerator[str, None]:
+    """
+    在客户端断开连接时取消事件流
+    
+    事件流在单独的任务中运行，每隔 poll_interval 秒检查一次客户端是否已断开；
+    断开后取消该任务，正在进行的检索（图谱服务请求）和 LLM 流式响应随之取消，不再写入对话历史
+    
+    Args:
+        events: SSE 事件流（如 chatbot_stream）
+        is_disconnected: 检查客户端是否已断开的协程函数（如 request.is_disconnected）
+        poll_interval: 检查间隔（秒），为None时使用 STREAM_DISCONNECT_POLL_INTERVAL
+        
+    Yields:
+        SSE格式的事件字符串
+    """
+    poll_interval = poll_interval or settings.STREAM_DISCONNECT_POLL_INTERVAL
+    # 队列长度为1：上一个事件被客户端取走后，事件流才继续产生下一个事件
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    finished = object()
+    
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+            return
+        finally:
+            await events.aclose()
+        await queue.put(finished)
+    
+    metrics.increment('stream_requests')
+    producer = asyncio.create_task(produce())
+    generating = False
+    completed = False
+    last_check = time.monotonic()
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                item = None
+            
+            if time.monotonic() - last_check >= poll_interval:
+                last_check = time.monotonic()
+                if await is_disconnected():
+                    print("⚠️ 客户端已断开连接，取消检索与回答生成")
+                    return
+            
+            if item is None:
+                continue
+            if item is finished:
+                completed = True
+                return
+            if isinstance(item, Exception):
+                raise item
+            if item.startswith('event: answer_start'):
+                generating = True
+            yield item
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+        if completed:
+            metrics.increment('stream_completed')
+        else:
+            metrics.increment('stream_cancelled')
+            metrics.increment('stream_cancelled_during_generation' if generating else 'stream_cancelled_during_retrieval')
+
+
 async def chatbot_stream(
     query: str,
     session_id: str,
     milvus_vectorstore,
     client_llm,
-    graph_api_url: str,
-    graph_api_url_backup: str,
-    format_docs_func
+    graph_client: GraphServiceClient,
+    format_docs_func,
+    answer_cache=None
 ) -> AsyncGenerator[str, None]:
     """
     流式处理医疗问答
@@ -43,10 +144,10 @@ async def chatbot_stream(
         query: 用户问题
         session_id: 会话ID
         milvus_vectorstore: Milvus向量存储实例
-        client_llm: DeepSeek LLM客户端
-        graph_api_url: 知识图谱服务主地址
-        graph_api_url_backup: 知识图谱服务备用地址
+        client_llm: OpenRouter 异步 LLM 客户端（AsyncOpenAI）
+        graph_client: 图谱服务异步客户端（进程级连接池）
         format_docs_func: 格式化文档的函数
+        answer_cache: 语义答案缓存（SemanticAnswerCache），为None时不使用缓存
         
     Yields:
         SSE格式的事件字符串
@@ -56,277 +157,126 @@ async def chatbot_stream(
         'session_id': session_id
     })
     
-    # 上下文增强：从历史对话中提取信息，增强当前问题
-    enhanced_query = query
-    was_enhanced = False
+    # 推测检索：上下文增强进行的同时，先用原问题开始检索（多数问题增强后不变）
+    speculative = None
+    if settings.SPECULATIVE_RETRIEVAL_ENABLED:
+        speculative = BackgroundRetrieval(
+            query,
+            milvus_vectorstore=milvus_vectorstore,
+            format_docs_func=format_docs_func,
+            graph_client=graph_client
+        )
     try:
-        from core.cache.redis_client import get_redis_client, get_session_conversations
-        from core.context.enhancer import enhance_query_with_context
+        # 上下文增强：问题完整时直接使用；需要补全时优先使用会话主题记忆，最后才读取历史调用大模型
+        enhanced_query = query
+        was_enhanced = False
+        main_topic = None
+        try:
+            from core.cache.redis_client import get_redis_client
+            from core.context.enhancer import enhance_query_tiered
         
-        # 获取对话历史
-        redis_client = get_redis_client()
-        history = get_session_conversations(redis_client, session_id)
+            redis_client = get_redis_client()
+            enhancement = await asyncio.to_thread(enhance_query_tiered, query, redis_client, session_id, 5)
+            enhanced_query, was_enhanced, main_topic = enhancement.enhanced_query, enhancement.was_enhanced, enhancement.main_topic
+            metrics.increment(f'context_enhance_{enhancement.tier}')
         
-        # 如果有历史记录，尝试增强问题
-        if history:
-            enhanced_query, was_enhanced = enhance_query_with_context(query, history, max_history=5)
-            
             if was_enhanced:
-                print(f"✅ 问题已增强: {query} -> {enhanced_query}")
+                print(f"✅ 问题已增强（{enhancement.tier}）: {query} -> {enhanced_query}")
                 # 发送问题增强事件（可选，用于前端显示）
                 yield await send_event('query_enhanced', {
                     'original_query': query,
                     'enhanced_query': enhanced_query,
                     'message': '问题已根据对话历史增强'
                 })
-    except Exception as e:
-        print(f"⚠️ 上下文增强失败，使用原问题: {str(e)}")
-        # 如果增强失败，使用原问题继续处理
-        enhanced_query = query
-    
-    # 初始化搜索路径和结果追踪
-    search_path = []
-    search_stages = {
-        'milvus_vector': {'status': 'pending', 'results': [], 'count': 0, 'description': '向量数据库检索'},
-        'knowledge_graph': {'status': 'pending', 'results': [], 'count': 0, 'description': '知识图谱查询', 'cypher_query': '', 'confidence': 0}
-    }
-    
-    # 发送向量检索开始事件
-    yield await send_event('search_stage', {
-        'stage': 'milvus_vector',
-        'status': 'pending',
-        'message': '开始向量数据库检索...'
-    })
-    
-    # 1、向量数据库检索（使用增强后的问题）
-    context = ""
-    try:
-        recall_rerank_milvus = milvus_vectorstore.similarity_search(
-            enhanced_query,  # 使用增强后的问题
-            k=10,
-            ranker_type='rrf',
-            ranker_params={'k': 100}
-        )
-        
-        if recall_rerank_milvus:
-            context = format_docs_func(recall_rerank_milvus)
-            search_stages['milvus_vector']['status'] = 'success'
-            search_stages['milvus_vector']['count'] = len(recall_rerank_milvus)
-            search_stages['milvus_vector']['results'] = [
-                doc.page_content[:200] + '...' if len(doc.page_content) > 200 else doc.page_content
-                for doc in recall_rerank_milvus[:3]
-            ]
-            search_path.append('milvus_vector')
-            
-            # 发送向量检索完成事件
-            yield await send_event('search_stage', {
-                'stage': 'milvus_vector',
-                'status': 'success',
-                'count': len(recall_rerank_milvus),
-                'results': search_stages['milvus_vector']['results'],
-                'message': f'向量检索完成，找到 {len(recall_rerank_milvus)} 条结果'
-            })
-        else:
-            context = ""
-            search_stages['milvus_vector']['status'] = 'empty'
-            yield await send_event('search_stage', {
-                'stage': 'milvus_vector',
-                'status': 'empty',
-                'message': '向量检索未找到结果'
-            })
-    except Exception as e:
-        context = ""
-        search_stages['milvus_vector']['status'] = 'error'
-        search_stages['milvus_vector']['error'] = str(e)
-        print(f'向量检索错误: {str(e)}')
-        yield await send_event('search_stage', {
-            'stage': 'milvus_vector',
-            'status': 'error',
-            'error': str(e),
-            'message': f'向量检索失败: {str(e)}'
-        })
-    
-    # 发送知识图谱查询开始事件
-    yield await send_event('search_stage', {
-        'stage': 'knowledge_graph',
-        'status': 'pending',
-        'message': '开始知识图谱查询...',
-        'stage_detail': 'generating'  # 正在生成 Cypher 查询
-    })
-    
-    # 2、知识图谱查询（使用增强后的问题）
-    graph_context = ""
-    current_api_url = graph_api_url
+        except Exception as e:
+            print(f"⚠️ 上下文增强失败，使用原问题: {str(e)}")
+            # 如果增强失败，使用原问题继续处理
+            enhanced_query = query
     
-    try:
-        graph_data = {'natural_language_query': enhanced_query}  # 使用增强后的问题
+        # 语义答案缓存：使用增强后的问题查找相似的已回答问题，命中时跳过检索和 LLM 调用
+        cache_embedding = None
+        if answer_cache is not None:
+            cached = None
+            try:
+                cache_embedding = await asyncio.to_thread(answer_cache.embed, enhanced_query)
+                cached = await asyncio.to_thread(answer_cache.lookup, enhanced_query, cache_embedding)
+            except Exception as e:
+                print(f"⚠️ 语义缓存查询失败: {str(e)}")
         
-        try:
-            graph_response = requests.post(
-                f'{current_api_url}/generate',
-                json=graph_data,
-                timeout=60,
-                proxies={'http': None, 'https': None}
-            )
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-            print(f'⚠️ 主地址连接失败，尝试备用地址: {graph_api_url_backup}')
-            current_api_url = graph_api_url_backup
-            graph_response = requests.post(
-                f'{current_api_url}/generate',
-                json=graph_data,
-                timeout=60,
-                proxies={'http': None, 'https': None}
-            )
-        
-        if graph_response.status_code == 200:
-            graph_response_data = graph_response.json()
-            cypher_query = graph_response_data.get('cypher_query')
-            confidence = graph_response_data.get('confidence', 0)
-            is_valid = graph_response_data.get('validated', False)
-            
-            search_stages['knowledge_graph']['cypher_query'] = cypher_query or ''
-            search_stages['knowledge_graph']['confidence'] = float(confidence) if confidence else 0
-            
-            # 发送Cypher查询生成完成事件
-            yield await send_event('search_stage', {
-                'stage': 'knowledge_graph',
-                'status': 'pending',
-                'cypher_query': cypher_query or '',
-                'confidence': float(confidence) if confidence else 0,
-                'message': f'已生成Cypher查询，置信度: {confidence}',
-                'stage_detail': 'validating'  # 切换到验证阶段
-            })
+            if cached:
+                print(f"✅ 语义缓存命中（相似度 {cached['similarity']:.3f}）: {cached['question']}")
+                yield await send_event('cache_hit', {
+                    'cached_question': cached['question'],
+                    'similarity': cached['similarity'],
+                    'message': '命中语义缓存，直接返回已有回答'
+                })
+                yield await send_event('answer_start', {
+                    'message': '开始生成回答...'
+                })
+                yield await send_event('answer_chunk', {
+                    'content': cached['answer']
+                })
             
-            if cypher_query and float(confidence) >= 0.7 and is_valid:
-                print(f'知识图谱查询生成成功，置信度: {confidence}')
-                
-                # 验证查询
-                validate_data = {'cypher_query': cypher_query}
-                validate_response = requests.post(
-                    f'{current_api_url}/validate',
-                    json=validate_data,
-                    timeout=15,
-                    proxies={'http': None, 'https': None}
-                )
-                
-                if validate_response.status_code == 200:
-                    validate_data = validate_response.json()
-                    if validate_data.get('is_valid', False):
-                        # 发送验证通过事件，切换到执行阶段
-                        yield await send_event('search_stage', {
-                            'stage': 'knowledge_graph',
-                            'status': 'pending',
-                            'cypher_query': cypher_query or '',
-                            'confidence': float(confidence) if confidence else 0,
-                            'stage_detail': 'executing'  # 切换到执行阶段
+                # 保存对话历史到Redis
+                new_session_id = None
+                try:
+                    from core.cache.redis_client import get_redis_client
+                    redis_client = get_redis_client()
+                    new_session_id, should_create_new = save_conversation_history(redis_client, session_id, query, cached['answer'])
+                    save_topic_memory(redis_client, session_id, new_session_id, enhanced_query, main_topic)
+                    if should_create_new and new_session_id:
+                        print(f"对话达到10条，自动创建新会话: {new_session_id}")
+                        yield await send_event('new_session_created', {
+                            'new_session_id': new_session_id,
+                            'old_session_id': session_id,
+                            'message': '对话达到10条，已自动创建新会话'
                         })
-                        
-                        # 执行查询
-                        execute_data = {'cypher_query': cypher_query}
-                        execute_response = requests.post(
-                            f'{current_api_url}/execute',
-                            json=execute_data,
-                            timeout=20,
-                            proxies={'http': None, 'https': None}
-                        )
-                        
-                        if execute_response.status_code == 200:
-                            execute_result = execute_response.json()
-                            if execute_result.get('success') and execute_result.get('records'):
-                                records = execute_result['records']
-                                
-                                # 格式化知识图谱查询结果
-                                graph_results = []
-                                entity_names = []
-                                
-                                for record in records:
-                                    for key, value in record.items():
-                                        if isinstance(value, dict):
-                                            if value.get('type') == 'Node':
-                                                props = value.get('properties', {})
-                                                if 'name' in props:
-                                                    entity_names.append(props['name'])
-                                            elif value.get('type') == 'Relationship':
-                                                props = value.get('properties', {})
-                                                if 'name' in props:
-                                                    entity_names.append(props['name'])
-                                        else:
-                                            if value is not None:
-                                                value_str = str(value).strip()
-                                                if value_str:
-                                                    entity_names.append(value_str)
-                                
-                                # 生成描述性文本
-                                        if entity_names:
-                                            graph_results.append(f"查询结果：{', '.join(entity_names)}")
-                                
-                                if graph_results:
-                                    graph_context = "【知识图谱查询结果 - 这是从结构化知识图谱数据库中查询到的准确信息，请作为回答的核心依据】\n" + "\n".join(graph_results)
-                                    search_stages['knowledge_graph']['status'] = 'success'
-                                    search_stages['knowledge_graph']['count'] = len(entity_names)
-                                    search_stages['knowledge_graph']['results'] = graph_results
-                                    search_path.append('knowledge_graph')
-                                    print(f'✅ 知识图谱查询成功，返回 {len(entity_names)} 条结果')
-                                    
-                                    # 发送知识图谱查询完成事件
-                                    yield await send_event('search_stage', {
-                                        'stage': 'knowledge_graph',
-                                        'status': 'success',
-                                        'count': len(entity_names),
-                                        'results': graph_results,
-                                        'cypher_query': cypher_query,
-                                        'confidence': float(confidence) if confidence else 0,
-                                        'message': f'知识图谱查询完成，找到 {len(entity_names)} 条结果'
-                                    })
-                                
-    except requests.exceptions.Timeout as e:
-        search_stages['knowledge_graph']['status'] = 'error'
-        search_stages['knowledge_graph']['error'] = f'请求超时: {str(e)}'
-        print(f'⚠️ 知识图谱服务请求超时: {str(e)}')
-        yield await send_event('search_stage', {
-            'stage': 'knowledge_graph',
-            'status': 'error',
-            'error': f'请求超时: {str(e)}',
-            'message': f'知识图谱查询超时'
-        })
-    except requests.exceptions.ConnectionError as e:
-        search_stages['knowledge_graph']['status'] = 'error'
-        search_stages['knowledge_graph']['error'] = f'连接失败: {str(e)}'
-        print(f'⚠️ 知识图谱服务连接失败: {str(e)}')
-        yield await send_event('search_stage', {
-            'stage': 'knowledge_graph',
-            'status': 'error',
-            'error': f'连接失败: {str(e)}',
-            'message': f'知识图谱服务连接失败'
-        })
-    except Exception as e:
-        search_stages['knowledge_graph']['status'] = 'error'
-        search_stages['knowledge_graph']['error'] = f'查询异常: {str(e)}'
-        print(f'⚠️ 知识图谱查询异常: {str(e)}')
-        yield await send_event('search_stage', {
-            'stage': 'knowledge_graph',
-            'status': 'error',
-            'error': str(e),
-            'message': f'知识图谱查询异常'
-        })
-    
-    # 合并所有上下文 - 以知识图谱为核心，结合向量搜索结果
-    vector_context_label = ""
-    if context:
-        vector_context_label = "【向量检索补充信息 - 这些信息来自向量数据库检索，可作为补充和参考，帮助完善答案】"
+                except Exception as e:
+                    print(f"保存对话历史失败: {str(e)}")
+            
+                now = datetime.datetime.now()
+                yield await send_event('answer_complete', {
+                    'response': cached['answer'],
+                    'status': 200,
+                    'time': now.strftime("%Y-%m-%d %H:%M:%S"),
+                    'session_id': session_id,
+                    'new_session_id': new_session_id if new_session_id else None,
+                    'new_session_created': new_session_id is not None,
+                    'search_path': cached['search_path'],
+                    'search_stages': cached['search_stages'],
+                    'cached': True
+                })
+                return
     
-    if graph_context:
-        # 如果有知识图谱结果，以知识图谱为核心，向量检索作为补充
-        if context:
-            context = graph_context + '\n\n' + vector_context_label + '\n' + context
+        # 增强后问题不变时使用推测检索的结果，问题被改写时取消并用增强后的问题重新检索
+        if speculative is not None and speculative.query == enhanced_query:
+            metrics.observe('speculative_retrieval_hit', 1.0)
+            retrieval_state = speculative.state
+            stage_events = speculative.events()
         else:
-            context = graph_context
-        print(f'📝 最终上下文长度: {len(context)} 字符（知识图谱为核心，向量检索作为补充）')
-    else:
-        # 如果没有知识图谱结果，使用向量检索结果
-        if context:
-            context = vector_context_label + '\n' + context
-        print('⚠️ 本次查询未使用知识图谱结果，仅使用向量检索结果')
+            if speculative is not None:
+                speculative.cancel()
+                metrics.observe('speculative_retrieval_hit', 0.0)
+                print("推测检索未命中（问题已改写），使用增强后的问题重新检索")
+            retrieval_state = RetrievalState()
+            stage_events = stream_retrieval(
+                enhanced_query,
+                retrieval_state,
+                milvus_vectorstore=milvus_vectorstore,
+                format_docs_func=format_docs_func,
+                graph_client=graph_client
+            )
+        # 按完成顺序发送阶段事件
+        async for stage_event in stage_events:
+            yield await send_event('search_stage', stage_event)
+    finally:
+        # 命中语义缓存、出错或客户端断开时取消未使用的推测检索
+        if speculative is not None:
+            speculative.cancel()
+    
+    search_path = retrieval_state.search_path
+    search_stages = retrieval_state.search_stages
+    context = retrieval_state.context
     
     # 发送开始生成回答事件
     yield await send_event('answer_start', {
@@ -375,8 +325,9 @@ async def chatbot_stream(
     
     # 使用 OpenRouter LLM 模型流式生成回复
     try:
-        from config.settings import settings
-        response = client_llm.chat.completions.create(
+        llm_start = time.perf_counter()
+        ttft = None
+        response = await client_llm.chat.completions.create(
             model=settings.OPENROUTER_LLM_MODEL,
             messages=[
                 {
@@ -390,15 +341,27 @@ async def chatbot_stream(
             stream=True,
         )
         
+        # 异步读取流式响应：等待下一个片段时不阻塞事件循环；
+        # 上一个片段被客户端取走后才继续读取，客户端读取慢时由连接自然形成背压
         full_response = ""
-        for chunk in response:
-            if chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                # 发送流式回答片段
-                yield await send_event('answer_chunk', {
-                    'content': content
-                })
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    if ttft is None:
+                        ttft = time.perf_counter() - llm_start
+                        metrics.observe('llm_ttft_seconds', ttft)
+                        print(f"首个回答片段耗时（TTFT）: {ttft:.3f}秒")
+                    full_response += content
+                    # 发送流式回答片段
+                    yield await send_event('answer_chunk', {
+                        'content': content
+                    })
+        finally:
+            # 正常结束或被取消（客户端断开）时都关闭上游连接，停止继续生成
+            await response.close()
+        generation_time = time.perf_counter() - llm_start
+        metrics.observe('llm_generation_seconds', generation_time)
         
         # 后处理：移除可能的 Markdown 格式标记
         full_response = re.sub(r'\*\*(.*?)\*\*', r'\1', full_response)
@@ -410,11 +373,21 @@ async def chatbot_stream(
         full_response = re.sub(r'\n{3,}', '\n\n', full_response)
         full_response = full_response.strip()
         
+        # 写入语义答案缓存
+        if answer_cache is not None:
+            try:
+                await asyncio.to_thread(
+                    answer_cache.store, enhanced_query, full_response, search_stages, search_path, cache_embedding
+                )
+            except Exception as e:
+                print(f"⚠️ 写入语义缓存失败: {str(e)}")
+        
         # 保存对话历史到Redis
         new_session_id = None
         try:
             redis_client = get_redis_client()
             new_session_id, should_create_new = save_conversation_history(redis_client, session_id, query, full_response)
+            save_topic_memory(redis_client, session_id, new_session_id, enhanced_query, main_topic)
             
             # 如果达到10条，需要创建新会话
             if should_create_new and new_session_id:
@@ -430,16 +403,19 @@ async def chatbot_stream(
         
         # 发送最终结果
         now = datetime.datetime.now()
-        time = now.strftime("%Y-%m-%d %H:%M:%S")
         yield await send_event('answer_complete', {
             'response': full_response,
             'status': 200,
-            'time': time,
+            'time': now.strftime("%Y-%m-%d %H:%M:%S"),
             'session_id': session_id,  # 当前回答仍属于旧会话
             'new_session_id': new_session_id if new_session_id else None,  # 如果创建了新会话，返回新的session_id供下次使用
             'new_session_created': new_session_id is not None,  # 标识是否创建了新会话
             'search_path': search_path,
-            'search_stages': search_stages
+            'search_stages': search_stages,
+            'timings': {
+                'ttft': ttft,
+                'generation': generation_time
+            }
         })
         
     except Exception as e:
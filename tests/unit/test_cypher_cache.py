@@ -0,0 +1,73 @@
+"""
+NL2Cypher 生成缓存测试
+验证问题规范化、模式指纹和进程内 LRU
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.graph.schemas import GraphSchema, NodeSchema
+from core.graph.cypher_cache import CypherGenerationCache, schema_fingerprint, normalize_question
+
+
+def make_schema(label: str) -> GraphSchema:
+    return GraphSchema(nodes=[NodeSchema(label=label, properties={'name': 'string'})], relationships=[])
+
+
+def test_normalize_question():
+    """空白、大小写和结尾标点不影响缓存键"""
+    assert normalize_question('  感冒有什么  症状？ ') == '感冒有什么 症状'
+    assert normalize_question('What is Flu?') == 'what is flu'
+
+
+def test_key_depends_on_schema():
+    """图模式变化后缓存键随之变化"""
+    fp_a = schema_fingerprint(make_schema('Disease'))
+    fp_b = schema_fingerprint(make_schema('Drug'))
+    assert fp_a == schema_fingerprint(make_schema('Disease'))
+    assert fp_a != fp_b
+    assert CypherGenerationCache.make_key('感冒', None, fp_a) != CypherGenerationCache.make_key('感冒', None, fp_b)
+    assert CypherGenerationCache.make_key('感冒？', None, fp_a) == CypherGenerationCache.make_key('感冒', None, fp_a)
+
+
+def test_lru_eviction():
+    """超出容量时淘汰最久未使用的条目"""
+    cache = CypherGenerationCache(max_entries=2, use_redis=False)
+    cache.set('a', {'cypher_query': 'A'})
+    cache.set('b', {'cypher_query': 'B'})
+    assert cache.get('a') == {'cypher_query': 'A'}
+    cache.set('c', {'cypher_query': 'C'})
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2}
+
+
+def test_cached_value_is_copied():
+    """调用方修改返回值不影响缓存内容"""
+    cache = CypherGenerationCache(use_redis=False)
+    cache.set('k', {'cypher_query': 'MATCH (n) RETURN n'})
+    value = cache.get('k')
+    value['cached'] = True
+    assert 'cached' not in cache.get('k')
+
+
+def test_text_key_by_kind():
+    """查询解释与改进建议使用不同的缓存键，且与生成缓存键不冲突"""
+    query = 'MATCH (d:Disease) RETURN d.name'
+    explanation_key = CypherGenerationCache.make_text_key('explanation', query)
+    assert explanation_key == CypherGenerationCache.make_text_key('explanation', query + ' ')
+    assert explanation_key != CypherGenerationCache.make_text_key('suggestions', query)
+
+
+if __name__ == '__main__':
+    test_normalize_question()
+    test_key_depends_on_schema()
+    test_lru_eviction()
+    test_cached_value_is_copied()
+    test_text_key_by_kind()
+    print("✅ Cypher 生成缓存测试通过")
@@ -0,0 +1,95 @@
+"""
+Cypher 查询模板测试
+使用医疗图模式和手工构建的实体名称索引，验证模板匹配、参数化查询、按匹配程度计算的置信度，
+以及询问句式或关系关键词不明确时回退到 LLM
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.framework.cypher_templates import TemplateMatcher
+from core.graph.entity_index import EntityIndex
+from core.graph.schemas import EXAMPLE_SCHEMA
+
+
+def build_index():
+    index = EntityIndex()
+    index.add_all(['感冒', '高血压'], 'Disease')
+    index.add_all(['头痛', '头痛欲裂'], 'Symptom')
+    index.add('鸡蛋', 'Food')
+    return index
+
+
+def test_entity_longest_match():
+    """同一位置取最长的名称"""
+    index = build_index()
+    assert index.find('头痛欲裂是什么病') == [('头痛欲裂', 'Symptom', 0)]
+    assert [name for name, _, _ in index.find('感冒和高血压')] == ['感冒', '高血压']
+
+
+def test_forward_and_reverse_templates():
+    """已知疾病查症状、已知食物查疾病"""
+    matcher = TemplateMatcher(EXAMPLE_SCHEMA)
+    index = build_index()
+
+    question = '感冒有什么症状'
+    matched = matcher.match(question, index.find(question), limit=10)
+    assert matched.template.rel.type == 'has_symptom'
+    assert matched.cypher_query == (
+        'MATCH (e:Disease)-[:has_symptom]->(t:Symptom) WHERE e.name = $name '
+        'RETURN DISTINCT t.name AS name LIMIT $limit'
+    )
+    assert matched.parameters == {'name': '感冒', 'limit': 10}
+    assert matched.confidence == 0.95
+
+    question = '哪些疾病不能吃鸡蛋'
+    matched = matcher.match(question, index.find(question))
+    assert matched.template.rel.type == 'not_eat' and matched.template.reverse
+    assert matched.parameters == {'name': '鸡蛋'}
+
+
+def test_keywords_select_relationship():
+    """指向同一类型的多个关系按关键词区分"""
+    matcher = TemplateMatcher(EXAMPLE_SCHEMA)
+    index = build_index()
+    for question, rel_type in [('感冒不能吃什么', 'not_eat'), ('感冒推荐吃什么', 'recommand_eat')]:
+        assert matcher.match(question, index.find(question)).template.rel.type == rel_type
+
+
+def test_no_confident_match():
+    """多个实体、没有关系表达或多个模板同分时不匹配"""
+    matcher = TemplateMatcher(EXAMPLE_SCHEMA)
+    index = build_index()
+    for question in ['感冒和高血压有什么症状', '感冒怎么预防', '感冒吃什么药', '有什么症状']:
+        assert matcher.match(question, index.find(question)) is None
+
+
+def test_partial_matches_fall_back_to_llm():
+    """单字类型表达、同时询问多种类型、缺少关系关键词的问题不走模板"""
+    matcher = TemplateMatcher(EXAMPLE_SCHEMA)
+    index = build_index()
+    for question in ['感冒不能吃什么药', '感冒药有哪些副作用', '感冒的症状是什么原因引起的']:
+        assert matcher.match(question, index.find(question)) is None, question
+
+
+def test_confidence_follows_coverage():
+    """问题中与模板无关的内容越多，置信度越低"""
+    matcher = TemplateMatcher(EXAMPLE_SCHEMA)
+    index = build_index()
+    question = '请问感冒有什么症状呢'
+    matched = matcher.match(question, index.find(question))
+    assert matched.template.rel.type == 'has_symptom'
+    assert 0.75 <= matched.confidence < 0.95
+
+
+if __name__ == '__main__':
+    test_entity_longest_match()
+    test_forward_and_reverse_templates()
+    test_keywords_select_relationship()
+    test_no_confident_match()
+    test_partial_matches_fall_back_to_llm()
+    test_confidence_follows_coverage()
+    print("✅ Cypher 查询模板测试通过")
@@ -0,0 +1,110 @@
+"""
+Embedding 持久化缓存测试
+使用假的底层 Embedding 模型和临时 SQLite 文件，验证命中、去重、持久化和容量淘汰
+"""
+import sys
+import os
+import asyncio
+import tempfile
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.models.embedding_cache import CachedEmbeddings
+
+
+class FakeEmbeddings:
+    """模拟底层 Embedding 模型：向量为 [文本长度, 0.5]，记录每次请求的文本"""
+
+    model = 'fake-embedding'
+    dimensions = None
+
+    def __init__(self):
+        self.requested = []
+
+    def embed_documents(self, texts):
+        self.requested.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+
+def make_cache(db_path, fake=None, **kwargs):
+    return CachedEmbeddings(fake or FakeEmbeddings(), db_path=db_path, use_redis=False, **kwargs)
+
+
+def test_cache_hit_and_dedup():
+    """重复文本只请求一次，第二次调用全部命中缓存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = FakeEmbeddings()
+        cache = make_cache(os.path.join(tmp, 'emb.db'), fake)
+
+        first = cache.embed_documents(['感冒', '发烧', '感冒'])
+        second = cache.embed_documents(['发烧', '感冒'])
+
+        assert first == [[2.0, 0.5], [2.0, 0.5], [2.0, 0.5]]
+        assert second == [[2.0, 0.5], [2.0, 0.5]]
+        assert fake.requested == [['感冒', '发烧']]
+        stats = cache.stats()
+        assert stats['misses'] == 2 and stats['hits'] == 2 and stats['size'] == 2
+        cache.close()
+
+
+def test_cache_persists_across_instances():
+    """缓存写入文件，新实例不再请求已缓存的文本"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'emb.db')
+        make_cache(db_path).embed_documents(['头痛怎么办'])
+
+        fake = FakeEmbeddings()
+        cache = make_cache(db_path, fake)
+        assert cache.embed_query('头痛怎么办') == [5.0, 0.5]
+        assert fake.requested == []
+        cache.close()
+
+
+def test_cache_key_includes_model():
+    """模型不同的缓存互不共享"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'emb.db')
+        make_cache(db_path).embed_documents(['咳嗽'])
+
+        other = FakeEmbeddings()
+        other.model = 'other-embedding'
+        cache = make_cache(db_path, other)
+        cache.embed_documents(['咳嗽'])
+        assert other.requested == [['咳嗽']]
+        cache.close()
+
+
+def test_cache_eviction():
+    """超出容量时淘汰最久未访问的条目"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = make_cache(os.path.join(tmp, 'emb.db'), max_entries=2)
+        cache.embed_documents(['a'])
+        cache.embed_documents(['bb'])
+        cache.embed_documents(['ccc'])
+        assert cache.stats()['size'] == 2
+        cache.close()
+
+
+def test_async_embed_documents():
+    """异步接口与同步接口共享缓存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = FakeEmbeddings()
+        cache = make_cache(os.path.join(tmp, 'emb.db'), fake)
+        assert asyncio.run(cache.aembed_documents(['腹泻', '呕吐'])) == [[2.0, 0.5], [2.0, 0.5]]
+        assert cache.embed_documents(['呕吐']) == [[2.0, 0.5]]
+        assert fake.requested == [['腹泻', '呕吐']]
+        cache.close()
+
+
+if __name__ == '__main__':
+    test_cache_hit_and_dedup()
+    test_cache_persists_across_instances()
+    test_cache_key_includes_model()
+    test_cache_eviction()
+    test_async_embed_documents()
+    print("✅ Embedding 缓存测试通过")
@@ -0,0 +1,137 @@
+"""
+Embedding 批量请求测试
+使用假的 embeddings 客户端，验证分批、顺序、重试（只重试限流等临时错误）和异步接口
+"""
+import sys
+import os
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import httpx
+from openai import AuthenticationError, RateLimitError
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config.settings import settings
+from core.models.embeddings import ZhipuAIEmbeddings
+
+
+def api_error(error_class, status_code):
+    """构造 openai SDK 的 HTTP 状态错误"""
+    response = httpx.Response(status_code, request=httpx.Request('POST', 'http://localhost/embeddings'))
+    return error_class(f'HTTP {status_code}', response=response, body=None)
+
+
+class FakeEmbeddingsAPI:
+    """模拟 client.embeddings：向量为文本长度，返回顺序故意打乱"""
+
+    def __init__(self, failures: int = 0, error=None):
+        self.calls = []
+        self.failures = failures
+        self.error = error or api_error(RateLimitError, 429)
+        self.lock = threading.Lock()
+
+    def _response(self, texts):
+        data = [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(texts)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+    def create(self, model, input):
+        with self.lock:
+            self.calls.append(list(input))
+            if self.failures:
+                self.failures -= 1
+                raise self.error
+        return self._response(input)
+
+
+class FakeAsyncEmbeddingsAPI(FakeEmbeddingsAPI):
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        await asyncio.sleep(0)
+        return self._response(input)
+
+
+def make_embeddings(api, **kwargs):
+    client = SimpleNamespace(embeddings=api, api_key='test', base_url='http://localhost')
+    return ZhipuAIEmbeddings(client=client, model='embedding-3', retry_backoff=0, **kwargs)
+
+
+def test_embed_documents_batches_and_keeps_order():
+    """10 条文本、batch_size=3 时发起 4 次请求，结果顺序与输入一致"""
+    api = FakeEmbeddingsAPI()
+    embeddings = make_embeddings(api, batch_size=3, max_concurrency=4)
+    texts = ['x' * i for i in range(1, 11)]
+
+    vectors = embeddings.embed_documents(texts)
+
+    assert vectors == [[float(i)] for i in range(1, 11)]
+    assert len(api.calls) == 4
+    assert sorted(len(batch) for batch in api.calls) == [1, 3, 3, 3]
+
+
+def test_embed_documents_retries_failed_batch():
+    """单个批次失败后重试，不影响结果"""
+    api = FakeEmbeddingsAPI(failures=2)
+    embeddings = make_embeddings(api, batch_size=5, max_concurrency=1, max_retries=3)
+
+    vectors = embeddings.embed_documents(['a', 'bb'])
+
+    assert vectors == [[1.0], [2.0]]
+    assert len(api.calls) == 3
+
+
+def test_embed_documents_raises_after_retries():
+    """重试次数用尽后抛出 ValueError"""
+    api = FakeEmbeddingsAPI(failures=5)
+    embeddings = make_embeddings(api, max_retries=1)
+
+    try:
+        embeddings.embed_documents(['a'])
+        assert False, "应当抛出 ValueError"
+    except ValueError:
+        pass
+    assert len(api.calls) == 2
+
+
+def test_client_errors_not_retried():
+    """API Key 无效等 4xx 错误不重试；自动创建的客户端关闭 SDK 自带的重试"""
+    api = FakeEmbeddingsAPI(failures=5, error=api_error(AuthenticationError, 401))
+    embeddings = make_embeddings(api, max_retries=3)
+
+    try:
+        embeddings.embed_documents(['a'])
+        assert False, "应当抛出 ValueError"
+    except ValueError:
+        pass
+    assert len(api.calls) == 1
+
+    api_key = settings.ZHIPU_API_KEY
+    settings.ZHIPU_API_KEY = api_key or 'test'
+    try:
+        assert ZhipuAIEmbeddings().client.max_retries == 0
+    finally:
+        settings.ZHIPU_API_KEY = api_key
+
+
+def test_aembed_documents():
+    """异步接口同样分批并保持顺序"""
+    embeddings = make_embeddings(FakeEmbeddingsAPI(), batch_size=2, max_concurrency=2)
+    api = FakeAsyncEmbeddingsAPI()
+    embeddings._async_client = SimpleNamespace(embeddings=api)
+
+    vectors = asyncio.run(embeddings.aembed_documents(['a', 'bb', 'ccc', 'dddd', 'eeeee']))
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(api.calls) == 3
+
+
+if __name__ == '__main__':
+    test_embed_documents_batches_and_keeps_order()
+    test_embed_documents_retries_failed_batch()
+    test_embed_documents_raises_after_retries()
+    test_client_errors_not_retried()
+    test_aembed_documents()
+    print("✅ Embedding 批量请求测试通过")
@@ -0,0 +1,113 @@
+"""
+分层上下文增强测试
+使用假的 Redis 客户端验证本地指代判断、主题记忆补全和主题记忆更新（不调用大模型）
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.context.enhancer import enhance_query_tiered, needs_context, set_entity_matcher
+from core.context.topic_memory import get_topic_memory, update_topic_memory
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return command
+
+    def execute(self):
+        for name, args, kwargs in self.commands:
+            getattr(self.redis, name)(*args, **kwargs)
+
+
+class FakeRedis:
+    """模拟 Redis：只实现测试用到的哈希和列表命令"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+        self.ttl = {}
+
+    def hgetall(self, key):
+        return {k.encode(): v.encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+def test_needs_context():
+    """指代、承接和缺少主语的问题需要补全，完整问题不需要"""
+    set_entity_matcher(None)
+    assert needs_context('有什么特效药？')
+    assert needs_context('那怎么治疗')
+    assert needs_context('它会传染吗')
+    assert needs_context('症状呢')
+    assert not needs_context('感冒发烧应该吃什么药')
+    assert not needs_context('高血压患者的饮食注意事项')
+
+
+def test_entity_matcher_marks_self_contained():
+    """问题中出现已知实体时视为完整问题"""
+    set_entity_matcher(lambda text: [name for name in ('感冒', '高血压') if name in text])
+    try:
+        assert not needs_context('感冒')
+        result = enhance_query_tiered('高血压有什么症状', FakeRedis(), 's1')
+        assert result.tier == 'self_contained'
+        assert result.enhanced_query == '高血压有什么症状'
+        assert result.main_topic == '高血压'
+    finally:
+        set_entity_matcher(None)
+
+
+def test_topic_memory_tier():
+    """主题记忆中有主题时按规则补全，不读取对话历史"""
+    r = FakeRedis()
+    update_topic_memory(r, 's1', '感冒有什么症状', '感冒')
+    assert get_topic_memory(r, 's1')['main_topic'] == '感冒'
+
+    result = enhance_query_tiered('有什么特效药？', r, 's1')
+    assert result.tier == 'topic_memory'
+    assert result.was_enhanced
+    assert result.enhanced_query == '感冒有什么特效药？'
+
+
+def test_topic_cleared_when_unknown():
+    """本轮无法确定主题时删除旧主题，没有历史时返回原问题"""
+    r = FakeRedis()
+    update_topic_memory(r, 's1', '感冒有什么症状', '感冒')
+    update_topic_memory(r, 's1', '失眠怎么调理', None)
+    assert 'main_topic' not in get_topic_memory(r, 's1')
+
+    result = enhance_query_tiered('怎么预防', r, 's1')
+    assert result.tier == 'no_context'
+    assert result.enhanced_query == '怎么预防'
+
+
+if __name__ == '__main__':
+    test_needs_context()
+    test_entity_matcher_marks_self_contained()
+    test_topic_memory_tier()
+    test_topic_cleared_when_unknown()
+    print("✅ 分层上下文增强测试通过")
@@ -0,0 +1,125 @@
+"""
+实体名称索引测试
+验证 Aho-Corasick 最长匹配、重叠名称的处理、实体链接服务按图谱版本号重新加载，
+以及上下文增强使用实体匹配器提取历史实体（不调用大模型）
+"""
+import sys
+import os
+import time
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.context.enhancer import extract_entities_from_history, set_entity_matcher
+from core.graph.entity_index import EntityIndex, EntityIndexService, entity_name_properties
+from core.graph.schemas import EXAMPLE_SCHEMA
+
+
+class FakeResult:
+    def __init__(self, records):
+        self.records = records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, **parameters):
+        if '_GraphMeta' in query:
+            return FakeResult([{'generation': self.driver.generation}])
+        label = query.split('`')[1]
+        return FakeResult([{'name': name} for name in self.driver.nodes.get(label, [])])
+
+
+class FakeDriver:
+    """按标签返回节点名称的 Neo4j 驱动"""
+
+    def __init__(self, nodes, generation=1):
+        self.nodes = nodes
+        self.generation = generation
+
+    def session(self):
+        return FakeSession(self)
+
+
+def test_longest_and_overlapping_matches():
+    """同一位置取最长名称；重叠时保留靠左的匹配；包含在其他名称中的短名称也能被失败指针找到"""
+    index = EntityIndex.from_collections({
+        'Disease': ['感冒', '病毒性感冒', '高血压'],
+        'Symptom': ['头痛', '头痛欲裂', '血压高'],
+    })
+    assert index.find('病毒性感冒头痛欲裂') == [('病毒性感冒', 'Disease', 0), ('头痛欲裂', 'Symptom', 5)]
+    assert index.find('我得了感冒') == [('感冒', 'Disease', 3)]
+    # "高血压"与"血压高"在"高血压高"中重叠，取靠左的
+    assert index.find('高血压高怎么办') == [('高血压', 'Disease', 0)]
+    assert index.find('没有提到实体') == []
+
+
+def test_labels_and_incremental_add():
+    """同名实体属于多个标签时每个标签一项；构建后继续添加的名称在下次查找时生效"""
+    index = EntityIndex.from_collections({'Disease': ['贫血'], 'Symptom': ['贫血', '乏力']})
+    assert index.find('贫血') == [('贫血', 'Disease', 0), ('贫血', 'Symptom', 0)]
+    assert index.labels_of('乏力') == ['Symptom']
+
+    index.add('缺铁性贫血', 'Disease')
+    assert index.find('缺铁性贫血乏力') == [('缺铁性贫血', 'Disease', 0), ('乏力', 'Symptom', 5)]
+    assert len(index) == 3
+
+
+def test_service_reloads_on_generation_change():
+    """图谱版本号变化后在后台重新加载，期间继续使用旧索引"""
+    driver = FakeDriver({'Disease': ['感冒'], 'Food': ['鸡蛋']})
+    name_properties = entity_name_properties(EXAMPLE_SCHEMA)
+    assert name_properties['Disease'] == 'name'
+
+    service = EntityIndexService(driver, name_properties, check_interval=0)
+    service.load()
+    assert service.entity_names('感冒能吃鸡蛋吗') == ['感冒', '鸡蛋']
+    assert service.stats()['generation'] == 1
+
+    driver.nodes = {'Disease': ['感冒', '流感']}
+    assert service.entity_names('流感') == []
+
+    driver.generation = 2
+    for _ in range(100):
+        service.find('流感')
+        if service.stats()['generation'] == 2:
+            break
+        time.sleep(0.01)
+    assert service.entity_names('流感') == ['流感']
+    assert service.stats()['size'] == 2
+
+
+def test_history_entities_without_llm():
+    """设置实体匹配器后，从历史问题中本地提取实体，第一个为主题"""
+    index = EntityIndex.from_collections({'Disease': ['糖尿病'], 'Food': ['苹果']})
+    set_entity_matcher(lambda text: [name for name, _, _ in index.find(text)])
+    try:
+        history = [
+            {'question': '糖尿病有什么症状', 'answer': '...'},
+            {'question': '能吃苹果吗', 'answer': '...'},
+        ]
+        assert extract_entities_from_history(history) == {'topics': ['糖尿病'], 'entities': ['糖尿病', '苹果']}
+    finally:
+        set_entity_matcher(None)
+
+
+if __name__ == '__main__':
+    test_longest_and_overlapping_matches()
+    test_labels_and_incremental_add()
+    test_service_reloads_on_generation_change()
+    test_history_entities_without_llm()
+    print("✅ 实体名称索引测试通过")
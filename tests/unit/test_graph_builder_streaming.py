@@ -0,0 +1,240 @@
+"""
+流式图谱构建测试
+使用记录写入语句的 Neo4j 客户端，验证流式构建按 batch_size 分批写入、关系写入时两端节点已存在，
+且与一次性读取的构建写入相同的数据；主实体按批写入，失败时二分定位无法写入的行；
+关系按主实体分区并行写入，死锁等临时错误重试
+"""
+import sys
+import os
+import re
+import json
+import tempfile
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from neo4j.exceptions import TransientError
+
+from core.framework.graph_builder import GraphBuilder, partition_by_source
+from core.graph.schemas import GraphSchema, NodeSchema, RelationshipSchema
+
+
+SCHEMA = GraphSchema(
+    nodes=[
+        NodeSchema(label='Disease', properties={'name': 'string', 'desc': 'string', 'cause': 'string'}),
+        NodeSchema(label='Symptom', properties={'name': 'string'}),
+        NodeSchema(label='Food', properties={'name': 'string'}),
+    ],
+    relationships=[
+        RelationshipSchema(from_node='Disease', to_node='Symptom', type='has_symptom', properties={}),
+        RelationshipSchema(from_node='Disease', to_node='Food', type='not_eat', properties={}),
+    ]
+)
+
+
+class FakeResult:
+    def __iter__(self):
+        return iter([])
+
+    def consume(self):
+        pass
+
+    def single(self):
+        return {'count': 0, 'generation': 1}
+
+
+class FakeGraph:
+    """记录写入的节点、关系和每次 UNWIND 的行数"""
+
+    def __init__(self):
+        self.nodes = set()
+        self.relationships = set()
+        self.batch_sizes = []
+        self.dangling = []
+        self.entity_props = {}
+        self.entity_writes = 0
+        # 关系批次写入前需要抛出的错误（按主实体名称）
+        self.rel_errors = {}
+
+
+class FakeSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute_write(self, work):
+        return work(self)
+
+    def begin_transaction(self):
+        return FakeTransaction(self)
+
+    def run(self, query, **parameters):
+        graph = self.graph
+        if 'UNWIND $nodes' in query:
+            label = re.search(r'MERGE \(n:(\w+)', query).group(1)
+            graph.batch_sizes.append(len(parameters['nodes']))
+            graph.nodes.update((label, name) for name in parameters['nodes'])
+        elif 'UNWIND $rels' in query:
+            from_label, to_label = re.findall(r'MATCH \(\w:(\w+)', query)
+            rel_type = re.search(r'\[r:(\w+)\]', query).group(1)
+            for rel in parameters['rels']:
+                errors = graph.rel_errors.get(rel['from'])
+                if errors:
+                    raise errors.pop(0)
+            graph.batch_sizes.append(len(parameters['rels']))
+            for rel in parameters['rels']:
+                if (from_label, rel['from']) not in graph.nodes or (to_label, rel['to']) not in graph.nodes:
+                    graph.dangling.append(rel)
+                graph.relationships.add((rel['from'], rel_type, rel['to']))
+        elif 'UNWIND $rows' in query:
+            graph.entity_writes += 1
+            if any('bad' in row['props'] for row in parameters['rows']):
+                raise ValueError('Property values can only be of primitive types')
+            graph.batch_sizes.append(len(parameters['rows']))
+            for row in parameters['rows']:
+                graph.nodes.add(('Disease', row['name']))
+                graph.entity_props[row['name']] = row['props']
+        return FakeResult()
+
+
+class FakeTransaction:
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, **parameters):
+        return self.session.run(query, **parameters)
+
+    def commit(self):
+        pass
+
+
+class FakeDriver:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self):
+        return FakeSession(self.graph)
+
+
+class FakeClient:
+    def __init__(self):
+        self.graph = FakeGraph()
+        self.driver = FakeDriver(self.graph)
+
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def write_data_file(records):
+    data_file = tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False, encoding='utf-8')
+    for record in records:
+        data_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+    data_file.write('not json\n')
+    data_file.close()
+    return data_file.name
+
+
+def build(data_file, streaming):
+    client = FakeClient()
+    GraphBuilder(SCHEMA, client).build_graph(data_file, batch_size=3, streaming=streaming)
+    return client.graph
+
+
+def test_main_entities_isolate_bad_rows():
+    """主实体按 entity_batch_size 分批写入；某批失败时二分重试，只跳过无法写入的行"""
+    client = FakeClient()
+    builder = GraphBuilder(SCHEMA, client, entity_batch_size=8)
+    entities = [{'name': f'疾病{i}', 'desc': f'描述{i}', 'cause': ''} for i in range(16)]
+    entities[5]['bad'] = {'nested': True}
+
+    failed = builder._merge_main_entities(entities)
+
+    graph = client.graph
+    assert failed == 1
+    assert ('Disease', '疾病5') not in graph.nodes
+    assert len(graph.entity_props) == 15
+    # 空值不写入属性
+    assert graph.entity_props['疾病0'] == {'desc': '描述0'}
+    # 第二批一次写入；第一批失败后按 4、2、1 二分：1 + 2 + 2 + 2 + 2 次
+    assert graph.entity_writes == 1 + 1 + 2 + 2 + 2
+    assert max(graph.batch_sizes) == 8
+
+
+def test_streaming_matches_in_memory_build():
+    """流式构建分批写入，写入的数据与一次性构建相同"""
+    records = [
+        {
+            'name': f'疾病{i}',
+            'desc': f'描述{i}',
+            'symptom': [f'症状{i % 4}', f'症状{i % 7}'],
+            'food': [f'食物{i % 5}']
+        }
+        for i in range(20)
+    ]
+    data_file = write_data_file(records)
+    try:
+        streamed = build(data_file, streaming=True)
+        in_memory = build(data_file, streaming=False)
+    finally:
+        os.unlink(data_file)
+
+    assert streamed.nodes == in_memory.nodes
+    assert streamed.relationships == in_memory.relationships
+    assert len(streamed.relationships) == 20 + 20 + sum(1 for i in range(20) if i % 4 != i % 7)
+    assert max(streamed.batch_sizes) <= 3
+    assert max(in_memory.batch_sizes) <= 3
+    assert streamed.dangling == []
+
+
+def test_parallel_relationships_with_retries():
+    """关系按主实体分区并行写入；临时错误重试后成功，其他错误只影响所在批次"""
+    client = FakeClient()
+    builder = GraphBuilder(SCHEMA, client, relationship_workers=4)
+    builder.retry_backoff = 0
+    graph = client.graph
+    rels = [(f'疾病{i}', f'症状{i % 6}') for i in range(40)]
+    graph.nodes.update(('Disease', source) for source, _ in rels)
+    graph.nodes.update(('Symptom', target) for _, target in rels)
+    graph.rel_errors['疾病3'] = [TransientError('Neo.TransientError.Transaction.DeadlockDetected')] * 2
+    graph.rel_errors['疾病7'] = [ValueError('bad row')]
+
+    partitions = partition_by_source(rels, 4)
+    sources = [{source for source, _ in partition} for partition in partitions]
+    assert sum(len(partition) for partition in partitions) == 40
+    assert all(not (a & b) for i, a in enumerate(sources) for b in sources[i + 1:])
+
+    report = builder._create_relationships_batch(
+        [(source, 'has_symptom', 'Symptom', target) for source, target in rels], batch_size=3
+    )
+
+    stats = report['has_symptom:Symptom']
+    bad_partition = next(partition for partition in partitions if ('疾病7', '症状1') in partition)
+    bad_start = bad_partition.index(('疾病7', '症状1')) // 3 * 3
+    assert stats['retries'] == 2
+    assert stats['failed'] == len(bad_partition[bad_start:bad_start + 3])
+    assert stats['written'] + stats['failed'] == 40
+    assert ('疾病3', 'has_symptom', '症状3') in graph.relationships
+    assert ('疾病7', 'has_symptom', '症状1') not in graph.relationships
+    assert max(graph.batch_sizes) <= 3
+
+
+if __name__ == '__main__':
+    test_streaming_matches_in_memory_build()
+    test_main_entities_isolate_bad_rows()
+    test_parallel_relationships_with_retries()
+    print("✅ 流式图谱构建测试通过")
@@ -0,0 +1,87 @@
+"""
+知识图谱服务客户端测试
+使用 httpx.MockTransport 模拟主备地址，验证连接失败时切换备用地址、超时只在截止时间前仍有剩余时间时切换，
+以及已超过截止时间时不再尝试任何地址
+"""
+import sys
+import os
+import time
+import asyncio
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import httpx
+
+from services.graph_client import GraphServiceClient
+
+
+def create_client(primary_error=None):
+    """主地址按 primary_error 抛错（为None时正常返回），备用地址总是正常返回；记录每次请求的地址和超时"""
+    calls = []
+
+    def handler(request):
+        calls.append((request.url.host, request.extensions['timeout']['read']))
+        if request.url.host == 'primary' and primary_error is not None:
+            raise primary_error('模拟错误', request=request)
+        return httpx.Response(200, json={'host': request.url.host})
+
+    client = GraphServiceClient(base_url='http://primary', backup_url='http://backup')
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, calls
+
+
+def post(client, timeout=5.0, deadline=None):
+    async def run():
+        try:
+            return (await client.post('/generate', {'question': '感冒'}, timeout, deadline)).json()['host']
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_connect_error_fails_over():
+    """主地址连接失败时使用备用地址"""
+    client, calls = create_client(httpx.ConnectError)
+    assert post(client) == 'backup'
+    assert [host for host, _ in calls] == ['primary', 'backup']
+
+
+def test_timeout_without_deadline_does_not_fail_over():
+    """未设置截止时间时，主地址超时直接抛出"""
+    client, calls = create_client(httpx.ReadTimeout)
+    try:
+        post(client)
+        assert False, '应抛出超时'
+    except httpx.ReadTimeout:
+        pass
+    assert [host for host, _ in calls] == ['primary']
+
+
+def test_timeout_with_remaining_budget_fails_over():
+    """主地址超时且截止时间前仍有剩余时间时，备用地址使用剩余时间"""
+    client, calls = create_client(httpx.ReadTimeout)
+    assert post(client, timeout=5.0, deadline=time.monotonic() + 2.0) == 'backup'
+    assert [host for host, _ in calls] == ['primary', 'backup']
+    assert calls[0][1] <= 2.0
+    assert calls[1][1] <= calls[0][1]
+
+
+def test_deadline_passed_skips_both_addresses():
+    """已超过截止时间时直接抛出超时，不发送请求"""
+    client, calls = create_client()
+    try:
+        post(client, deadline=time.monotonic() - 1)
+        assert False, '应抛出超时'
+    except httpx.TimeoutException:
+        pass
+    assert calls == []
+
+
+if __name__ == '__main__':
+    test_connect_error_fails_over()
+    test_timeout_without_deadline_does_not_fail_over()
+    test_timeout_with_remaining_budget_fails_over()
+    test_deadline_passed_skips_both_addresses()
+    print("✅ 知识图谱服务客户端测试通过")
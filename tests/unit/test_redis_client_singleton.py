@@ -0,0 +1,62 @@
+"""
+Redis客户端单例测试
+通过注入工厂函数验证 get_redis_client() 只创建一次客户端
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.cache.redis_client import get_redis_client, set_redis_client_factory, close_redis_client
+
+
+class FakeConnectionPool:
+    def __init__(self):
+        self.disconnected = False
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class FakeRedis:
+    """只实现单例逻辑需要的接口"""
+
+    def __init__(self):
+        self.connection_pool = FakeConnectionPool()
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+        return True
+
+
+def test_redis_client_is_shared():
+    """多次调用返回同一个客户端，且只 PING 一次"""
+    created = []
+
+    def factory():
+        created.append(FakeRedis())
+        return created[-1]
+
+    set_redis_client_factory(factory)
+    try:
+        first = get_redis_client()
+        second = get_redis_client()
+        assert first is second
+        assert len(created) == 1
+        assert first.pings == 1
+
+        # 关闭后再次获取会重新创建
+        close_redis_client()
+        assert first.connection_pool.disconnected
+        assert get_redis_client() is not first
+        assert len(created) == 2
+    finally:
+        set_redis_client_factory(None)
+
+
+if __name__ == '__main__':
+    test_redis_client_is_shared()
+    print("✅ Redis客户端单例测试通过")
@@ -0,0 +1,104 @@
+"""
+Cypher 查询结果缓存测试
+使用假的 Neo4j 驱动模拟图谱版本号，验证只读判断、命中和版本号变化后的失效
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.graph.result_cache import CypherResultCache, is_read_only_query
+
+
+class FakeResult:
+    def __init__(self, record):
+        self.record = record
+
+    def single(self):
+        return self.record
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, **kwargs):
+        self.driver.reads += 1
+        return FakeResult({'generation': self.driver.generation})
+
+
+class FakeDriver:
+    """模拟 Neo4j 驱动：只返回当前图谱版本号"""
+
+    def __init__(self, generation=1):
+        self.generation = generation
+        self.reads = 0
+
+    def session(self):
+        return FakeSession(self)
+
+
+def test_read_only_query():
+    """包含写操作子句的查询不缓存"""
+    assert is_read_only_query("MATCH (d:Disease {name: '感冒'}) RETURN d")
+    assert not is_read_only_query("MATCH (n) DETACH DELETE n")
+    assert not is_read_only_query("merge (d:Disease {name: '感冒'})")
+
+
+def test_hit_and_parameters():
+    """相同查询和参数命中缓存，参数不同时不命中"""
+    cache = CypherResultCache(max_entries=10, max_records=10, check_interval=60)
+    driver = FakeDriver()
+    generation = cache.current_generation(driver)
+
+    key = cache.make_key('MATCH (d:Disease {name: $name}) RETURN d', {'name': '感冒'})
+    cache.set(key, generation, {'records': [{'d': '感冒'}], 'count': 1})
+    assert cache.get(key, generation) == {'records': [{'d': '感冒'}], 'count': 1}
+
+    other = cache.make_key('MATCH (d:Disease {name: $name}) RETURN d', {'name': '发烧'})
+    assert cache.get(other, generation) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_generation_change_invalidates():
+    """图谱版本号变化后清空缓存；检查间隔内不重复读取版本号"""
+    cache = CypherResultCache(max_entries=10, max_records=10, check_interval=0)
+    driver = FakeDriver(generation=1)
+    key = cache.make_key('MATCH (n) RETURN n')
+    cache.set(key, cache.current_generation(driver), {'records': [], 'count': 0})
+
+    driver.generation = 2
+    generation = cache.current_generation(driver)
+    assert generation == 2
+    assert cache.get(key, generation) is None
+    assert cache.stats()['size'] == 0
+
+    throttled = CypherResultCache(check_interval=60)
+    throttled.current_generation(driver)
+    throttled.current_generation(driver)
+    assert driver.reads == 3
+
+
+def test_large_results_not_cached():
+    """记录数超过上限的结果不缓存"""
+    cache = CypherResultCache(max_entries=10, max_records=2, check_interval=60)
+    generation = cache.current_generation(FakeDriver())
+    key = cache.make_key('MATCH (n) RETURN n')
+    cache.set(key, generation, {'records': [{}, {}, {}], 'count': 3})
+    assert cache.get(key, generation) is None
+
+
+if __name__ == '__main__':
+    test_read_only_query()
+    test_hit_and_parameters()
+    test_generation_change_invalidates()
+    test_large_results_not_cached()
+    print("✅ 查询结果缓存测试通过")
@@ -0,0 +1,133 @@
+"""
+保存对话记录脚本测试
+使用 fakeredis 执行服务端脚本，验证达到10条时转存会话、脚本返回值、会话索引数量限制、
+过期时间刷新，以及同一会话并发保存时只转存一次
+"""
+import sys
+import os
+import threading
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+# fakeredis 执行 Lua 脚本需要 lupa
+pytest.importorskip('lupa')
+
+from core.cache import redis_client
+from core.cache.redis_client import (
+    MAX_SESSIONS, SESSIONS_INDEX_KEY, create_session_in_history, save_conversation_history, session_meta_key
+)
+
+
+def run_script(r, session_id, question='问题', max_history=10, max_sessions=MAX_SESSIONS):
+    """直接执行脚本，返回 [对话条数, 是否转存, 被移出索引的会话ID]"""
+    script = r.register_script(redis_client.SAVE_CONVERSATION_SCRIPT)
+    return script(
+        keys=[f'chat:history:{session_id}', session_meta_key(session_id), SESSIONS_INDEX_KEY],
+        args=['{"question": "%s", "answer": "回答"}' % question, session_id, question,
+              '2024-01-01 00:00:00', 1700000000, 86400, max_history, 2592000, max_sessions]
+    )
+
+
+def test_rollover_at_ten_messages():
+    """第10条对话时转存会话，标题使用第一个问题；继续追加不会重复转存"""
+    r = fakeredis.FakeRedis()
+    create_session_in_history(r, 's1')
+
+    results = [save_conversation_history(r, 's1', f'问题{i}', '回答') for i in range(12)]
+
+    assert all(result == (None, False) for result in results[:9])
+    new_session_id, should_create_new = results[9]
+    assert should_create_new and new_session_id
+    assert results[10:] == [(None, False), (None, False)]
+    meta = r.hgetall(session_meta_key('s1'))
+    assert meta[b'title'] == '问题0'.encode('utf-8')
+    assert meta[b'message_count'] == b'12'
+    assert r.zscore(SESSIONS_INDEX_KEY, 's1') is not None
+
+
+def test_script_return_value():
+    """返回对话条数、是否转存以及被移出索引的会话ID"""
+    r = fakeredis.FakeRedis()
+    assert run_script(r, 's1', max_history=2) == [1, 0, []]
+    assert run_script(r, 's1', max_history=2) == [2, 1, []]
+    assert run_script(r, 's1', max_history=2) == [3, 0, []]
+
+
+def test_index_trimming():
+    """超出最多会话数量时，最旧的会话移出索引并删除其会话信息"""
+    r = fakeredis.FakeRedis()
+    for i in range(3):
+        r.zadd(SESSIONS_INDEX_KEY, {f'old{i}': i})
+        r.hset(session_meta_key(f'old{i}'), 'title', f'旧会话{i}')
+
+    assert run_script(r, 'new', max_history=1, max_sessions=2) == [1, 1, [b'old0', b'old1']]
+    assert r.zrange(SESSIONS_INDEX_KEY, 0, -1) == [b'old2', b'new']
+
+    # 通过 save_conversation_history 保存时，同时删除被移出会话的信息 Hash
+    for i in range(MAX_SESSIONS + 1):
+        r.zadd(SESSIONS_INDEX_KEY, {f'more{i}': i})
+        r.hset(session_meta_key(f'more{i}'), 'title', f'会话{i}')
+    for i in range(10):
+        save_conversation_history(r, 'latest', f'问题{i}', '回答')
+
+    assert r.zcard(SESSIONS_INDEX_KEY) == MAX_SESSIONS
+    assert r.zscore(SESSIONS_INDEX_KEY, 'latest') is not None
+    assert not r.exists(session_meta_key('old2'))
+    assert not r.exists(session_meta_key('more0'))
+    assert r.exists(session_meta_key(f'more{MAX_SESSIONS}'))
+
+
+def test_ttl_refresh():
+    """每次保存刷新对话历史的过期时间，转存时刷新会话信息与索引的过期时间"""
+    r = fakeredis.FakeRedis()
+    create_session_in_history(r, 's1')
+    history_key = 'chat:history:s1'
+
+    save_conversation_history(r, 's1', '问题', '回答', expire=100)
+    r.expire(history_key, 5)
+    save_conversation_history(r, 's1', '问题', '回答', expire=100)
+    assert 5 < r.ttl(history_key) <= 100
+
+    r.expire(SESSIONS_INDEX_KEY, 5)
+    r.expire(session_meta_key('s1'), 5)
+    for _ in range(8):
+        save_conversation_history(r, 's1', '问题', '回答', expire=100)
+    assert r.ttl(SESSIONS_INDEX_KEY) > 2592000 - 10
+    assert r.ttl(session_meta_key('s1')) > 2592000 - 10
+
+
+def test_concurrent_saves_roll_over_once():
+    """同一会话的并发保存只触发一次转存，且不丢失对话记录"""
+    r = fakeredis.FakeRedis()
+    create_session_in_history(r, 's1')
+    results = []
+    lock = threading.Lock()
+
+    def save(i):
+        result = save_conversation_history(r, 's1', f'问题{i}', '回答')
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert r.llen('chat:history:s1') == 20
+    assert sum(1 for _, should_create_new in results if should_create_new) == 1
+    assert r.zcard(SESSIONS_INDEX_KEY) == 1
+
+
+if __name__ == '__main__':
+    test_rollover_at_ten_messages()
+    test_script_return_value()
+    test_index_trimming()
+    test_ttl_refresh()
+    test_concurrent_saves_roll_over_once()
+    print("✅ 保存对话记录脚本测试通过")
@@ -0,0 +1,154 @@
+"""
+图模式约束与索引测试
+使用记录语句的 Neo4j 驱动，验证按图模式生成约束/索引、只创建缺少的、唯一约束失败时退回范围索引、FAILED 索引删除重建，
+以及只检查模式不做修改
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.graph.schema_provisioner import SchemaProvisioner
+from core.graph.schemas import GraphSchema, NodeSchema, RelationshipSchema
+
+
+SCHEMA = GraphSchema(
+    nodes=[
+        NodeSchema(label='Disease', properties={'name': 'string', 'desc': 'string'}),
+        NodeSchema(label='Symptom', properties={'name': 'string'}),
+        NodeSchema(label='Marker', properties={}),
+    ],
+    relationships=[
+        RelationshipSchema(from_node='Disease', to_node='Symptom', type='has_symptom', properties={}),
+    ]
+)
+
+
+class FakeResult:
+    def __init__(self, records=None):
+        self.records = records or []
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def consume(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, **parameters):
+        driver = self.driver
+        if query.startswith('SHOW INDEXES'):
+            return FakeResult([
+                {'name': f'{label.lower()}_{prop.lower()}_{index_type.lower()}', 'type': index_type,
+                 'labelsOrTypes': [label], 'properties': [prop], 'state': state,
+                 'owningConstraint': driver.owners.get((index_type, label, prop))}
+                for (index_type, label, prop), state in driver.indexes.items()
+            ])
+        driver.statements.append(query)
+        if query.startswith('CREATE CONSTRAINT') and driver.duplicate_names:
+            raise ValueError('Unable to create Constraint: Both Node(1) and Node(2) have the label `Symptom`')
+        return FakeResult()
+
+
+class FakeDriver:
+    def __init__(self, indexes=None, duplicate_names=False, owners=None):
+        self.indexes = indexes or {}
+        self.owners = owners or {}
+        self.duplicate_names = duplicate_names
+        self.statements = []
+
+    def session(self):
+        return FakeSession(self)
+
+
+def test_plan_from_schema():
+    """每个有名称属性的标签一个唯一约束和一个文本索引"""
+    specs = SchemaProvisioner(FakeDriver(), SCHEMA, unique_names=True).plan()
+    assert [repr(spec) for spec in specs] == [
+        'RANGE(Disease.name)', 'TEXT(Disease.name)', 'RANGE(Symptom.name)', 'TEXT(Symptom.name)'
+    ]
+    assert specs[0].create_statement() == (
+        'CREATE CONSTRAINT disease_name_unique IF NOT EXISTS FOR (n:`Disease`) REQUIRE n.`name` IS UNIQUE'
+    )
+    assert specs[1].create_statement() == (
+        'CREATE TEXT INDEX disease_name_text IF NOT EXISTS FOR (n:`Disease`) ON (n.`name`)'
+    )
+
+
+def test_provision_creates_missing_and_awaits():
+    """已存在的索引不再创建，最后等待索引上线"""
+    driver = FakeDriver(indexes={('RANGE', 'Disease', 'name'): 'ONLINE'})
+    report = SchemaProvisioner(driver, SCHEMA, unique_names=True).provision(await_timeout=10)
+
+    assert report['existing'] == ['RANGE(Disease.name)']
+    assert report['created'] == ['TEXT(Disease.name)', 'RANGE(Symptom.name)', 'TEXT(Symptom.name)']
+    assert report['online'] and not report['failed']
+    assert driver.statements[-1] == 'CALL db.awaitIndexes($timeout)'
+
+
+def test_unique_constraint_falls_back_to_range_index():
+    """已有重复名称时唯一约束创建失败，改为创建范围索引"""
+    driver = FakeDriver(duplicate_names=True)
+    report = SchemaProvisioner(driver, SCHEMA, unique_names=True, text_indexes=False).provision()
+
+    assert report['created'] == ['RANGE(Disease.name)', 'RANGE(Symptom.name)']
+    assert len(report['failed']) == 2 and report['failed'][0].startswith('UNIQUE(Disease.name)')
+    assert 'CREATE INDEX symptom_name_range IF NOT EXISTS FOR (n:`Symptom`) ON (n.`name`)' in driver.statements
+
+
+def test_failed_indexes_are_recreated():
+    """FAILED 状态的索引不算已存在：删除（由约束支撑时删除约束）后重新创建"""
+    driver = FakeDriver(
+        indexes={
+            ('RANGE', 'Disease', 'name'): 'FAILED',
+            ('TEXT', 'Disease', 'name'): 'FAILED',
+            ('RANGE', 'Symptom', 'name'): 'ONLINE',
+        },
+        owners={('RANGE', 'Disease', 'name'): 'disease_name_unique'}
+    )
+    report = SchemaProvisioner(driver, SCHEMA, unique_names=True).provision()
+
+    assert report['existing'] == ['RANGE(Symptom.name)']
+    assert report['recreated'] == ['RANGE(Disease.name)', 'TEXT(Disease.name)']
+    assert report['created'] == ['RANGE(Disease.name)', 'TEXT(Disease.name)', 'TEXT(Symptom.name)']
+    assert driver.statements[:4] == [
+        'DROP CONSTRAINT `disease_name_unique` IF EXISTS',
+        'CREATE CONSTRAINT disease_name_unique IF NOT EXISTS FOR (n:`Disease`) REQUIRE n.`name` IS UNIQUE',
+        'DROP INDEX `disease_name_text` IF EXISTS',
+        'CREATE TEXT INDEX disease_name_text IF NOT EXISTS FOR (n:`Disease`) ON (n.`name`)',
+    ]
+
+
+def test_verify_only():
+    """只检查：报告已上线、未上线和缺少的索引，不执行任何语句"""
+    driver = FakeDriver(indexes={
+        ('RANGE', 'Disease', 'name'): 'ONLINE',
+        ('TEXT', 'Disease', 'name'): 'POPULATING',
+    })
+    report = SchemaProvisioner(driver, SCHEMA).verify()
+
+    assert report['online'] == ['RANGE(Disease.name)']
+    assert report['pending'] == ['TEXT(Disease.name): POPULATING']
+    assert report['missing'] == ['RANGE(Symptom.name)', 'TEXT(Symptom.name)']
+    assert driver.statements == []
+
+
+if __name__ == '__main__':
+    test_plan_from_schema()
+    test_provision_creates_missing_and_awaits()
+    test_unique_constraint_falls_back_to_range_index()
+    test_failed_indexes_are_recreated()
+    test_verify_only()
+    print("✅ 图模式约束与索引测试通过")
@@ -0,0 +1,71 @@
+"""
+图模式注册表测试
+使用临时配置目录，验证只加载一次、文件修改后重新加载和最新版本查找
+"""
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.framework.schema_config import SchemaConfig
+from core.framework.schema_registry import SchemaRegistry
+from core.graph.schemas import GraphSchema, NodeSchema, RelationshipSchema
+
+
+def make_schema(*labels) -> GraphSchema:
+    nodes = [NodeSchema(label=label, properties={'name': 'string'}) for label in labels]
+    relationships = [RelationshipSchema(type='has_symptom', from_node=labels[0], to_node=labels[-1], properties={})]
+    return GraphSchema(nodes=nodes, relationships=relationships)
+
+
+def test_entry_is_cached():
+    """同一领域重复获取返回同一个条目，派生数据已预先计算"""
+    with tempfile.TemporaryDirectory() as tmp:
+        SchemaConfig(tmp).save_schema(make_schema('Disease', 'Symptom'), 'medical', '1.0')
+        registry = SchemaRegistry(tmp, reload_interval=60)
+
+        entry = registry.get('medical')
+        assert entry is registry.get('medical', None)
+        assert entry.node_labels == {'Disease', 'Symptom'}
+        assert entry.rel_types == {'has_symptom'}
+        assert 'Disease' in entry.system_prompt
+        assert registry.get('finance') is None
+
+
+def test_reload_on_change():
+    """配置文件修改或出现新版本后重新加载"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SchemaConfig(tmp)
+        path = config.save_schema(make_schema('Disease', 'Symptom'), 'medical', '1.0')
+        registry = SchemaRegistry(tmp, reload_interval=0)
+        first = registry.get('medical')
+
+        config.save_schema(make_schema('Disease', 'Drug'), 'medical', '1.0')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        second = registry.get('medical')
+        assert second is not first
+        assert second.node_labels == {'Disease', 'Drug'}
+        assert second.fingerprint != first.fingerprint
+
+        config.save_schema(make_schema('Disease', 'Check'), 'medical', '2.0')
+        assert registry.get('medical').node_labels == {'Disease', 'Check'}
+        assert registry.get('medical', '1.0').node_labels == {'Disease', 'Drug'}
+
+
+def test_default_schema():
+    """未指定领域时返回默认模式"""
+    registry = SchemaRegistry(tempfile.gettempdir())
+    entry = registry.get()
+    assert entry is registry.default()
+    assert entry.node_labels
+
+
+if __name__ == '__main__':
+    test_entry_is_cached()
+    test_reload_on_change()
+    test_default_schema()
+    print("✅ 图模式注册表测试通过")
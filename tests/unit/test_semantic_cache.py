@@ -0,0 +1,153 @@
+"""
+语义答案缓存测试
+使用 fakeredis 和固定向量的 Embedding 模型，验证相似度阈值、维度不一致、过期条目清理、LRU 淘汰、
+检索出错时不缓存、只有向量检索结果时正常缓存，以及版本号不变时不重复读取向量
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from core.cache.semantic_cache import SemanticAnswerCache
+
+
+class FakeEmbedding:
+    """按问题返回预设向量的 Embedding 模型"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+VECTORS = {
+    '感冒有什么症状': [1.0, 0.0, 0.0],
+    '感冒有哪些症状': [0.99, 0.1, 0.0],
+    '高血压吃什么药': [0.0, 1.0, 0.0],
+    '糖尿病饮食': [0.0, 0.0, 1.0],
+    '四维问题': [1.0, 0.0, 0.0, 0.0],
+}
+
+OK_STAGES = {'milvus_vector': {'status': 'success'}, 'knowledge_graph': {'status': 'empty'}}
+
+
+def create_cache(r=None, **kwargs):
+    r = r or fakeredis.FakeRedis()
+    return SemanticAnswerCache(FakeEmbedding(VECTORS), r=r, threshold=0.97, ttl=60, **kwargs), r
+
+
+def test_threshold_hit_and_miss():
+    """相似度不低于阈值时命中，否则不命中"""
+    cache, r = create_cache()
+    cache.store('感冒有什么症状', '发热、咳嗽', OK_STAGES, ['milvus_vector'])
+
+    hit = cache.lookup('感冒有哪些症状')
+    assert hit['answer'] == '发热、咳嗽'
+    assert hit['question'] == '感冒有什么症状'
+    assert hit['search_path'] == ['milvus_vector']
+    assert hit['similarity'] >= 0.97
+    assert cache.lookup('高血压吃什么药') is None
+    assert 0 < r.ttl(SemanticAnswerCache.ENTRY_PREFIX + cache._entry_id('感冒有什么症状')) <= 60
+
+
+def test_dimension_mismatch_is_cleaned():
+    """维度与查询向量不同的条目不参与匹配，并从索引中清理"""
+    cache, r = create_cache()
+    cache.store('感冒有什么症状', '发热', OK_STAGES, [])
+
+    assert cache.lookup('四维问题') is None
+    assert r.zcard(SemanticAnswerCache.INDEX_KEY) == 0
+
+
+def test_expired_entry_is_cleaned():
+    """条目过期后不再命中，索引中的残留被清理，其他进程也会同步移除"""
+    cache, r = create_cache()
+    other, _ = create_cache(r)
+    cache.store('感冒有什么症状', '发热', OK_STAGES, [])
+    assert other.lookup('感冒有什么症状') is not None
+
+    r.delete(SemanticAnswerCache.ENTRY_PREFIX + cache._entry_id('感冒有什么症状'))
+    assert cache.lookup('感冒有什么症状') is None
+    assert r.zcard(SemanticAnswerCache.INDEX_KEY) == 0
+    assert other.lookup('感冒有什么症状') is None
+    assert other._ids == []
+
+
+def test_lru_eviction():
+    """超出容量时淘汰最久未访问的条目"""
+    cache, r = create_cache(max_entries=2)
+    cache.store('感冒有什么症状', '发热', OK_STAGES, [])
+    cache.store('高血压吃什么药', '降压药', OK_STAGES, [])
+    assert cache.lookup('感冒有什么症状') is not None
+
+    cache.store('糖尿病饮食', '控制糖分', OK_STAGES, [])
+
+    assert r.zcard(SemanticAnswerCache.INDEX_KEY) == 2
+    assert not r.exists(SemanticAnswerCache.ENTRY_PREFIX + cache._entry_id('高血压吃什么药'))
+    assert cache.lookup('高血压吃什么药') is None
+    assert cache.lookup('感冒有什么症状') is not None
+    assert cache.lookup('糖尿病饮食') is not None
+
+
+def test_degraded_answers_not_stored():
+    """任一检索阶段出错或未完成时不缓存"""
+    cache, r = create_cache()
+    cache.store('感冒有什么症状', '发热', {
+        'milvus_vector': {'status': 'success'},
+        'knowledge_graph': {'status': 'error', 'error': '请求超时'}
+    }, [])
+    cache.store('高血压吃什么药', '降压药', {'knowledge_graph': {'status': 'pending'}}, [])
+
+    assert r.zcard(SemanticAnswerCache.INDEX_KEY) == 0
+    assert cache.lookup('感冒有什么症状') is None
+
+
+def test_vector_only_answers_are_stored():
+    """图谱查询没有结果或未执行时，只有向量检索结果的回答照常缓存"""
+    cache, r = create_cache()
+    cache.store('感冒有什么症状', '发热', {
+        'milvus_vector': {'status': 'success'},
+        'knowledge_graph': {'status': 'skipped', 'confidence': 0.5}
+    }, ['milvus_vector'])
+    cache.store('高血压吃什么药', '降压药', {
+        'milvus_vector': {'status': 'success'},
+        'knowledge_graph': {'status': 'empty'}
+    }, ['milvus_vector'])
+
+    assert r.zcard(SemanticAnswerCache.INDEX_KEY) == 2
+    assert cache.lookup('感冒有什么症状')['search_path'] == ['milvus_vector']
+
+
+def test_vectors_not_refetched_when_unchanged():
+    """版本号不变时使用进程内的向量副本；新写入的条目只取回新增的向量"""
+    cache, r = create_cache()
+    cache.store('感冒有什么症状', '发热', OK_STAGES, [])
+    assert cache.lookup('感冒有什么症状') is not None
+
+    # 删除 Redis 中的向量：版本号未变，仍使用本地副本
+    entry_key = SemanticAnswerCache.ENTRY_PREFIX + cache._entry_id('感冒有什么症状')
+    r.hdel(entry_key, 'embedding')
+    assert cache.lookup('感冒有什么症状') is not None
+
+    # 写入新条目后版本号变化，已有条目的向量不再读取
+    cache.store('高血压吃什么药', '降压药', OK_STAGES, [])
+    assert cache.lookup('高血压吃什么药')['answer'] == '降压药'
+    assert cache.lookup('感冒有什么症状')['answer'] == '发热'
+
+
+if __name__ == '__main__':
+    test_threshold_hit_and_miss()
+    test_dimension_mismatch_is_cleaned()
+    test_expired_entry_is_cleaned()
+    test_lru_eviction()
+    test_degraded_answers_not_stored()
+    test_vector_only_answers_are_stored()
+    test_vectors_not_refetched_when_unchanged()
+    print("✅ 语义答案缓存测试通过")
@@ -0,0 +1,67 @@
+"""
+历史会话分页测试
+使用 fakeredis 构造会话索引，验证游标分页在多个会话 score 相同时跨页不遗漏、不重复
+"""
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from core.cache.redis_client import SESSIONS_INDEX_KEY, get_conversation_history_page, session_meta_key
+
+
+def add_session(r, session_id, score):
+    r.zadd(SESSIONS_INDEX_KEY, {session_id: score})
+    r.hset(session_meta_key(session_id), mapping={'session_id': session_id, 'title': session_id})
+    r.rpush(f'chat:history:{session_id}', '{}')
+
+
+def read_all_pages(r, limit):
+    session_ids, cursor = [], None
+    while True:
+        sessions, cursor = get_conversation_history_page(r, limit=limit, cursor=cursor)
+        session_ids.extend(session['session_id'] for session in sessions)
+        if cursor is None:
+            return session_ids
+
+
+def test_equal_scores_across_pages():
+    """score 相同的会话跨越分页边界时，每个会话恰好返回一次"""
+    r = fakeredis.FakeRedis()
+    for i in range(7):
+        add_session(r, f's{i}', 100.5)
+    add_session(r, 'newest', 200.0)
+    add_session(r, 'oldest', 50.0)
+
+    for limit in (1, 2, 3, 4):
+        session_ids = read_all_pages(r, limit)
+        assert session_ids[0] == 'newest' and session_ids[-1] == 'oldest'
+        assert sorted(session_ids) == sorted(['newest', 'oldest'] + [f's{i}' for i in range(7)])
+
+
+def test_cursor_format():
+    """游标为最后一个会话的 score 和会话ID；只有 score 的旧游标仍然可用"""
+    r = fakeredis.FakeRedis()
+    add_session(r, 'a', 3.0)
+    add_session(r, 'b', 2.0)
+    add_session(r, 'c', 1.0)
+
+    sessions, cursor = get_conversation_history_page(r, limit=2)
+    assert [session['session_id'] for session in sessions] == ['a', 'b']
+    assert cursor == '2.0:b'
+
+    sessions, cursor = get_conversation_history_page(r, limit=2, cursor='2.0')
+    assert [session['session_id'] for session in sessions] == ['c']
+    assert cursor is None
+
+
+if __name__ == '__main__':
+    test_equal_scores_across_pages()
+    test_cursor_format()
+    print("✅ 历史会话分页测试通过")
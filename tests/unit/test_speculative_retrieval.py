@@ -0,0 +1,115 @@
+"""
+推测检索测试
+使用假的向量库和图谱服务客户端验证后台检索：事件缓存、结果写入检索状态、取消，以及图谱查询各种结果的阶段状态
+"""
+import sys
+import os
+import asyncio
+import time
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from services.retrieval import BackgroundRetrieval, search_graph
+
+
+class FakeDocument:
+    def __init__(self, content):
+        self.page_content = content
+
+
+class FakeVectorStore:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+
+    def similarity_search(self, query, **kwargs):
+        self.queries.append(query)
+        time.sleep(self.delay)
+        return [FakeDocument(f'{query}相关资料')]
+
+
+class FakeResponse:
+    status_code = 503
+
+
+class FakeGraphClient:
+    """模拟图谱服务：等待一段时间后返回错误状态码"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.finished = False
+
+    async def post(self, path, payload, timeout=None, deadline=None):
+        await asyncio.sleep(self.delay)
+        self.finished = True
+        return FakeResponse()
+
+
+class FakeAnswerClient:
+    """模拟图谱服务：返回固定的 /answer 响应"""
+
+    def __init__(self, data):
+        self.data = data
+
+    async def post(self, path, payload, timeout=None, deadline=None):
+        response = FakeResponse()
+        response.status_code = 200
+        response.json = lambda: self.data
+        return response
+
+
+def format_docs(docs):
+    return '\n'.join(doc.page_content for doc in docs)
+
+
+def test_events_buffered_until_read():
+    """检索在读取事件之前就已开始，读取时得到全部事件和结果"""
+    async def run():
+        store = FakeVectorStore()
+        retrieval = BackgroundRetrieval('感冒有什么症状', store, format_docs, FakeGraphClient())
+        await asyncio.sleep(0.05)
+        assert store.queries == ['感冒有什么症状']
+        events = [event async for event in retrieval.events()]
+        return events, retrieval.state
+
+    events, state = asyncio.run(run())
+    assert [event['status'] for event in events if event['stage'] == 'milvus_vector'] == ['pending', 'success']
+    assert state.search_path == ['milvus_vector']
+    assert state.vector_context == '感冒有什么症状相关资料'
+
+
+def test_cancel():
+    """问题被改写时取消推测检索，图谱服务请求不再继续"""
+    async def run():
+        graph_client = FakeGraphClient(delay=1.0)
+        retrieval = BackgroundRetrieval('有什么特效药', FakeVectorStore(), format_docs, graph_client)
+        await asyncio.sleep(0.05)
+        retrieval.cancel()
+        await asyncio.sleep(0.05)
+        return graph_client, [event async for event in retrieval.events()]
+
+    graph_client, events = asyncio.run(run())
+    assert not graph_client.finished
+    assert all(event['status'] == 'pending' for event in events if event['stage'] == 'knowledge_graph')
+
+
+def test_graph_stage_status():
+    """置信度不足未执行为 skipped、执行后没有结果为 empty，只有服务出错时为 error"""
+    def stage_of(graph_client):
+        return asyncio.run(search_graph('感冒有什么症状', graph_client))['stage']
+
+    skipped = stage_of(FakeAnswerClient({'cypher_query': 'MATCH (n) RETURN n', 'confidence': 0.5, 'executed': False}))
+    assert skipped['status'] == 'skipped' and skipped['confidence'] == 0.5
+    empty = stage_of(FakeAnswerClient({'cypher_query': 'MATCH (n) RETURN n', 'confidence': 0.9,
+                                       'executed': True, 'records': []}))
+    assert empty['status'] == 'empty'
+    assert stage_of(FakeGraphClient())['status'] == 'error'
+
+
+if __name__ == '__main__':
+    test_events_buffered_until_read()
+    test_cancel()
+    test_graph_stage_status()
+    print("✅ 推测检索测试通过")
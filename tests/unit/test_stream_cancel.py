@@ -0,0 +1,65 @@
+"""
+流式接口断开取消测试
+使用模拟的事件流验证：客户端断开后事件流被取消（finally 执行），指标记录取消阶段
+"""
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from services.streaming_handler import cancel_on_disconnect
+from services.metrics import metrics
+
+
+async def fake_events(log, answer_chunks):
+    """模拟 chatbot_stream：先检索，再逐个产出回答片段"""
+    try:
+        yield "event: search_stage\ndata: {}\n\n"
+        yield "event: answer_start\ndata: {}\n\n"
+        for _ in range(answer_chunks):
+            await asyncio.sleep(0.02)
+            yield "event: answer_chunk\ndata: {}\n\n"
+        log.append('completed')
+    finally:
+        log.append('closed')
+
+
+async def collect(events, disconnect_after):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def is_disconnected():
+        return loop.time() - start > disconnect_after
+
+    return [event async for event in cancel_on_disconnect(events, is_disconnected, poll_interval=0.01)]
+
+
+def test_stream_completes():
+    """客户端未断开时转发全部事件"""
+    metrics.reset()
+    log = []
+    events = asyncio.run(collect(fake_events(log, 3), disconnect_after=60))
+    assert len(events) == 5
+    assert log == ['completed', 'closed']
+    assert metrics.snapshot()['counters'] == {'stream_requests': 1, 'stream_completed': 1}
+
+
+def test_stream_cancelled_on_disconnect():
+    """客户端断开后取消事件流，不再继续生成"""
+    metrics.reset()
+    log = []
+    events = asyncio.run(collect(fake_events(log, 1000), disconnect_after=0.1))
+    assert len(events) < 1000
+    assert log == ['closed']
+    counters = metrics.snapshot()['counters']
+    assert counters['stream_cancelled'] == 1
+    assert counters['stream_cancelled_during_generation'] == 1
+
+
+if __name__ == '__main__':
+    test_stream_completes()
+    test_stream_cancelled_on_disconnect()
+    print("✅ 流式接口断开取消测试通过")
@@ -19,6 +19,7 @@ from pathlib import Path
 
 from config.settings import settings
 from core.models.embeddings import ZhipuAIEmbeddings
+from core.models.embedding_cache import create_embedding_model
 from core.cache.redis_client import get_redis_client, cache_set, cache_get
 from utils.document_loader import prepare_document
 # 已迁移到 OpenRouter，不再使用 zai SDK
@@ -39,8 +40,8 @@ class MilvusVectorBuilder:
             uri: Milvus数据库URI，如果为None则使用配置中的默认值
         """
         if embedding_model is None:
-            # 使用 OpenRouter 的 Embedding 模型
-            self.embeddings = ZhipuAIEmbeddings()
+            # 带持久化缓存的 Embedding 模型：重建向量库时未变化的文本不再重复调用接口
+            self.embeddings = create_embedding_model()
         else:
             self.embeddings = embedding_model
         
@@ -248,6 +249,9 @@ def build_milvus_database(file_paths: list = None, uri: str = None, append_mode:
         print("✅ 向量数据库构建完成！")
     print("=" * 60)
     print(f"\n数据库路径: {builder.URI}")
+    if hasattr(builder.embeddings, 'stats'):
+        stats = builder.embeddings.stats()
+        print(f"Embedding 缓存: 命中 {stats['hits'] + stats['redis_hits']} 条，新生成 {stats['misses']} 条，缓存共 {stats['size']} 条")
     print("可以开始使用向量检索功能了！")
     
     return vectorstore